@@ -3,6 +3,7 @@ Celery application configuration for background tasks
 """
 
 from celery import Celery
+from celery.schedules import crontab
 from app import create_app
 
 def make_celery(app=None):
@@ -25,6 +26,36 @@ def make_celery(app=None):
         task_track_started=True,
         task_time_limit=30 * 60,  # 30 minutes
         worker_prefetch_multiplier=1,
+        beat_schedule={
+            'materialize-class-sessions': {
+                'task': 'sessions.materialize',
+                'schedule': crontab(minute=5),  # hourly
+            },
+            'scan-session-conflicts': {
+                'task': 'sessions.scan_conflicts',
+                'schedule': crontab(hour=2, minute=0),  # nightly
+            },
+            'release-expired-seat-holds': {
+                'task': 'seats.release_expired_holds',
+                'schedule': 60.0,  # every minute
+            },
+            'warm-checkin-cache': {
+                'task': 'checkin.warm_cache',
+                'schedule': crontab(minute='*/15'),
+            },
+            'requeue-stale-webhook-events': {
+                'task': 'payments.requeue_stale_webhook_events',
+                'schedule': crontab(minute='*/5'),
+            },
+            'reconcile-refunds': {
+                'task': 'payments.reconcile_refunds',
+                'schedule': crontab(hour=3, minute=30),  # daily
+            },
+            'snapshot-wallet-balances': {
+                'task': 'wallet.snapshot_balances',
+                'schedule': crontab(day_of_month=1, hour=0, minute=15),  # monthly
+            },
+        },
     )
     
     class ContextTask(celery.Task):
@@ -43,4 +74,4 @@ celery_app = make_celery(flask_app)
 
 
 # Import tasks to register them
-# from app.tasks import *
+from app.tasks import *
@@ -59,6 +59,15 @@ class Config:
     # Redis
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Booking/payment/invoice numbers reserved from the database per Redis refill
+    NUMBER_SEQUENCE_BLOCK_SIZE = int(os.getenv('NUMBER_SEQUENCE_BLOCK_SIZE', '50'))
+    
+    # Days ahead that class sessions are created from class schedules
+    SESSION_HORIZON_DAYS = int(os.getenv('SESSION_HORIZON_DAYS', '28'))
+    
+    # Minutes a seat stays held for a customer while they pay online
+    SEAT_HOLD_MINUTES = int(os.getenv('SEAT_HOLD_MINUTES', '15'))
+    
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     
@@ -692,6 +692,7 @@ class ClassSession(db.Model):
     max_capacity = db.Column(db.Integer, default=15)
     booked_count = db.Column(db.Integer, default=0)
     waitlist_count = db.Column(db.Integer, default=0)
+    held_count = db.Column(db.Integer, default=0)  # Seats held for checkouts in progress
     
     # Instructor (references users table - instructors are users with instructor role)
     instructor_id = db.Column(db.String(36), db.ForeignKey('users.id'))
@@ -708,23 +709,35 @@ class ClassSession(db.Model):
     status = db.Column(db.String(20), default='SCHEDULED')  # SCHEDULED, IN_PROGRESS, COMPLETED, CANCELLED
     cancellation_reason = db.Column(db.String(255))
     
+    # Schedule date of a session that was moved by hand (kept off the schedule's slot)
+    rescheduled_from = db.Column(db.Date)
+    
     # Notes
     notes = db.Column(db.Text)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_class_sessions_schedule_id_date', 'schedule_id', 'date'),
+    )
+    
     # Relationships
     bookings = db.relationship('Booking', backref='session', lazy='dynamic')
     waitlist = db.relationship('Waitlist', backref='session', lazy='dynamic')
     
+    @property
+    def taken_spots(self):
+        """Booked seats plus seats held for checkouts in progress."""
+        return (self.booked_count or 0) + (self.held_count or 0)
+    
     @property
     def available_spots(self):
-        return max(0, self.max_capacity - self.booked_count)
+        return max(0, self.max_capacity - self.taken_spots)
     
     @property
     def is_full(self):
-        return self.booked_count >= self.max_capacity
+        return self.taken_spots >= self.max_capacity
     
     def to_dict(self, include_bookings=False):
         data = {
@@ -738,6 +751,7 @@ class ClassSession(db.Model):
             'max_capacity': self.max_capacity,
             'booked_count': self.booked_count,
             'waitlist_count': self.waitlist_count,
+            'held_count': self.held_count,
             'available_spots': self.available_spots,
             'is_full': self.is_full,
             'instructor_id': self.instructor_id,
@@ -745,12 +759,21 @@ class ClassSession(db.Model):
             'substitute_instructor_name': self.substitute_instructor_name,
             'room_id': self.room_id,
             'status': self.status,
+            'rescheduled_from': self.rescheduled_from.isoformat() if self.rescheduled_from else None,
         }
         if include_bookings:
             data['bookings'] = [b.to_dict() for b in self.bookings.all()]
         return data
 
 
+class ConfirmationStatus(str, Enum):
+    """Progress of a booking's QR/PDF confirmation pipeline."""
+    PENDING = 'PENDING'
+    ASSETS_READY = 'ASSETS_READY'
+    NOTIFIED = 'NOTIFIED'
+    FAILED = 'FAILED'
+
+
 class Booking(db.Model):
     """Class booking by a contact/student or registered user."""
     __tablename__ = 'bookings'
@@ -785,14 +808,30 @@ class Booking(db.Model):
     refund_amount = db.Column(db.Numeric(10, 2), default=0)
     
     # QR Code and verification
-    qr_code_token = db.Column(db.String(100), unique=True, nullable=True)  # Unique token for QR code verification
+    qr_code_token = db.Column(db.String(100), nullable=True)  # Unique token for QR code verification
     qr_code_url = db.Column(db.String(500), nullable=True)  # S3 URL for QR code image
     pdf_url = db.Column(db.String(500), nullable=True)  # S3 URL for booking confirmation PDF
     attendance_marked_at = db.Column(db.DateTime, nullable=True)  # When attendance was marked via QR scan
     
+    # Confirmation pipeline (QR/PDF generation, upload, customer notification)
+    confirmation_status = db.Column(db.String(20), nullable=True)  # PENDING, ASSETS_READY, NOTIFIED, FAILED
+    confirmation_error = db.Column(db.String(500), nullable=True)
+    notified_at = db.Column(db.DateTime, nullable=True)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Keyset pagination of a studio's bookings (see app.pagination)
+        db.Index('ix_bookings_studio_id_booked_at_id', 'studio_id', 'booked_at', 'id'),
+        # Unique among bookings that have a token (SQL Server would otherwise
+        # allow only one NULL)
+        db.Index(
+            'ix_bookings_qr_code_token', 'qr_code_token', unique=True,
+            mssql_where=db.text('qr_code_token IS NOT NULL')
+        ),
+    )
+    
     def to_dict(self, include_session=False, include_contact=False):
         data = {
             'id': self.id,
@@ -808,6 +847,7 @@ class Booking(db.Model):
             'qr_code_token': self.qr_code_token,
             'qr_code_url': self.qr_code_url,
             'pdf_url': self.pdf_url,
+            'confirmation_status': self.confirmation_status,
             'booked_at': self.booked_at.isoformat() if self.booked_at else None,
             'confirmed_at': self.confirmed_at.isoformat() if self.confirmed_at else None,
             'cancelled_at': self.cancelled_at.isoformat() if self.cancelled_at else None,
@@ -850,6 +890,50 @@ class Waitlist(db.Model):
         }
 
 
+class SeatHoldStatus(str, Enum):
+    """Seat hold lifecycle."""
+    HELD = 'HELD'
+    CONVERTED = 'CONVERTED'
+    EXPIRED = 'EXPIRED'
+    RELEASED = 'RELEASED'
+
+
+class SeatHold(db.Model):
+    """Seat held for a customer while they pay for it online."""
+    __tablename__ = 'seat_holds'
+    
+    id = db.Column(db.String(36), primary_key=True)
+    studio_id = db.Column(db.String(36), db.ForeignKey('studios.id'), nullable=False)
+    session_id = db.Column(db.String(36), db.ForeignKey('class_sessions.id'), nullable=False, index=True)
+    razorpay_order_id = db.Column(db.String(100), unique=True, nullable=False)
+    
+    # Customer details from checkout, used to create the booking
+    customer_name = db.Column(db.String(255))
+    customer_phone = db.Column(db.String(50))
+    customer_email = db.Column(db.String(255))
+    
+    status = db.Column(db.String(20), default='HELD')  # HELD, CONVERTED, EXPIRED, RELEASED
+    expires_at = db.Column(db.DateTime, nullable=False)
+    booking_id = db.Column(db.String(36), db.ForeignKey('bookings.id'))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_seat_holds_status_expires_at', 'status', 'expires_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'session_id': self.session_id,
+            'razorpay_order_id': self.razorpay_order_id,
+            'status': self.status,
+            'booking_id': self.booking_id,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+
 # ============================================================
 # PAYMENT SYSTEM MODELS
 # ============================================================
@@ -912,6 +996,9 @@ class Payment(db.Model):
     status = db.Column(db.String(20), default='PENDING')
     failure_reason = db.Column(db.String(255))
     
+    # Sum of the payment's refunds, kept up to date with each refund
+    refunded_amount = db.Column(db.Numeric(10, 2), default=0)
+    
     # Purchase reference
     purchase_type = db.Column(db.String(20))  # DROP_IN, CLASS_PACK, SUBSCRIPTION, PRIVATE_SESSION
     purchase_description = db.Column(db.String(255))
@@ -939,6 +1026,7 @@ class Payment(db.Model):
             'tax_amount': float(self.tax_amount) if self.tax_amount else 0,
             'discount_amount': float(self.discount_amount) if self.discount_amount else 0,
             'total_amount': float(self.total_amount) if self.total_amount else 0,
+            'refunded_amount': float(self.refunded_amount) if self.refunded_amount else 0,
             'provider': self.provider,
             'payment_method': self.payment_method,
             'status': self.status,
@@ -970,6 +1058,15 @@ class Refund(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     processed_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        # A provider refund is recorded once, whether the API call or the
+        # webhook gets there first. Manual refunds have no provider ID
+        db.Index(
+            'ix_refunds_provider_refund_id', 'provider_refund_id', unique=True,
+            mssql_where=db.text('provider_refund_id IS NOT NULL')
+        ),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -981,6 +1078,59 @@ class Refund(db.Model):
         }
 
 
+class WebhookEventStatus(str, Enum):
+    """Payment webhook event processing status."""
+    RECEIVED = 'RECEIVED'
+    PROCESSING = 'PROCESSING'
+    PROCESSED = 'PROCESSED'
+    FAILED = 'FAILED'
+    IGNORED = 'IGNORED'
+
+
+class PaymentWebhookEvent(db.Model):
+    """Payment provider webhook delivery, stored before it is processed."""
+    __tablename__ = 'payment_webhook_events'
+
+    id = db.Column(db.String(36), primary_key=True)
+    provider = db.Column(db.String(20), default='RAZORPAY')
+
+    # Provider event id; a redelivered event hits the unique constraint
+    event_id = db.Column(db.String(100), unique=True, nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+
+    # Events with the same key (payment or subscription id) run in order
+    ordering_key = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+
+    status = db.Column(db.String(20), default='RECEIVED')  # RECEIVED, PROCESSING, PROCESSED, FAILED, IGNORED
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.String(500))
+
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # When a worker last claimed the event; a stale PROCESSING claim is taken over
+    claimed_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_payment_webhook_events_ordering_key_received_at', 'ordering_key', 'received_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'provider': self.provider,
+            'event_id': self.event_id,
+            'event_type': self.event_type,
+            'ordering_key': self.ordering_key,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'claimed_at': self.claimed_at.isoformat() if self.claimed_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
+        }
+
+
 class ClassPack(db.Model):
     """Class pack product definition."""
     __tablename__ = 'class_packs'
@@ -1194,6 +1344,11 @@ class WalletTransaction(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # History pages and statement sums by wallet and time
+        db.Index('ix_wallet_transactions_wallet_id_created_at_id', 'wallet_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -1202,10 +1357,30 @@ class WalletTransaction(db.Model):
             'amount': float(self.amount) if self.amount else 0,
             'balance_after': float(self.balance_after) if self.balance_after else 0,
             'description': self.description,
+            'reference_type': self.reference_type,
+            'reference_id': self.reference_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
 
 
+class WalletBalanceSnapshot(db.Model):
+    """Wallet balance at the start of a period, for statements."""
+    __tablename__ = 'wallet_balance_snapshots'
+    
+    id = db.Column(db.String(36), primary_key=True)
+    wallet_id = db.Column(db.String(36), db.ForeignKey('wallets.id'), nullable=False)
+    
+    # Balance from all transactions created before as_of
+    as_of = db.Column(db.DateTime, nullable=False)
+    balance = db.Column(db.Numeric(10, 2), nullable=False)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('wallet_id', 'as_of', name='uq_wallet_balance_snapshots_wallet_id_as_of'),
+    )
+
+
 class DiscountCode(db.Model):
     """Discount/promo codes."""
     __tablename__ = 'discount_codes'
@@ -1296,4 +1471,19 @@ class Notification(db.Model):
             'is_read': self.is_read,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'read_at': self.read_at.isoformat() if self.read_at else None,
-        }
\ No newline at end of file
+        }
+
+class NumberSequence(db.Model):
+    """Counter behind booking, payment and invoice numbers.
+
+    One row per (prefix, scope, year); scope is a studio id for per-studio
+    sequences and '' for global ones. next_value is the next number that
+    has not been handed out.
+    """
+    __tablename__ = 'number_sequences'
+    
+    prefix = db.Column(db.String(10), primary_key=True)  # BK, PAY, INV
+    scope = db.Column(db.String(36), primary_key=True, default='')
+    year = db.Column(db.Integer, primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are ordered newest first by a timestamp column, with the primary key
+as tie breaker. The cursor is the (timestamp, id) of the last row of a page
+and the next page is everything strictly before it:
+
+    WHERE ts < :ts OR (ts = :ts AND id < :id)
+    ORDER BY ts DESC, id DESC
+
+so page 50 costs the same as page 1 and rows added in the meantime don't
+shift pages the way OFFSET does.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """The cursor wasn't produced by encode_cursor."""
+    pass
+
+
+def encode_cursor(timestamp: datetime, id_: str) -> str:
+    """Opaque cursor for the row (timestamp, id)."""
+    raw = f"{timestamp.isoformat()}|{id_}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(timestamp, id) of a cursor from encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, id_ = raw.split('|', 1)
+        return datetime.fromisoformat(timestamp), id_
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def page_size(value, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Requested page size, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(query, timestamp_column, id_column, cursor: Optional[str] = None,
+                limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List, Optional[str]]:
+    """
+    One page of a query, newest first.
+
+    Rows must have a non-null timestamp.
+
+    Returns:
+        (rows, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        InvalidCursor: if the cursor can't be decoded
+    """
+    if cursor:
+        timestamp, id_ = decode_cursor(cursor)
+        query = query.filter(or_(
+            timestamp_column < timestamp,
+            and_(timestamp_column == timestamp, id_column < id_)
+        ))
+
+    # One extra row tells whether there is another page
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
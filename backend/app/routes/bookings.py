@@ -1,28 +1,39 @@
 """
 Booking API routes for class bookings, sessions, and waitlist management.
 """
+import csv
+import io
 import uuid
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import (
     User, Contact, ClassSession, Booking, Waitlist, Studio,
-    ClassSchedule, DanceClass, Room, ClassPackPurchase, Subscription
+    ClassSchedule, DanceClass, ClassPackPurchase, Subscription,
+    ConfirmationStatus, SeatHold
 )
 from app.services.notifications import notification_service
+from app.services.seat_allocation import SeatAllocator
+from app.services.seat_holds import SeatHoldService
+from app.services.sequences import NumberSequenceService
+from app.pagination import InvalidCursor, keyset_page, page_size
+from app.serializers import (
+    serialize_sessions, serialize_weekly_schedule, serialize_session_detail,
+    serialize_bookings, serialize_session_bookings, serialize_public_sessions
+)
+from app.services.public_schedule_cache import public_schedule_cache
+from app.services.session_materializer import SessionMaterializer
+from app.services.booking_confirmation import BookingConfirmation
+from app.services.bulk_sessions import BulkSessionOperations, CANCELLED, RESCHEDULED
+from app.services.checkin import CheckInService, MAX_SYNC_SCANS
 
 bookings_bp = Blueprint('bookings', __name__, url_prefix='/api/bookings')
 
 
 def generate_booking_number():
     """Generate unique booking number."""
-    year = datetime.utcnow().year
-    # Get count of bookings this year
-    count = Booking.query.filter(
-        db.extract('year', Booking.created_at) == year
-    ).count()
-    return f"BK-{year}-{str(count + 1).zfill(5)}"
+    return NumberSequenceService.next_number('BK')
 
 
 # ============================================================
@@ -68,47 +79,8 @@ def list_sessions():
     
     sessions = query.order_by(ClassSession.date, ClassSession.start_time).all()
     
-    # Enrich with class details
-    result = []
-    for session in sessions:
-        session_data = session.to_dict()
-        
-        # Add class info
-        if session.class_id:
-            dance_class = DanceClass.query.get(session.class_id)
-            if dance_class:
-                session_data['class_name'] = dance_class.name
-                session_data['class_type'] = dance_class.dance_style
-                session_data['level'] = dance_class.level
-                session_data['drop_in_price'] = float(dance_class.price) if dance_class.price else 0
-        
-        # Add instructor info - use new field or fallback to old field
-        if session.instructor_name:
-            session_data['instructor_name'] = session.instructor_name
-        elif session.instructor_id:
-            instructor = User.query.get(session.instructor_id)
-            if instructor:
-                session_data['instructor_name'] = instructor.name
-        elif session.class_id:
-            # Fallback to class instructor
-            dance_class = DanceClass.query.get(session.class_id)
-            if dance_class:
-                if dance_class.instructor_name:
-                    session_data['instructor_name'] = dance_class.instructor_name
-                elif dance_class.instructor_id:
-                    instructor = User.query.get(dance_class.instructor_id)
-                    if instructor:
-                        session_data['instructor_name'] = instructor.name
-        if 'instructor_name' not in session_data:
-            session_data['instructor_name'] = 'TBA'
-        
-        # Add room info
-        if session.room_id:
-            room = Room.query.get(session.room_id)
-            if room:
-                session_data['room_name'] = room.name
-        
-        result.append(session_data)
+    # Enrich with class, instructor and room details
+    result = serialize_sessions(sessions)
     
     return jsonify({
         'sessions': result,
@@ -133,47 +105,15 @@ def get_session(session_id):
     if not session:
         return jsonify({'error': 'Session not found'}), 404
     
-    session_data = session.to_dict(include_bookings=False)
-    
-    # Add class info
-    if session.class_id:
-        dance_class = DanceClass.query.get(session.class_id)
-        if dance_class:
-            session_data['class'] = dance_class.to_dict()
-    
-    # Add instructor info
-    if session.instructor_id:
-        instructor = User.query.get(session.instructor_id)
-        if instructor:
-            session_data['instructor'] = instructor.to_dict()
-    
-    # Add room info
-    if session.room_id:
-        room = Room.query.get(session.room_id)
-        if room:
-            session_data['room'] = room.to_dict()
-    
     # Get attendee list (for staff)
+    attendees = None
     if user.role in ['owner', 'admin', 'staff']:
-        bookings = Booking.query.filter_by(
+        attendees = Booking.query.filter_by(
             session_id=session_id,
             status='CONFIRMED'
         ).all()
-        
-        attendees = []
-        for booking in bookings:
-            contact = Contact.query.get(booking.contact_id)
-            if contact:
-                attendees.append({
-                    'booking_id': booking.id,
-                    'contact_name': contact.name,
-                    'contact_phone': contact.phone,
-                    'checked_in': booking.checked_in_at is not None
-                })
-        
-        session_data['attendees'] = attendees
     
-    return jsonify(session_data)
+    return jsonify(serialize_session_detail(session, attendees))
 
 
 @bookings_bp.route('/sessions', methods=['POST'])
@@ -247,6 +187,7 @@ def update_session(session_id):
     # Track if we need to notify customers
     notify_customers = data.get('notify_customers', False)
     changes = []
+    original_date = session.date
     
     if 'date' in data:
         new_date = datetime.fromisoformat(data['date']).date()
@@ -272,6 +213,10 @@ def update_session(session_id):
     if 'notes' in data:
         session.notes = data['notes']
     
+    # Keep the schedule from moving the session back to its slot
+    if changes and session.schedule_id and not session.rescheduled_from:
+        session.rescheduled_from = original_date
+    
     db.session.commit()
     
     # Notify booked customers if requested and changes were made
@@ -389,17 +334,149 @@ def delete_session(session_id):
     })
 
 
-# ============================================================
-# BOOKINGS
-# ============================================================
+# Longest date range a bulk session operation may cover
+BULK_MAX_DAYS = 366
 
-@bookings_bp.route('', methods=['GET'])
+
+def _bulk_session_filters(data):
+    """
+    Session filter of a bulk request, or an error response.
+    
+    Returns:
+        (filters, error)
+    """
+    if not data.get('start_date') or not data.get('end_date'):
+        return None, (jsonify({'error': 'start_date and end_date are required'}), 400)
+    
+    try:
+        start_date = datetime.fromisoformat(data['start_date']).date()
+        end_date = datetime.fromisoformat(data['end_date']).date()
+    except (TypeError, ValueError):
+        return None, (jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400)
+    
+    if end_date < start_date:
+        return None, (jsonify({'error': 'end_date must not be before start_date'}), 400)
+    if (end_date - start_date).days >= BULK_MAX_DAYS:
+        return None, (jsonify({'error': f'Date range cannot exceed {BULK_MAX_DAYS} days'}), 400)
+    
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'class_id': data.get('class_id'),
+        'instructor_id': data.get('instructor_id'),
+    }, None
+
+
+@bookings_bp.route('/sessions/bulk-cancel', methods=['POST'])
 @jwt_required()
-def list_bookings():
-    """List bookings - studio owners see their studio's bookings, customers see their own."""
+def bulk_cancel_sessions():
+    """
+    Cancel all sessions in a date range (optionally one class or instructor).
+    
+    Their bookings are cancelled, class pack credits refunded and the
+    customers notified in the background.
+    """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
     
+    if user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json() or {}
+    filters, error = _bulk_session_filters(data)
+    if error:
+        return error
+    
+    reason = str(data.get('reason') or 'Class has been cancelled')
+    notify_customers = data.get('notify_customers', True)
+    
+    result = BulkSessionOperations.cancel(user.studio_id, reason, **filters)
+    db.session.commit()
+    
+    booking_ids = result.pop('booking_ids')
+    notification_batches = 0
+    if notify_customers and booking_ids:
+        notification_batches = BulkSessionOperations.enqueue_notifications(booking_ids, CANCELLED, reason)
+    
+    return jsonify({
+        'message': 'Sessions cancelled successfully',
+        **result,
+        'notification_batches': notification_batches
+    })
+
+
+@bookings_bp.route('/sessions/bulk-reschedule', methods=['POST'])
+@jwt_required()
+def bulk_reschedule_sessions():
+    """
+    Move all sessions in a date range (optionally one class or instructor).
+    
+    Sessions move by `shift_days` and/or to a new `start_time` (HH:MM),
+    keeping their duration.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json() or {}
+    filters, error = _bulk_session_filters(data)
+    if error:
+        return error
+    
+    try:
+        shift_days = int(data.get('shift_days') or 0)
+        start_time = datetime.strptime(data['start_time'], '%H:%M').time() if data.get('start_time') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'shift_days must be a number and start_time HH:MM'}), 400
+    
+    if not shift_days and not start_time:
+        return jsonify({'error': 'shift_days or start_time is required'}), 400
+    
+    notify_customers = data.get('notify_customers', False)
+    
+    result = BulkSessionOperations.reschedule(user.studio_id, shift_days, start_time, **filters)
+    db.session.commit()
+    
+    booking_ids = result.pop('booking_ids')
+    notification_batches = 0
+    if notify_customers and booking_ids:
+        message = data.get('reason') or 'Class rescheduled'
+        notification_batches = BulkSessionOperations.enqueue_notifications(booking_ids, RESCHEDULED, message)
+    
+    return jsonify({
+        'message': 'Sessions rescheduled successfully',
+        **result,
+        'notification_batches': notification_batches
+    })
+
+
+# ============================================================
+# BOOKINGS
+# ============================================================
+
+# Rows serialized per batch while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_CSV_COLUMNS = [
+    'booking_number', 'status', 'class_name', 'session_date', 'session_time',
+    'contact_name', 'payment_method', 'razorpay_payment_id', 'booked_at',
+    'checked_in_at', 'cancelled_at',
+]
+
+
+def filtered_bookings_query(user):
+    """
+    Bookings visible to a user, filtered by the request's query parameters.
+    
+    Studio owners see their studio's bookings, customers see their own.
+    """
     # Query parameters
     contact_id = request.args.get('contact_id')
     session_id = request.args.get('session_id')
@@ -433,45 +510,97 @@ def list_bookings():
             ClassSession.date < today
         )
     
-    bookings = query.order_by(Booking.booked_at.desc()).limit(100).all()
+    return query
+
+
+@bookings_bp.route('', methods=['GET'])
+@jwt_required()
+def list_bookings():
+    """
+    List bookings - studio owners see their studio's bookings, customers see their own.
     
-    # Enrich with session details
-    result = []
-    for booking in bookings:
-        booking_data = booking.to_dict()
-        
-        # Add session info
-        session = ClassSession.query.get(booking.session_id)
-        if session:
-            booking_data['session_date'] = session.date.isoformat()
-            booking_data['session_time'] = session.start_time.isoformat() if session.start_time else None
-            
-            # Add class info
-            if session.class_id:
-                dance_class = DanceClass.query.get(session.class_id)
-                if dance_class:
-                    booking_data['class_name'] = dance_class.name
-                    
-                    # For customers, also include studio info
-                    if user.user_type == 'customer':
-                        studio = Studio.query.get(dance_class.studio_id)
-                        if studio:
-                            booking_data['studio_name'] = studio.name
-                            booking_data['studio_slug'] = studio.slug
-        
-        # Add contact info
-        contact = Contact.query.get(booking.contact_id)
-        if contact:
-            booking_data['contact_name'] = contact.name
-        
-        result.append(booking_data)
+    Newest first, paged with `limit` and the `next_cursor` of the previous page.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    query = filtered_bookings_query(user)
+    
+    try:
+        bookings, next_cursor = keyset_page(
+            query,
+            Booking.booked_at,
+            Booking.id,
+            cursor=request.args.get('cursor'),
+            limit=page_size(request.args.get('limit'))
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    # Enrich with session details (and studio info for customers)
+    result = serialize_bookings(bookings, include_studio=user.user_type == 'customer')
     
     return jsonify({
         'bookings': result,
-        'total': len(result)
+        'total': len(result),
+        'next_cursor': next_cursor
     })
 
 
+@bookings_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_bookings():
+    """
+    Download bookings as CSV or NDJSON (`format` parameter).
+    
+    Takes the same filters as the booking list. Rows are streamed from a
+    server-side cursor in batches, so large exports use constant memory.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    
+    query = filtered_bookings_query(user).order_by(Booking.booked_at.desc(), Booking.id.desc())
+    include_studio = user.user_type == 'customer'
+    
+    def batches():
+        batch = []
+        for booking in query.yield_per(EXPORT_BATCH_SIZE):
+            batch.append(booking)
+            if len(batch) == EXPORT_BATCH_SIZE:
+                yield serialize_bookings(batch, include_studio=include_studio)
+                batch = []
+        if batch:
+            yield serialize_bookings(batch, include_studio=include_studio)
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for rows in batches():
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    def generate_ndjson():
+        for rows in batches():
+            yield ''.join(current_app.json.dumps(row) + '\n' for row in rows)
+    
+    generate = generate_csv if export_format == 'csv' else generate_ndjson
+    filename = f"bookings-{datetime.utcnow().strftime('%Y-%m-%d')}.{export_format}"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
 @bookings_bp.route('', methods=['POST'])
 @jwt_required()
 def create_booking():
@@ -510,9 +639,8 @@ def create_booking():
     if existing:
         return jsonify({'error': 'Already booked for this session'}), 400
     
-    # Check capacity
-    if session.is_full:
-        # Add to waitlist instead
+    # Reserve a seat atomically; a full session goes to the waitlist instead
+    if session.is_full or not SeatAllocator.reserve_seat(session):
         return add_to_waitlist(session, data['contact_id'], user.studio_id)
     
     # Determine payment method
@@ -531,6 +659,7 @@ def create_booking():
         ).first()
         
         if not class_pack:
+            db.session.rollback()  # Release the reserved seat
             return jsonify({'error': 'No active class pack found'}), 400
         
         class_pack_purchase_id = class_pack.id
@@ -547,11 +676,13 @@ def create_booking():
         ).first()
         
         if not subscription:
+            db.session.rollback()  # Release the reserved seat
             return jsonify({'error': 'No active subscription found'}), 400
         
         # Check monthly limit if applicable
         if subscription.plan and subscription.plan.classes_per_month:
             if subscription.classes_used_this_period >= subscription.plan.classes_per_month:
+                db.session.rollback()  # Release the reserved seat
                 return jsonify({'error': 'Monthly class limit reached'}), 400
         
         subscription.classes_used_this_period += 1
@@ -571,9 +702,6 @@ def create_booking():
         confirmed_at=datetime.utcnow()
     )
     
-    # Update session booked count
-    session.booked_count += 1
-    
     db.session.add(booking)
     db.session.commit()
     
@@ -629,7 +757,7 @@ def add_to_waitlist(session, contact_id, studio_id):
         status='WAITING'
     )
     
-    session.waitlist_count += 1
+    SeatAllocator.join_waitlist(session)
     
     db.session.add(waitlist_entry)
     db.session.commit()
@@ -714,9 +842,9 @@ def cancel_booking(booking_id):
     booking.cancelled_at = datetime.utcnow()
     booking.cancellation_reason = data.get('reason', 'Customer requested')
     
-    # Update session count
+    # Give the seat back
     if session:
-        session.booked_count = max(0, session.booked_count - 1)
+        SeatAllocator.release_seat(session)
     
     # Refund class pack credit
     if booking.class_pack_purchase_id:
@@ -756,7 +884,13 @@ def cancel_booking(booking_id):
 
 
 def promote_from_waitlist(session):
-    """Promote next person from waitlist to confirmed booking."""
+    """
+    Promote next person from waitlist to confirmed booking.
+    
+    Auto-book entries take the freed seat with the same atomic reservation
+    as a direct booking; if another booking got there first, the entry
+    stays on the waitlist.
+    """
     next_in_line = Waitlist.query.filter_by(
         session_id=session.id,
         status='WAITING'
@@ -765,12 +899,15 @@ def promote_from_waitlist(session):
     if not next_in_line:
         return None
     
+    if next_in_line.auto_book and not SeatAllocator.reserve_seat(session):
+        return None
+    
     # Mark as notified
     next_in_line.status = 'NOTIFIED'
     next_in_line.notified_at = datetime.utcnow()
     next_in_line.expires_at = datetime.utcnow() + timedelta(minutes=30)
     
-    session.waitlist_count = max(0, session.waitlist_count - 1)
+    SeatAllocator.leave_waitlist(session)
     
     # If auto-book enabled, create booking immediately
     if next_in_line.auto_book:
@@ -786,7 +923,6 @@ def promote_from_waitlist(session):
             confirmed_at=datetime.utcnow()
         )
         
-        session.booked_count += 1
         next_in_line.status = 'CONVERTED'
         
         db.session.add(booking)
@@ -878,7 +1014,7 @@ def leave_waitlist(entry_id):
     # Update session waitlist count
     session = ClassSession.query.get(entry.session_id)
     if session:
-        session.waitlist_count = max(0, session.waitlist_count - 1)
+        SeatAllocator.leave_waitlist(session)
     
     entry.status = 'CANCELLED'
     
@@ -916,28 +1052,7 @@ def weekly_schedule():
     ).order_by(ClassSession.start_time).all()
     
     # Organize by day
-    schedule = {i: [] for i in range(7)}  # 0=Monday to 6=Sunday
-    
-    for session in sessions:
-        day_index = session.date.weekday()
-        
-        session_data = session.to_dict()
-        
-        # Add class info
-        if session.class_id:
-            dance_class = DanceClass.query.get(session.class_id)
-            if dance_class:
-                session_data['class_name'] = dance_class.name
-                session_data['class_type'] = dance_class.dance_style
-                session_data['level'] = dance_class.level
-        
-        # Add instructor name
-        if session.instructor_id:
-            instructor = User.query.get(session.instructor_id)
-            if instructor:
-                session_data['instructor_name'] = instructor.name
-        
-        schedule[day_index].append(session_data)
+    schedule = serialize_weekly_schedule(sessions)  # 0=Monday to 6=Sunday
     
     return jsonify({
         'schedule': schedule,
@@ -952,7 +1067,12 @@ def weekly_schedule():
 
 @bookings_bp.route('/public/sessions/<studio_slug>', methods=['GET'])
 def public_list_sessions(studio_slug):
-    """List available sessions for a studio (public - no auth required)."""
+    """
+    List available sessions for a studio (public - no auth required).
+    
+    Responses are cached per date window and carry a strong ETag, so
+    clients polling availability with If-None-Match get a 304.
+    """
     studio = Studio.query.filter_by(slug=studio_slug).first()
     
     if not studio:
@@ -972,207 +1092,60 @@ def public_list_sessions(studio_slug):
     else:
         end_date = start_date + timedelta(days=7)
     
-    # First try to get actual ClassSessions
-    sessions = ClassSession.query.filter(
-        ClassSession.studio_id == studio.id,
-        ClassSession.date >= start_date,
-        ClassSession.date <= end_date,
-        ClassSession.status != 'CANCELLED'
-    ).order_by(ClassSession.date, ClassSession.start_time).all()
-    
-    if sessions:
-        result = []
-        for session in sessions:
-            dance_class = DanceClass.query.get(session.class_id) if session.class_id else None
-            # Get instructor name if available
-            instructor_name = 'Instructor'
-            if dance_class:
-                # Prefer instructor_name field, fallback to instructor_id lookup
-                if dance_class.instructor_name:
-                    instructor_name = dance_class.instructor_name
-                elif dance_class.instructor_id:
-                    from app.models import User
-                    instructor = User.query.get(dance_class.instructor_id)
-                    if instructor:
-                        instructor_name = instructor.name
-            
-            session_data = {
-                'id': session.id,
-                'class_name': dance_class.name if dance_class else 'Class',
-                'style': dance_class.dance_style if dance_class else '',
-                'level': dance_class.level if dance_class else 'All Levels',
-                'instructor_name': instructor_name,
-                'start_time': session.start_time.isoformat() if session.start_time else datetime.combine(session.date, datetime.strptime('18:00', '%H:%M').time()).isoformat(),
-                'end_time': session.end_time.isoformat() if session.end_time else datetime.combine(session.date, datetime.strptime('19:00', '%H:%M').time()).isoformat(),
-                'date': session.date.isoformat(),
-                'spots_available': session.available_spots if hasattr(session, 'available_spots') else (session.max_capacity - (session.booked_count or 0)),
-                'max_students': session.max_capacity,
-                'drop_in_price': float(dance_class.price) if dance_class and dance_class.price else 500,
-                'is_cancelled': session.status == 'CANCELLED'
-            }
-            
-            # Add class details if available
-            if dance_class:
-                # Refresh to get latest data from database
-                db.session.refresh(dance_class)
-                session_data['class_id'] = dance_class.id
-                session_data['class_description'] = dance_class.description or ''
-                # Get images/videos - ensure we get actual data, not empty arrays
-                session_data['class_images'] = dance_class.images if dance_class.images else []
-                session_data['class_videos'] = dance_class.videos if dance_class.videos else []
-                session_data['instructor_description'] = dance_class.instructor_description or ''
-                session_data['instructor_instagram_handle'] = dance_class.instructor_instagram_handle or ''
-                session_data['class_price'] = float(dance_class.price) if dance_class.price else 500
-                session_data['class_capacity'] = dance_class.max_capacity
-                session_data['class_duration'] = dance_class.duration_minutes
-                
-                # Debug logging
-                current_app.logger.info(f"Session {session.id} - Class {dance_class.name} - Images: {session_data['class_images']}, Videos: {session_data['class_videos']}")
-            
-            result.append(session_data)
-        return jsonify({'sessions': result})
-    
-    # Fallback: Generate sessions from ClassSchedules with specific_date
-    schedules = ClassSchedule.query.join(DanceClass).filter(
-        DanceClass.studio_id == studio.id,
-        DanceClass.is_active == True,
-        ClassSchedule.specific_date >= start_date,
-        ClassSchedule.specific_date <= end_date,
-        ClassSchedule.is_cancelled == False
-    ).order_by(ClassSchedule.specific_date, ClassSchedule.start_time).all()
-    
-    result = []
-    for schedule in schedules:
-        dance_class = schedule.dance_class
-        # Get instructor name if available
-        instructor_name = 'Instructor'
-        if dance_class:
-            # Prefer instructor_name field, fallback to instructor_id lookup
-            if dance_class.instructor_name:
-                instructor_name = dance_class.instructor_name
-            elif dance_class.instructor_id:
-                from app.models import User
-                instructor = User.query.get(dance_class.instructor_id)
-                if instructor:
-                    instructor_name = instructor.name
-            
-            schedule_data = {
-                'id': schedule.id,
-                'schedule_id': schedule.id,  # Mark this as a schedule
-                'class_name': dance_class.name,
-                'style': dance_class.dance_style,
-                'level': dance_class.level,
-                'instructor_name': instructor_name,
-                'start_time': datetime.combine(schedule.specific_date or datetime.utcnow().date(), schedule.start_time).isoformat() if schedule.start_time else datetime.combine(schedule.specific_date or datetime.utcnow().date(), datetime.strptime('18:00', '%H:%M').time()).isoformat(),
-                'end_time': datetime.combine(schedule.specific_date or datetime.utcnow().date(), schedule.end_time).isoformat() if schedule.end_time else datetime.combine(schedule.specific_date or datetime.utcnow().date(), datetime.strptime('19:00', '%H:%M').time()).isoformat(),
-                'date': schedule.specific_date.isoformat() if schedule.specific_date else datetime.utcnow().date().isoformat(),
-                'spots_available': dance_class.max_capacity - (schedule.current_enrollment or 0),
-                'max_students': dance_class.max_capacity,
-                'drop_in_price': float(dance_class.price) if dance_class.price else 500,
-                'is_cancelled': schedule.is_cancelled
-            }
-            
-            # Add class details - IMPORTANT: Get fresh data from database
-            schedule_data['class_id'] = dance_class.id
-            schedule_data['class_description'] = dance_class.description or ''
-            # Ensure we get the actual images/videos from the database
-            # Refresh the object to get latest data
-            db.session.refresh(dance_class)
-            schedule_data['class_images'] = dance_class.images if dance_class.images else []
-            schedule_data['class_videos'] = dance_class.videos if dance_class.videos else []
-            schedule_data['instructor_description'] = dance_class.instructor_description or ''
-            schedule_data['instructor_instagram_handle'] = dance_class.instructor_instagram_handle or ''
-            schedule_data['class_price'] = float(dance_class.price) if dance_class.price else 500
-            schedule_data['class_capacity'] = dance_class.max_capacity
-            schedule_data['class_duration'] = dance_class.duration_minutes
-            
-            # Debug logging
-            current_app.logger.info(f"Schedule {schedule.id} - Class {dance_class.name} - Images: {schedule_data['class_images']}, Videos: {schedule_data['class_videos']}")
-            
-            result.append(schedule_data)
-    
-    return jsonify({'sessions': result})
-
-
-@bookings_bp.route('/public/book', methods=['POST'])
-def public_create_booking():
-    """Create a booking from public booking page (no auth required)."""
-    data = request.get_json()
-    
-    # Validate required fields
-    required = ['studio_slug', 'session_id', 'customer_name', 'customer_phone']
-    for field in required:
-        if not data.get(field):
-            return jsonify({'error': f'{field} is required'}), 400
-    
-    # Find studio
-    studio = Studio.query.filter_by(slug=data['studio_slug']).first()
-    if not studio:
-        return jsonify({'error': 'Studio not found'}), 404
-    
-    session_id = data['session_id']
-    
-    # Try to find existing ClassSession
-    session = ClassSession.query.get(session_id)
-    
-    if not session:
-        # Maybe it's a schedule ID - create a session from it
-        schedule = ClassSchedule.query.get(session_id)
-        if not schedule:
-            return jsonify({'error': 'Session not found'}), 404
+    def render():
+        # Sessions are materialized from class schedules in the background
+        # (see SessionMaterializer), so schedules never need to be read here
+        sessions = ClassSession.query.filter(
+            ClassSession.studio_id == studio.id,
+            ClassSession.date >= start_date,
+            ClassSession.date <= end_date,
+            ClassSession.status != 'CANCELLED'
+        ).order_by(ClassSession.date, ClassSession.start_time).all()
         
-        dance_class = schedule.dance_class
-        
-        # Create a ClassSession from the schedule
-        session = ClassSession(
-            id=str(uuid.uuid4()),
-            studio_id=studio.id,
-            schedule_id=schedule.id,
-            class_id=dance_class.id,
-            date=schedule.date,
-            start_time=datetime.combine(schedule.date, schedule.start_time.time()) if schedule.start_time else datetime.combine(schedule.date, datetime.strptime('18:00', '%H:%M').time()),
-            end_time=datetime.combine(schedule.date, schedule.end_time.time()) if schedule.end_time else datetime.combine(schedule.date, datetime.strptime('19:00', '%H:%M').time()),
-            max_capacity=dance_class.max_capacity,
-            status='SCHEDULED'
-        )
-        db.session.add(session)
+        return current_app.json.dumps({'sessions': serialize_public_sessions(sessions)})
     
-    # Check availability
-    if session.is_full:
-        return jsonify({'error': 'This session is fully booked'}), 400
+    body, etag = public_schedule_cache.get_or_render(studio.id, start_date, end_date, render)
     
-    # Get class info for pricing
-    dance_class = DanceClass.query.get(session.class_id) if session.class_id else None
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def create_public_booking(studio, session, customer_name, customer_phone, customer_email=None,
+                          payment_method='pay_at_studio', razorpay_payment_id=None, razorpay_order_id=None):
+    """
+    Create a confirmed booking for a public booking page customer.
     
+    The seat must already be reserved. Finds or creates the contact and
+    notifies the studio owner. Does not commit.
+    """
     # Create or find contact
     contact = Contact.query.filter_by(
         studio_id=studio.id,
-        phone=data['customer_phone']
+        phone=customer_phone
     ).first()
     
     if not contact:
         contact = Contact(
             id=str(uuid.uuid4()),
             studio_id=studio.id,
-            name=data['customer_name'],
-            phone=data['customer_phone'],
-            email=data.get('customer_email'),
+            name=customer_name,
+            phone=customer_phone,
+            email=customer_email,
             lead_status='NEW',
             lead_source='booking_page'
         )
         db.session.add(contact)
     else:
         # Update contact info
-        contact.name = data['customer_name']
-        if data.get('customer_email'):
-            contact.email = data['customer_email']
+        contact.name = customer_name
+        if customer_email:
+            contact.email = customer_email
     
     # Create booking
     from app.services.qr_service import QRService
     
-    # Generate QR token for verification
-    qr_token = QRService.generate_qr_token()
-    
     booking = Booking(
         id=str(uuid.uuid4()),
         studio_id=studio.id,
@@ -1180,115 +1153,174 @@ def public_create_booking():
         session_id=session.id,
         booking_number=generate_booking_number(),
         status='CONFIRMED',
-        payment_method=data.get('payment_method', 'pay_at_studio'),
-        razorpay_payment_id=data.get('razorpay_payment_id'),
-        razorpay_order_id=data.get('razorpay_order_id'),
-        qr_code_token=qr_token,
+        payment_method=payment_method,
+        razorpay_payment_id=razorpay_payment_id,
+        razorpay_order_id=razorpay_order_id,
+        qr_code_token=QRService.generate_qr_token(),  # Token for QR verification
+        confirmation_status=ConfirmationStatus.PENDING.value,
         booked_at=datetime.utcnow()
     )
+    db.session.add(booking)
     
-    # Update booking count
-    session.booked_count = (session.booked_count or 0) + 1
+    # Create notification for studio owner
+    from app.routes.notifications import create_notification
+    dance_class = DanceClass.query.get(session.class_id) if session.class_id else None
+    class_name = dance_class.name if dance_class else 'Class'
+    session_date = session.date.strftime('%b %d') if session.date else ''
+    session_time = session.start_time.strftime('%H:%M') if session.start_time else ''
     
-    try:
-        db.session.add(booking)
-        
-        # Create notification for studio owner
-        from app.routes.notifications import create_notification
-        class_name = dance_class.name if dance_class else 'Class'
-        session_date = session.date.strftime('%b %d') if session.date else ''
-        session_time = session.start_time.strftime('%H:%M') if session.start_time else ''
+    create_notification(
+        studio_id=studio.id,
+        notification_type='BOOKING',
+        title=f'New Booking: {customer_name}',
+        message=f'{customer_name} booked {class_name} on {session_date} at {session_time}',
+        reference_type='booking',
+        reference_id=booking.id
+    )
+    
+    return booking
+
+
+def book_paid_hold(hold, razorpay_payment_id, customer_name=None, customer_phone=None, customer_email=None):
+    """
+    Turn a paid seat hold into a booking, once.
+    
+    Customer details default to the ones captured with the hold. Commits
+    and queues the booking confirmation.
+    
+    Returns:
+        The hold's booking, or None if its seat was lost and the session
+        has filled up since
+    """
+    if hold.booking_id:
+        return Booking.query.get(hold.booking_id)
+    
+    if not SeatHoldService.convert(hold):
+        db.session.rollback()
+        db.session.refresh(hold)
+        # A concurrent request may have converted it meanwhile
+        return Booking.query.get(hold.booking_id) if hold.booking_id else None
+    
+    booking = create_public_booking(
+        studio=Studio.query.get(hold.studio_id),
+        session=ClassSession.query.get(hold.session_id),
+        customer_name=customer_name or hold.customer_name or 'Customer',
+        customer_phone=customer_phone or hold.customer_phone,
+        customer_email=customer_email or hold.customer_email,
+        payment_method='online',
+        razorpay_payment_id=razorpay_payment_id,
+        razorpay_order_id=hold.razorpay_order_id
+    )
+    hold.booking_id = booking.id
+    db.session.commit()
+    
+    # QR code, PDF and customer notification are produced in the background
+    BookingConfirmation.enqueue(booking.id)
+    return booking
+
+
+def public_booking_summary(booking):
+    """Booking details returned to the public booking page."""
+    session = ClassSession.query.get(booking.session_id)
+    dance_class = DanceClass.query.get(session.class_id) if session.class_id else None
+    return {
+        'id': booking.id,
+        'booking_number': booking.booking_number,
+        'status': booking.status,
+        'qr_code_url': booking.qr_code_url,
+        'pdf_url': booking.pdf_url,
+        'confirmation_status': booking.confirmation_status,
+        'class_name': dance_class.name if dance_class else 'Class',
+        'date': session.date.isoformat(),
+        'time': session.start_time.strftime('%H:%M') if session.start_time else None
+    }
+
+
+@bookings_bp.route('/public/book', methods=['POST'])
+def public_create_booking():
+    """Create a booking from public booking page (no auth required)."""
+    data = request.get_json()
+    
+    # Validate required fields
+    required = ['studio_slug', 'session_id', 'customer_name', 'customer_phone']
+    for field in required:
+        if not data.get(field):
+            return jsonify({'error': f'{field} is required'}), 400
+    
+    # Find studio
+    studio = Studio.query.filter_by(slug=data['studio_slug']).first()
+    if not studio:
+        return jsonify({'error': 'Studio not found'}), 404
+    
+    # Paid checkouts already hold a seat (usually booked by payment verification)
+    if data.get('razorpay_order_id'):
+        hold = SeatHold.query.filter_by(
+            razorpay_order_id=data['razorpay_order_id'],
+            studio_id=studio.id
+        ).first()
+        if hold:
+            booking = book_paid_hold(
+                hold,
+                data.get('razorpay_payment_id'),
+                customer_name=data['customer_name'],
+                customer_phone=data['customer_phone'],
+                customer_email=data.get('customer_email')
+            )
+            if not booking:
+                return jsonify({'error': 'Your seat hold expired and this session is now fully booked'}), 409
+            return jsonify({
+                'message': 'Booking confirmed',
+                'booking': public_booking_summary(booking)
+            }), 201
+    
+    session_id = data['session_id']
+    
+    # Try to find existing ClassSession
+    session = ClassSession.query.get(session_id)
+    
+    if not session:
+        # Older booking pages may still send a schedule ID - use (or create)
+        # that schedule's session on its date
+        schedule = ClassSchedule.query.get(session_id)
+        session_date = None
+        if schedule and schedule.studio_id == studio.id:
+            if data.get('date'):
+                try:
+                    session_date = datetime.fromisoformat(data['date']).date()
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            else:
+                session_date = schedule.specific_date
+        if not session_date:
+            return jsonify({'error': 'Session not found'}), 404
         
-        create_notification(
-            studio_id=studio.id,
-            notification_type='BOOKING',
-            title=f'New Booking: {data["customer_name"]}',
-            message=f'{data["customer_name"]} booked {class_name} on {session_date} at {session_time}',
-            reference_type='booking',
-            reference_id=booking.id
+        session = SessionMaterializer.session_for_schedule(schedule, session_date)
+    
+    # Reserve a seat atomically (released by the rollback on any failure below)
+    if not SeatAllocator.reserve_seat(session):
+        db.session.rollback()
+        return jsonify({'error': 'This session is fully booked'}), 400
+    
+    try:
+        booking = create_public_booking(
+            studio=studio,
+            session=session,
+            customer_name=data['customer_name'],
+            customer_phone=data['customer_phone'],
+            customer_email=data.get('customer_email'),
+            payment_method=data.get('payment_method', 'pay_at_studio'),
+            razorpay_payment_id=data.get('razorpay_payment_id'),
+            razorpay_order_id=data.get('razorpay_order_id')
         )
         
         db.session.commit()
         
-        # Generate QR code and PDF, then send notification
-        try:
-            from flask import current_app
-            current_app.logger.info(f"[QR] Starting QR/PDF generation for booking {booking.booking_number}")
-            
-            from app.services.notification_service import NotificationService
-            
-            # Prepare booking data for PDF
-            booking_pdf_data = {
-                'booking_number': booking.booking_number,
-                'customer_name': contact.name,
-                'customer_email': contact.email or '',
-                'customer_phone': contact.phone or '',
-                'class_name': class_name,
-                'session_date': session_date,
-                'session_time': session_time,
-                'studio_name': studio.name,
-                'studio_address': f"{studio.address}, {studio.city}" if studio.address and studio.city else studio.address or '',
-                'payment_method': booking.payment_method,
-                'amount': float(dance_class.price_per_class) if dance_class and dance_class.price_per_class else 0,
-            }
-            
-            current_app.logger.info(f"[QR] Booking data prepared, calling QRService...")
-            
-            # Generate and upload QR code + PDF
-            qr_url, pdf_url = QRService.generate_and_upload_booking_assets(
-                booking_number=booking.booking_number,
-                qr_token=qr_token,
-                booking_data=booking_pdf_data,
-                studio_id=studio.id
-            )
-            
-            current_app.logger.info(f"[QR] QRService returned: qr_url={qr_url}, pdf_url={pdf_url}")
-            
-            # Update booking with URLs
-            if qr_url and pdf_url:
-                booking.qr_code_url = qr_url
-                booking.pdf_url = pdf_url
-                db.session.commit()
-                current_app.logger.info(f"[QR] URLs saved to booking successfully")
-                
-                # Send notification to customer
-                contact_data = {
-                    'name': contact.name,
-                    'email': contact.email,
-                    'phone': contact.phone
-                }
-                
-                try:
-                    NotificationService.send_booking_confirmation(
-                        contact_data=contact_data,
-                        booking_data=booking_pdf_data,
-                        pdf_url=pdf_url
-                    )
-                    current_app.logger.info(f"[QR] Notification sent successfully")
-                except Exception as notify_error:
-                    current_app.logger.error(f"[QR] Notification failed: {str(notify_error)}")
-            else:
-                current_app.logger.warning(f"[QR] QRService returned None URLs")
-            
-        except Exception as e:
-            # Log error but don't fail the booking
-            import traceback
-            from flask import current_app
-            current_app.logger.error(f"[QR GENERATION ERROR] Failed to generate QR/PDF: {str(e)}")
-            current_app.logger.error(traceback.format_exc())
+        # QR code, PDF and customer notification are produced in the background
+        BookingConfirmation.enqueue(booking.id)
         
         return jsonify({
             'message': 'Booking confirmed',
-            'booking': {
-                'id': booking.id,
-                'booking_number': booking.booking_number,
-                'status': booking.status,
-                'qr_code_url': booking.qr_code_url,
-                'pdf_url': booking.pdf_url,
-                'class_name': dance_class.name if dance_class else 'Class',
-                'date': session.date.isoformat(),
-                'time': session.start_time.strftime('%H:%M') if session.start_time else None
-            }
+            'booking': public_booking_summary(booking)
         }), 201
         
     except Exception as e:
@@ -1320,23 +1352,7 @@ def get_session_bookings(session_id):
         session_id=session_id
     ).order_by(Booking.booked_at.desc()).all()
     
-    result = []
-    for booking in bookings:
-        # Get contact info
-        contact = Contact.query.get(booking.contact_id) if booking.contact_id else None
-        
-        result.append({
-            'id': booking.id,
-            'booking_number': booking.booking_number,
-            'customer_name': contact.name if contact else 'Unknown',
-            'customer_email': contact.email if contact else '',
-            'customer_phone': contact.phone if contact else '',
-            'status': booking.status.lower() if booking.status else 'pending',
-            'payment_method': booking.payment_method,
-            'razorpay_payment_id': booking.razorpay_payment_id,
-            'razorpay_order_id': booking.razorpay_order_id,
-            'booked_at': booking.booked_at.isoformat() if booking.booked_at else booking.created_at.isoformat()
-        })
+    result = serialize_session_bookings(bookings)
     
     return jsonify({
         'bookings': result,
@@ -1356,44 +1372,64 @@ def verify_qr_code():
     if not data.get('qr_token'):
         return jsonify({'error': 'QR token is required'}), 400
     
-    # Find booking by QR token
-    booking = Booking.query.filter_by(qr_code_token=data['qr_token']).first()
+    card = CheckInService.check_in(data['qr_token'], mark_attendance=bool(data.get('mark_attendance')))
     
-    if not booking:
+    if not card:
         return jsonify({'error': 'Invalid QR code'}), 404
     
-    # Get related data
-    contact = Contact.query.get(booking.contact_id) if booking.contact_id else None
-    session = ClassSession.query.get(booking.session_id) if booking.session_id else None
-    dance_class = DanceClass.query.get(session.class_id) if session and session.class_id else None
-    studio = Studio.query.get(booking.studio_id)
-    
-    # Mark attendance if requested
-    if data.get('mark_attendance') and not booking.attendance_marked_at:
-        booking.attendance_marked_at = datetime.utcnow()
-        booking.status = 'ATTENDED'
-        db.session.commit()
-    
     # Return booking details
     return jsonify({
         'valid': True,
-        'booking': {
-            'id': booking.id,
-            'booking_number': booking.booking_number,
-            'status': booking.status,
-            'customer_name': contact.name if contact else 'Unknown',
-            'customer_phone': contact.phone if contact else '',
-            'customer_email': contact.email if contact else '',
-            'class_name': dance_class.name if dance_class else 'N/A',
-            'session_date': session.date.strftime('%b %d, %Y') if session and session.date else 'N/A',
-            'session_time': session.start_time.strftime('%H:%M') if session and session.start_time else 'N/A',
-            'studio_name': studio.name if studio else 'N/A',
-            'payment_method': booking.payment_method,
-            'razorpay_payment_id': booking.razorpay_payment_id,
-            'booked_at': booking.booked_at.isoformat() if booking.booked_at else None,
-            'attendance_marked_at': booking.attendance_marked_at.isoformat() if booking.attendance_marked_at else None,
-            'already_attended': booking.attendance_marked_at is not None,
-        }
+        'booking': card['booking']
+    })
+
+
+@bookings_bp.route('/checkin/warm', methods=['POST'])
+@jwt_required()
+def warm_checkin_cache():
+    """Load today's bookings into the check-in cache (call when opening the door scanner)."""
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if user.role not in ['owner', 'admin', 'staff']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    today = datetime.utcnow().date()
+    cached = CheckInService.warm(
+        datetime.combine(today, datetime.min.time()),
+        datetime.combine(today, datetime.max.time()),
+        studio_id=user.studio_id
+    )
+    
+    return jsonify({'cached': cached})
+
+
+@bookings_bp.route('/checkin/sync', methods=['POST'])
+@jwt_required()
+def sync_offline_checkins():
+    """
+    Upload scans a door scanner recorded while offline.
+    
+    Body: {"scans": [{"qr_token": "...", "scanned_at": "ISO time"}, ...]}
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if user.role not in ['owner', 'admin', 'staff']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json() or {}
+    scans = data.get('scans')
+    if not isinstance(scans, list):
+        return jsonify({'error': 'scans must be a list'}), 400
+    if len(scans) > MAX_SYNC_SCANS:
+        return jsonify({'error': f'At most {MAX_SYNC_SCANS} scans per sync'}), 400
+    
+    results = CheckInService.sync(user.studio_id, scans)
+    
+    return jsonify({
+        'results': results,
+        'checked_in': sum(1 for r in results if r['result'] == 'checked_in')
     })
 
 
@@ -1408,79 +1444,32 @@ def resend_qr_code(booking_id):
     if not booking:
         return jsonify({'error': 'Booking not found'}), 404
     
-    # Get related data
-    contact = Contact.query.get(booking.contact_id) if booking.contact_id else None
-    session = ClassSession.query.get(booking.session_id) if booking.session_id else None
-    dance_class = DanceClass.query.get(session.class_id) if session and session.class_id else None
-    studio = Studio.query.get(booking.studio_id)
-    
-    if not contact or not studio:
+    if not booking.contact_id or not Studio.query.get(booking.studio_id):
         return jsonify({'error': 'Required booking data not found'}), 500
     
-    try:
-        from app.services.qr_service import QRService
-        from app.services.notification_service import NotificationService
-        
-        # Prepare booking data
-        session_date = session.date.strftime('%b %d, %Y') if session and session.date else 'N/A'
-        session_time = session.start_time.strftime('%H:%M') if session and session.start_time else 'N/A'
-        
-        booking_pdf_data = {
-            'booking_number': booking.booking_number,
-            'customer_name': contact.name,
-            'customer_email': contact.email or '',
-            'customer_phone': contact.phone or '',
-            'class_name': dance_class.name if dance_class else 'Class',
-            'session_date': session_date,
-            'session_time': session_time,
-            'studio_name': studio.name,
-            'studio_address': f"{studio.address}, {studio.city}" if studio.address and studio.city else studio.address or '',
-            'payment_method': booking.payment_method or 'N/A',
-            'amount': float(dance_class.price_per_class) if dance_class and dance_class.price_per_class else 0,
-        }
-        
-        # Regenerate QR code and PDF (use existing token)
-        if not booking.qr_code_token:
-            booking.qr_code_token = QRService.generate_qr_token()
-            db.session.commit()
-        
-        qr_url, pdf_url = QRService.generate_and_upload_booking_assets(
-            booking_number=booking.booking_number,
-            qr_token=booking.qr_code_token,
-            booking_data=booking_pdf_data,
-            studio_id=studio.id
-        )
-        
-        if not qr_url or not pdf_url:
-            return jsonify({'error': 'Failed to generate QR code/PDF'}), 500
-        
-        # Update booking
-        booking.qr_code_url = qr_url
-        booking.pdf_url = pdf_url
-        db.session.commit()
-        
-        # Resend notification
-        contact_data = {
-            'name': contact.name,
-            'email': contact.email,
-            'phone': contact.phone
-        }
-        
-        result = NotificationService.send_booking_confirmation(
-            contact_data=contact_data,
-            booking_data=booking_pdf_data,
-            pdf_url=pdf_url
-        )
-        
-        return jsonify({
-            'message': 'QR code regenerated and sent successfully',
-            'qr_code_url': qr_url,
-            'pdf_url': pdf_url,
-            'notification_sent': result
-        })
-        
-    except Exception as e:
-        import traceback
-        print(f"[RESEND QR ERROR] {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({'error': f'Failed to resend QR code: {str(e)}'}), 500
+    BookingConfirmation.reset(booking)
+    db.session.commit()
+    BookingConfirmation.enqueue(booking.id)
+    
+    return jsonify({
+        'message': 'QR code is being regenerated and will be sent shortly',
+        'booking_id': booking.id,
+        'confirmation_status': booking.confirmation_status
+    }), 202
+
+
+@bookings_bp.route('/public/booking/<booking_id>/confirmation', methods=['GET'])
+def public_booking_confirmation(booking_id):
+    """Confirmation progress of a public booking, polled by the booking page."""
+    booking = Booking.query.get(booking_id)
+    
+    if not booking:
+        return jsonify({'error': 'Booking not found'}), 404
+    
+    return jsonify({
+        'booking_id': booking.id,
+        'booking_number': booking.booking_number,
+        'confirmation_status': booking.confirmation_status,
+        'qr_code_url': booking.qr_code_url,
+        'pdf_url': booking.pdf_url
+    })
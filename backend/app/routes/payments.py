@@ -10,12 +10,20 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models import (
     User, Contact, Payment, Refund, ClassPack, ClassPackPurchase,
-    SubscriptionPlan, Subscription, Wallet, WalletTransaction,
+    SubscriptionPlan, Subscription, WalletTransaction,
     DiscountCode, Booking, ClassSession, Studio
 )
+from app.pagination import InvalidCursor, keyset_page, page_size
+from app.services.discount_codes import DiscountCodeService
+from app.services.payment_webhooks import PaymentWebhookService, event_id_for
+from app.services.razorpay_clients import razorpay_clients
+from app.services.refunds import RefundAccounting
+from app.services.sequences import NumberSequenceService
+from app.services.wallet_ledger import WalletLedger
 
 payments_bp = Blueprint('payments', __name__, url_prefix='/api/payments')
 
@@ -81,7 +89,8 @@ def demo_create_order():
     discount_amount, discount_error = calculate_discount(
         amount, 
         data.get('discount_code'),
-        user.studio_id
+        user.studio_id,
+        data['purchase_type']
     )
     
     if discount_error and data.get('discount_code'):
@@ -93,9 +102,10 @@ def demo_create_order():
     total_amount = subtotal + tax_amount
     
     # Check wallet balance if requested
+    wallet = None
     wallet_deduction = Decimal('0')
     if data.get('use_wallet'):
-        wallet = Wallet.query.filter_by(contact_id=data['contact_id']).first()
+        wallet = WalletLedger.wallet_for(user.studio_id, data['contact_id'])
         if wallet and wallet.balance > 0:
             wallet_deduction = min(wallet.balance, total_amount)
             total_amount -= wallet_deduction
@@ -127,20 +137,16 @@ def demo_create_order():
     
     # Deduct from wallet if applicable
     if wallet_deduction > 0:
-        wallet = Wallet.query.filter_by(contact_id=data['contact_id']).first()
-        wallet.balance -= wallet_deduction
-        
-        transaction = WalletTransaction(
-            id=str(uuid.uuid4()),
-            wallet_id=wallet.id,
-            type='DEBIT',
-            amount=wallet_deduction,
-            balance_after=wallet.balance,
+        debited = WalletLedger.debit(
+            wallet,
+            wallet_deduction,
             description=f'Payment for {data["purchase_type"]}',
             reference_type='payment',
             reference_id=payment.id
         )
-        db.session.add(transaction)
+        if not debited:
+            db.session.rollback()
+            return jsonify({'error': 'Wallet balance changed, please try again'}), 409
     
     db.session.commit()
     
@@ -275,7 +281,7 @@ def demo_quick_payment():
     
     # Calculate amounts
     amount = Decimal(str(data['amount']))
-    discount_amount, _ = calculate_discount(amount, data.get('discount_code'), user.studio_id)
+    discount_amount, _ = calculate_discount(amount, data.get('discount_code'), user.studio_id, data.get('purchase_type'))
     subtotal = amount - discount_amount
     tax_rate = Decimal('18')
     tax_amount = subtotal * (tax_rate / Decimal('100'))
@@ -328,83 +334,24 @@ def demo_quick_payment():
     })
 
 
-# Razorpay client (initialized lazily)
-_razorpay_client = None
-
-
-def get_razorpay_client():
-    """Get or create Razorpay client."""
-    global _razorpay_client
-    if _razorpay_client is None:
-        try:
-            import razorpay
-            _razorpay_client = razorpay.Client(
-                auth=(
-                    os.getenv('RAZORPAY_KEY_ID', ''),
-                    os.getenv('RAZORPAY_KEY_SECRET', '')
-                )
-            )
-        except ImportError:
-            return None
-    return _razorpay_client
+def get_razorpay_client(studio=None):
+    """Get the pooled Razorpay client for a studio's keys (or the default keys)."""
+    return razorpay_clients.get(studio)[0]
 
 
 def generate_payment_number():
     """Generate unique payment number."""
-    year = datetime.utcnow().year
-    count = Payment.query.filter(
-        db.extract('year', Payment.created_at) == year
-    ).count()
-    return f"PAY-{year}-{str(count + 1).zfill(5)}"
+    return NumberSequenceService.next_number('PAY')
 
 
 def generate_invoice_number(studio_id):
-    """Generate unique invoice number."""
-    year = datetime.utcnow().year
-    count = Payment.query.filter(
-        Payment.studio_id == studio_id,
-        db.extract('year', Payment.created_at) == year,
-        Payment.invoice_number.isnot(None)
-    ).count()
-    return f"INV-{year}-{str(count + 1).zfill(5)}"
-
-
-def calculate_discount(amount, discount_code_str, studio_id):
-    """Calculate discount amount from code."""
-    if not discount_code_str:
-        return Decimal('0'), None
-    
-    code = DiscountCode.query.filter_by(
-        code=discount_code_str.upper(),
-        studio_id=studio_id,
-        is_active=True
-    ).first()
-    
-    if not code:
-        return Decimal('0'), 'Invalid discount code'
-    
-    # Check validity
-    now = datetime.utcnow()
-    if code.valid_from and now < code.valid_from:
-        return Decimal('0'), 'Discount code not yet valid'
-    if code.valid_until and now > code.valid_until:
-        return Decimal('0'), 'Discount code expired'
-    
-    # Check usage limit
-    if code.max_uses and code.uses_count >= code.max_uses:
-        return Decimal('0'), 'Discount code usage limit reached'
-    
-    # Check minimum amount
-    if code.minimum_amount and amount < code.minimum_amount:
-        return Decimal('0'), f'Minimum purchase of ₹{code.minimum_amount} required'
-    
-    # Calculate discount
-    if code.discount_type == 'PERCENTAGE':
-        discount = amount * (code.discount_value / Decimal('100'))
-    else:
-        discount = code.discount_value
-    
-    return min(discount, amount), None
+    """Generate unique invoice number (numbered per studio)."""
+    return NumberSequenceService.next_number('INV', studio_id)
+
+
+def calculate_discount(amount, discount_code_str, studio_id, purchase_type=None):
+    """Calculate discount amount from code (validated from the discount code cache)."""
+    return DiscountCodeService.calculate(amount, discount_code_str, studio_id, purchase_type)
 
 
 # ============================================================
@@ -448,7 +395,8 @@ def create_order():
     discount_amount, discount_error = calculate_discount(
         amount, 
         data.get('discount_code'),
-        user.studio_id
+        user.studio_id,
+        data['purchase_type']
     )
     
     if discount_error and data.get('discount_code'):
@@ -464,9 +412,10 @@ def create_order():
     total_amount = subtotal + tax_amount
     
     # Check wallet balance if requested
+    wallet = None
     wallet_deduction = Decimal('0')
     if data.get('use_wallet'):
-        wallet = Wallet.query.filter_by(contact_id=data['contact_id']).first()
+        wallet = WalletLedger.wallet_for(user.studio_id, data['contact_id'])
         if wallet and wallet.balance > 0:
             wallet_deduction = min(wallet.balance, total_amount)
             total_amount -= wallet_deduction
@@ -491,8 +440,8 @@ def create_order():
     )
     
     # Create Razorpay order if amount > 0
+    client, key_id, _ = razorpay_clients.get(user.studio)
     if total_amount > 0:
-        client = get_razorpay_client()
         if not client:
             return jsonify({'error': 'Payment provider not configured'}), 500
         
@@ -517,32 +466,31 @@ def create_order():
         payment.status = 'COMPLETED'
         payment.completed_at = datetime.utcnow()
         payment.invoice_number = generate_invoice_number(user.studio_id)
+        if discount_amount > 0 and not DiscountCodeService.record_use(user.studio_id, data.get('discount_code')):
+            db.session.rollback()
+            return jsonify({'error': 'Discount code usage limit reached'}), 409
     
     db.session.add(payment)
     
     # Deduct from wallet if applicable
     if wallet_deduction > 0:
-        wallet = Wallet.query.filter_by(contact_id=data['contact_id']).first()
-        wallet.balance -= wallet_deduction
-        
-        transaction = WalletTransaction(
-            id=str(uuid.uuid4()),
-            wallet_id=wallet.id,
-            type='DEBIT',
-            amount=wallet_deduction,
-            balance_after=wallet.balance,
+        debited = WalletLedger.debit(
+            wallet,
+            wallet_deduction,
             description=f'Payment for {data["purchase_type"]}',
             reference_type='payment',
             reference_id=payment.id
         )
-        db.session.add(transaction)
+        if not debited:
+            db.session.rollback()
+            return jsonify({'error': 'Wallet balance changed, please try again'}), 409
     
     db.session.commit()
     
     return jsonify({
         'payment_id': payment.id,
         'razorpay_order_id': payment.provider_order_id,
-        'razorpay_key_id': os.getenv('RAZORPAY_KEY_ID'),
+        'razorpay_key_id': key_id,
         'amount': float(amount),
         'discount_amount': float(discount_amount),
         'tax_amount': float(tax_amount),
@@ -586,14 +534,14 @@ def verify_payment():
         return jsonify({'error': 'Payment already completed'}), 400
     
     # Verify signature
-    client = get_razorpay_client()
+    client, _, key_secret = razorpay_clients.get(user.studio)
     if not client:
         return jsonify({'error': 'Payment provider not configured'}), 500
     
     try:
         # Razorpay signature verification
         message = f"{data['razorpay_order_id']}|{data['razorpay_payment_id']}"
-        secret = os.getenv('RAZORPAY_KEY_SECRET', '').encode('utf-8')
+        secret = key_secret.encode('utf-8')
         generated_signature = hmac.new(
             secret,
             message.encode('utf-8'),
@@ -635,11 +583,12 @@ def verify_payment():
     # Activate the purchase
     activate_purchase(payment)
     
-    # Update discount code usage
-    if payment.discount_code:
-        code = DiscountCode.query.filter_by(code=payment.discount_code.upper()).first()
-        if code:
-            code.uses_count += 1
+    # Update discount code usage. The customer has paid the discounted
+    # price by now, so a code that ran out in the meantime is only logged
+    if payment.discount_code and not DiscountCodeService.record_use(payment.studio_id, payment.discount_code):
+        current_app.logger.warning(
+            f"Discount code {payment.discount_code} was over its usage limit when payment {payment.id} completed"
+        )
     
     db.session.commit()
     
@@ -715,9 +664,15 @@ def activate_purchase(payment):
 
 @payments_bp.route('/webhook/razorpay', methods=['POST'])
 def razorpay_webhook():
-    """Handle Razorpay webhook events."""
+    """
+    Accept a Razorpay webhook event.
+
+    The event is stored and acknowledged straight away; it is processed in
+    the background (see app.services.payment_webhooks). Redeliveries of an
+    event already stored are acknowledged and dropped.
+    """
     payload = request.get_data(as_text=True)
-    signature = request.headers.get('X-Razorpay-Signature')
+    signature = request.headers.get('X-Razorpay-Signature') or ''
     
     webhook_secret = os.getenv('RAZORPAY_WEBHOOK_SECRET', '')
     
@@ -728,32 +683,24 @@ def razorpay_webhook():
         hashlib.sha256
     ).hexdigest()
     
-    if signature != expected_signature:
+    if not hmac.compare_digest(signature, expected_signature):
         return jsonify({'error': 'Invalid signature'}), 400
     
-    event = request.json
-    event_type = event.get('event')
-    
-    if event_type == 'payment.captured':
-        handle_payment_captured(event['payload']['payment']['entity'])
-    
-    elif event_type == 'payment.failed':
-        handle_payment_failed(event['payload']['payment']['entity'])
+    event = request.get_json(silent=True)
+    if not isinstance(event, dict):
+        return jsonify({'error': 'Invalid payload'}), 400
     
-    elif event_type == 'refund.created':
-        handle_refund_created(event['payload']['refund']['entity'])
-    
-    elif event_type == 'subscription.charged':
-        handle_subscription_charged(event['payload']['subscription']['entity'])
-    
-    elif event_type == 'subscription.cancelled':
-        handle_subscription_cancelled(event['payload']['subscription']['entity'])
+    event_id = event_id_for(request.headers.get('X-Razorpay-Event-Id'), payload)
+    webhook_event = PaymentWebhookService.record(event_id, event)
+    if webhook_event is None:
+        return jsonify({'status': 'duplicate'})
     
+    PaymentWebhookService.enqueue([webhook_event.ordering_key])
     return jsonify({'status': 'ok'})
 
 
 def handle_payment_captured(payment_data):
-    """Handle successful payment capture."""
+    """Handle successful payment capture. Does not commit."""
     payment = Payment.query.filter_by(
         provider_order_id=payment_data.get('order_id')
     ).first()
@@ -766,51 +713,58 @@ def handle_payment_captured(payment_data):
         payment.invoice_number = generate_invoice_number(payment.studio_id)
         
         activate_purchase(payment)
-        db.session.commit()
 
 
 def handle_payment_failed(payment_data):
-    """Handle failed payment."""
+    """Handle failed payment. Does not commit."""
     payment = Payment.query.filter_by(
         provider_order_id=payment_data.get('order_id')
     ).first()
     
-    if payment:
+    # A failed attempt doesn't undo a later successful one
+    if payment and payment.status in ['PENDING', 'PROCESSING', 'FAILED']:
         payment.status = 'FAILED'
         payment.failure_reason = payment_data.get('error_description', 'Payment failed')
-        db.session.commit()
 
 
 def handle_refund_created(refund_data):
-    """Handle refund creation."""
+    """Handle refund creation. Does not commit."""
+    # Lock the payment first: create_refund holds it while it calls Razorpay,
+    # so a refund made there is committed before it is looked up below
     payment = Payment.query.filter_by(
         provider_payment_id=refund_data.get('payment_id')
-    ).first()
+    ).with_for_update().first()
     
-    if payment:
-        refund = Refund(
-            id=str(uuid.uuid4()),
-            payment_id=payment.id,
-            amount=Decimal(str(refund_data.get('amount', 0))) / 100,
-            provider_refund_id=refund_data.get('id'),
-            status='PROCESSED',
-            processed_at=datetime.utcnow()
-        )
-        
-        db.session.add(refund)
-        
-        # Update payment status
-        total_refunded = sum(r.amount for r in payment.refunds.all()) + refund.amount
-        if total_refunded >= payment.total_amount:
-            payment.status = 'REFUNDED'
-        else:
-            payment.status = 'PARTIALLY_REFUNDED'
-        
-        db.session.commit()
+    if not payment:
+        return
+    
+    # Refunds made from the dashboard are already recorded
+    if refund_data.get('id') and Refund.query.filter_by(
+        provider_refund_id=refund_data.get('id')
+    ).first():
+        return
+    
+    refund = Refund(
+        id=str(uuid.uuid4()),
+        payment_id=payment.id,
+        amount=Decimal(str(refund_data.get('amount', 0))) / 100,
+        provider_refund_id=refund_data.get('id'),
+        status='PROCESSED',
+        processed_at=datetime.utcnow()
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(refund)
+    except IntegrityError:
+        # Recorded by a concurrent request
+        return
+    
+    # Razorpay already made the refund, so record it even past the limit
+    RefundAccounting.add_refund(payment, refund.amount, enforce_limit=False)
 
 
 def handle_subscription_charged(subscription_data):
-    """Handle subscription renewal."""
+    """Handle subscription renewal. Does not commit."""
     subscription = Subscription.query.filter_by(
         provider_subscription_id=subscription_data.get('id')
     ).first()
@@ -829,11 +783,10 @@ def handle_subscription_charged(subscription_data):
             subscription.current_period_end = datetime.utcnow() + timedelta(days=365)
         
         subscription.status = 'ACTIVE'
-        db.session.commit()
 
 
 def handle_subscription_cancelled(subscription_data):
-    """Handle subscription cancellation."""
+    """Handle subscription cancellation. Does not commit."""
     subscription = Subscription.query.filter_by(
         provider_subscription_id=subscription_data.get('id')
     ).first()
@@ -841,7 +794,16 @@ def handle_subscription_cancelled(subscription_data):
     if subscription:
         subscription.status = 'CANCELLED'
         subscription.cancelled_at = datetime.utcnow()
-        db.session.commit()
+
+
+# Event type -> (payload entity, handler)
+WEBHOOK_HANDLERS = {
+    'payment.captured': ('payment', handle_payment_captured),
+    'payment.failed': ('payment', handle_payment_failed),
+    'refund.created': ('refund', handle_refund_created),
+    'subscription.charged': ('subscription', handle_subscription_charged),
+    'subscription.cancelled': ('subscription', handle_subscription_cancelled),
+}
 
 
 # ============================================================
@@ -943,16 +905,26 @@ def create_refund(payment_id):
     data = request.get_json()
     
     # Calculate refundable amount
-    already_refunded = sum(r.amount for r in payment.refunds.all())
-    max_refundable = payment.total_amount - already_refunded
+    max_refundable = RefundAccounting.refundable(payment)
     
     refund_amount = Decimal(str(data.get('amount', max_refundable)))
     
+    if refund_amount <= 0:
+        return jsonify({'error': 'Refund amount must be positive'}), 400
+    
     if refund_amount > max_refundable:
         return jsonify({'error': f'Maximum refundable amount is ₹{max_refundable}'}), 400
     
+    # Claim the amount first so concurrent refunds can't exceed the payment.
+    # This keeps the payment row locked until the refund is committed, which
+    # the refund.created webhook waits on before checking for duplicates
+    if not RefundAccounting.add_refund(payment, refund_amount):
+        db.session.rollback()
+        payment = Payment.query.get(payment_id)
+        return jsonify({'error': f'Maximum refundable amount is ₹{RefundAccounting.refundable(payment)}'}), 409
+    
     # Create refund via Razorpay
-    client = get_razorpay_client()
+    client = get_razorpay_client(user.studio)
     if client and payment.provider_payment_id:
         try:
             razorpay_refund = client.payment.refund(payment.provider_payment_id, {
@@ -970,6 +942,7 @@ def create_refund(payment_id):
             )
             
         except Exception as e:
+            db.session.rollback()
             return jsonify({'error': f'Refund failed: {str(e)}'}), 500
     else:
         # Manual refund (cash/wallet)
@@ -984,36 +957,14 @@ def create_refund(payment_id):
         
         # Credit to wallet if requested
         if data.get('refund_to_wallet'):
-            wallet = Wallet.query.filter_by(contact_id=payment.contact_id).first()
-            if not wallet:
-                wallet = Wallet(
-                    id=str(uuid.uuid4()),
-                    studio_id=payment.studio_id,
-                    contact_id=payment.contact_id,
-                    balance=Decimal('0')
-                )
-                db.session.add(wallet)
-            
-            wallet.balance += refund_amount
-            
-            transaction = WalletTransaction(
-                id=str(uuid.uuid4()),
-                wallet_id=wallet.id,
-                type='CREDIT',
-                amount=refund_amount,
-                balance_after=wallet.balance,
+            wallet = WalletLedger.wallet_for(payment.studio_id, payment.contact_id, create=True)
+            WalletLedger.credit(
+                wallet,
+                refund_amount,
                 description=f'Refund for payment {payment.payment_number}',
                 reference_type='refund',
                 reference_id=refund.id
             )
-            db.session.add(transaction)
-    
-    # Update payment status
-    total_refunded = already_refunded + refund_amount
-    if total_refunded >= payment.total_amount:
-        payment.status = 'REFUNDED'
-    else:
-        payment.status = 'PARTIALLY_REFUNDED'
     
     db.session.add(refund)
     db.session.commit()
@@ -1171,7 +1122,7 @@ def cancel_subscription(subscription_id):
         return jsonify({'error': 'Already cancelled'}), 400
     
     # Cancel in Razorpay if applicable
-    client = get_razorpay_client()
+    client = get_razorpay_client(user.studio)
     if client and subscription.provider_subscription_id:
         try:
             client.subscription.cancel(subscription.provider_subscription_id)
@@ -1206,18 +1157,9 @@ def get_wallet():
     if not contact_id:
         return jsonify({'error': 'contact_id is required'}), 400
     
-    wallet = Wallet.query.filter_by(contact_id=contact_id).first()
-    
-    if not wallet:
-        # Create wallet if doesn't exist
-        wallet = Wallet(
-            id=str(uuid.uuid4()),
-            studio_id=user.studio_id,
-            contact_id=contact_id,
-            balance=Decimal('0')
-        )
-        db.session.add(wallet)
-        db.session.commit()
+    # Create wallet if doesn't exist
+    wallet = WalletLedger.wallet_for(user.studio_id, contact_id, create=True)
+    db.session.commit()
     
     return jsonify(wallet.to_dict())
 
@@ -1225,7 +1167,14 @@ def get_wallet():
 @payments_bp.route('/wallet/transactions', methods=['GET'])
 @jwt_required()
 def wallet_transactions():
-    """Get wallet transaction history."""
+    """
+    Get wallet transaction history, newest first.
+    
+    Query params:
+        contact_id: Contact whose wallet to list
+        limit: Page size (default 100, max 500)
+        cursor: next_cursor of the previous page
+    """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
     
@@ -1234,21 +1183,66 @@ def wallet_transactions():
     if not contact_id:
         return jsonify({'error': 'contact_id is required'}), 400
     
-    wallet = Wallet.query.filter_by(contact_id=contact_id).first()
+    wallet = WalletLedger.wallet_for(user.studio_id, contact_id)
     
     if not wallet:
-        return jsonify({'transactions': [], 'balance': 0})
+        return jsonify({'transactions': [], 'balance': 0, 'next_cursor': None})
     
-    transactions = WalletTransaction.query.filter_by(
-        wallet_id=wallet.id
-    ).order_by(WalletTransaction.created_at.desc()).limit(50).all()
+    try:
+        transactions, next_cursor = keyset_page(
+            WalletTransaction.query.filter_by(wallet_id=wallet.id),
+            WalletTransaction.created_at,
+            WalletTransaction.id,
+            cursor=request.args.get('cursor'),
+            limit=page_size(request.args.get('limit'))
+        )
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'transactions': [t.to_dict() for t in transactions],
-        'balance': float(wallet.balance)
+        'balance': float(wallet.balance or 0),
+        'next_cursor': next_cursor
     })
 
 
+@payments_bp.route('/wallet/statement', methods=['GET'])
+@jwt_required()
+def wallet_statement():
+    """
+    Get a wallet's opening/closing balance and totals over a date range.
+    
+    Query params:
+        contact_id: Contact whose wallet to report
+        start_date: First day (YYYY-MM-DD)
+        end_date: Last day, inclusive (YYYY-MM-DD, default today)
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    contact_id = request.args.get('contact_id')
+    
+    if not contact_id or not request.args.get('start_date'):
+        return jsonify({'error': 'contact_id and start_date are required'}), 400
+    
+    try:
+        start = datetime.strptime(request.args['start_date'], '%Y-%m-%d')
+        end = datetime.strptime(request.args['end_date'], '%Y-%m-%d') if request.args.get('end_date') else datetime.utcnow()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    
+    if end <= start:
+        return jsonify({'error': 'end_date must not be before start_date'}), 400
+    
+    wallet = WalletLedger.wallet_for(user.studio_id, contact_id)
+    
+    if not wallet:
+        return jsonify({'error': 'Wallet not found'}), 404
+    
+    return jsonify(WalletLedger.statement(wallet.id, start, end))
+
+
 @payments_bp.route('/wallet/add-funds', methods=['POST'])
 @jwt_required()
 def add_wallet_funds():
@@ -1268,30 +1262,11 @@ def add_wallet_funds():
     if not contact_id or amount <= 0:
         return jsonify({'error': 'Valid contact_id and amount required'}), 400
     
-    wallet = Wallet.query.filter_by(contact_id=contact_id).first()
-    
-    if not wallet:
-        wallet = Wallet(
-            id=str(uuid.uuid4()),
-            studio_id=user.studio_id,
-            contact_id=contact_id,
-            balance=Decimal('0')
-        )
-        db.session.add(wallet)
-    
-    wallet.balance += amount
-    
-    transaction = WalletTransaction(
-        id=str(uuid.uuid4()),
-        wallet_id=wallet.id,
-        type='CREDIT',
-        amount=amount,
-        balance_after=wallet.balance,
-        description=description,
-        reference_type='manual'
-    )
+    if not Contact.query.filter_by(id=contact_id, studio_id=user.studio_id).first():
+        return jsonify({'error': 'Contact not found'}), 404
     
-    db.session.add(transaction)
+    wallet = WalletLedger.wallet_for(user.studio_id, contact_id, create=True)
+    WalletLedger.credit(wallet, amount, description=description, reference_type='manual')
     db.session.commit()
     
     return jsonify({
@@ -1367,7 +1342,10 @@ def validate_discount_code():
     code_str = data.get('code', '').upper()
     amount = Decimal(str(data.get('amount', 0)))
     
-    discount, error = calculate_discount(code_str, code_str, user.studio_id)
+    if not code_str:
+        return jsonify({'valid': False, 'error': 'Invalid discount code'})
+    
+    discount, error = calculate_discount(amount, code_str, user.studio_id, data.get('purchase_type'))
     
     if error:
         return jsonify({'valid': False, 'error': error})
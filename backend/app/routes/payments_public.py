@@ -10,7 +10,9 @@ from datetime import datetime
 from decimal import Decimal
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models import Studio
+from app.models import Studio, SeatHold
+from app.services.razorpay_clients import razorpay_clients
+from app.services.seat_holds import SeatHoldService
 
 payments_public_bp = Blueprint('payments_public', __name__, url_prefix='/api/payments')
 
@@ -43,6 +45,7 @@ def admin_set_razorpay_keys():
     studio.razorpay_key_secret = data['razorpay_key_secret']
     
     db.session.commit()
+    razorpay_clients.invalidate(studio.id)
     
     return jsonify({
         'success': True,
@@ -53,26 +56,8 @@ def admin_set_razorpay_keys():
 
 
 def get_studio_razorpay_client(studio):
-    """Get Razorpay client using studio-specific keys."""
-    try:
-        import razorpay
-        
-        key_id = studio.razorpay_key_id if studio else None
-        key_secret = studio.razorpay_key_secret if studio else None
-        
-        # Fall back to environment variables
-        if not key_id:
-            key_id = os.getenv('RAZORPAY_KEY_ID', '')
-        if not key_secret:
-            key_secret = os.getenv('RAZORPAY_KEY_SECRET', '')
-        
-        if not key_id or not key_secret:
-            return None, None, None
-            
-        client = razorpay.Client(auth=(key_id, key_secret))
-        return client, key_id, key_secret
-    except ImportError:
-        return None, None, None
+    """Get Razorpay client using studio-specific keys (pooled per studio)."""
+    return razorpay_clients.get(studio)
 
 
 @payments_public_bp.route('/public/create-order', methods=['POST'])
@@ -97,6 +82,7 @@ def public_create_order():
     
     # SECURITY: Validate amount against actual session price
     session_id = data.get('session_id')
+    session = None
     if session_id:
         session = ClassSession.query.filter_by(
             id=session_id,
@@ -106,6 +92,9 @@ def public_create_order():
         if not session:
             return jsonify({'error': 'Session not found'}), 404
         
+        if session.is_full:
+            return jsonify({'error': 'This session is fully booked'}), 400
+        
         # Get the actual price from the dance class
         if session.class_id:
             dance_class = DanceClass.query.get(session.class_id)
@@ -159,9 +148,25 @@ def public_create_order():
             }
         })
         
+        # Hold the seat while the customer pays
+        hold = None
+        if session:
+            hold = SeatHoldService.hold(
+                session,
+                razorpay_order['id'],
+                customer_name=data.get('customer_name'),
+                customer_phone=data.get('customer_phone'),
+                customer_email=data.get('customer_email')
+            )
+            if not hold:
+                db.session.rollback()
+                return jsonify({'error': 'This session is fully booked'}), 400
+            db.session.commit()
+        
         return jsonify({
             'success': True,
             'razorpay_order_id': razorpay_order['id'],
+            'hold_expires_at': hold.expires_at.isoformat() if hold else None,
             'razorpay_key_id': key_id,
             'amount': float(amount),
             'amount_in_paise': int(amount * 100),
@@ -174,6 +179,7 @@ def public_create_order():
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Failed to create payment order: {str(e)}'}), 500
 
 
@@ -212,12 +218,32 @@ def public_verify_payment():
         if generated_signature != data['razorpay_signature']:
             return jsonify({'error': 'Invalid payment signature'}), 400
         
+        # Book the seat held for this order
+        booking = None
+        hold = SeatHold.query.filter_by(
+            razorpay_order_id=data['razorpay_order_id'],
+            studio_id=studio.id
+        ).first()
+        if hold and (hold.booking_id or hold.customer_phone):
+            from app.routes.bookings import book_paid_hold, public_booking_summary
+            
+            booking = book_paid_hold(hold, data['razorpay_payment_id'])
+            if not booking:
+                return jsonify({
+                    'error': 'Your seat hold expired and this session is now fully booked',
+                    'payment_id': data['razorpay_payment_id'],
+                    'order_id': data['razorpay_order_id']
+                }), 409
+            booking = public_booking_summary(booking)
+        
         return jsonify({
             'success': True,
             'message': 'Payment verified successfully',
             'payment_id': data['razorpay_payment_id'],
-            'order_id': data['razorpay_order_id']
+            'order_id': data['razorpay_order_id'],
+            'booking': booking
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Payment verification failed: {str(e)}'}), 500
@@ -2,13 +2,70 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
-from datetime import time, datetime
+from datetime import time, datetime, timedelta
+from time import perf_counter
 
 from app.models import db, User, DanceClass, ClassSchedule, Room
 from app.scheduling import ScheduleOptimizer, ScheduleConstraints, ScheduleGenerator
+from app.services.session_materializer import SessionMaterializer
 
 scheduling_bp = Blueprint('scheduling', __name__)
 
+# Bounds for the exact engine's search, the upper one well inside the
+# worker timeout
+MIN_TIME_BUDGET_SECONDS = 0.1
+MAX_TIME_BUDGET_SECONDS = 60
+MAX_MULTISTART_STARTS = 64
+MAX_SUGGESTIONS = 20
+MAX_SUGGEST_BATCH = 20
+MAX_SUGGEST_BUDGET_MS = 5000
+
+# Longest a job progress request waits for an update. Web workers are
+# synchronous, so this stays short; clients re-issue the request to keep
+# following a job
+MAX_EVENT_WAIT_SECONDS = 5
+
+
+def _engine_options(data):
+    """
+    Engine-specific options from a request body.
+    
+    Raises ValueError for options that aren't numbers.
+    """
+    options = {}
+    engine = data.get('engine')
+    try:
+        if engine in ('exact', 'multistart') and 'time_budget_seconds' in data:
+            options['time_budget_seconds'] = max(MIN_TIME_BUDGET_SECONDS, min(
+                float(data['time_budget_seconds']), MAX_TIME_BUDGET_SECONDS
+            ))
+        if engine == 'multistart':
+            if 'starts' in data:
+                options['starts'] = max(1, min(int(data['starts']), MAX_MULTISTART_STARTS))
+            if 'seed' in data:
+                options['seed'] = int(data['seed'])
+    except (TypeError, ValueError):
+        raise ValueError('time_budget_seconds, starts and seed must be numbers')
+    return options
+
+
+def _constraints_from_request(data):
+    """
+    Optimization constraints from a request body.
+    
+    Raises ValueError for opening or closing times not in HH:MM.
+    """
+    constraints = ScheduleConstraints()
+    if 'opening_time' in data:
+        constraints.opening_time = datetime.strptime(data['opening_time'], '%H:%M').time()
+    if 'closing_time' in data:
+        constraints.closing_time = datetime.strptime(data['closing_time'], '%H:%M').time()
+    if 'max_concurrent_classes' in data:
+        constraints.max_concurrent_classes = data['max_concurrent_classes']
+    if 'prefer_beginners_in_peak' in data:
+        constraints.prefer_beginners_in_peak = data['prefer_beginners_in_peak']
+    return constraints
+
 
 @scheduling_bp.route('/classes', methods=['GET'])
 @jwt_required()
@@ -219,6 +276,10 @@ def create_schedule():
     db.session.add(schedule)
     db.session.commit()
     
+    # The public booking page lists sessions only; don't wait for the
+    # periodic materialize task to create this schedule's
+    SessionMaterializer.materialize(user.studio_id)
+    
     return jsonify(schedule.to_dict()), 201
 
 
@@ -233,8 +294,14 @@ def optimize_schedule():
         "opening_time": "09:00",
         "closing_time": "21:00",
         "max_concurrent_classes": 3,
-        "prefer_beginners_in_peak": true
+        "prefer_beginners_in_peak": true,
+        "engine": "bitset",
+        "time_budget_seconds": 10
     }
+    
+    engine is one of "greedy" (default), "bitset", "exact" or "multistart";
+    time_budget_seconds applies to "exact" and "multistart", and "starts"
+    and "seed" to "multistart".
     """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
@@ -244,20 +311,13 @@ def optimize_schedule():
     
     data = request.get_json() or {}
     
-    # Build constraints
-    constraints = ScheduleConstraints()
-    
-    if 'opening_time' in data:
-        constraints.opening_time = datetime.strptime(data['opening_time'], '%H:%M').time()
-    if 'closing_time' in data:
-        constraints.closing_time = datetime.strptime(data['closing_time'], '%H:%M').time()
-    if 'max_concurrent_classes' in data:
-        constraints.max_concurrent_classes = data['max_concurrent_classes']
-    if 'prefer_beginners_in_peak' in data:
-        constraints.prefer_beginners_in_peak = data['prefer_beginners_in_peak']
-    
     generator = ScheduleGenerator(user.studio_id)
-    result = generator.generate_optimized_schedule(constraints)
+    try:
+        result = generator.generate_optimized_schedule(
+            _constraints_from_request(data), engine=data.get('engine'), **_engine_options(data)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify(result.to_dict())
 
@@ -275,19 +335,18 @@ def save_optimized_schedule():
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    if user.role not in ['ADMIN', 'OWNER']:
+    if user.role not in ['owner', 'admin']:
         return jsonify({'error': 'Admin access required'}), 403
     
     data = request.get_json() or {}
     
-    constraints = ScheduleConstraints()
-    if 'opening_time' in data:
-        constraints.opening_time = datetime.strptime(data['opening_time'], '%H:%M').time()
-    if 'closing_time' in data:
-        constraints.closing_time = datetime.strptime(data['closing_time'], '%H:%M').time()
-    
     generator = ScheduleGenerator(user.studio_id)
-    result = generator.generate_optimized_schedule(constraints)
+    try:
+        result = generator.generate_optimized_schedule(
+            _constraints_from_request(data), engine=data.get('engine'), **_engine_options(data)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     if not result.success and len(result.schedule) == 0:
         return jsonify({
@@ -296,36 +355,231 @@ def save_optimized_schedule():
             'conflicts': result.conflicts
         }), 400
     
-    # Clear existing recurring schedules
-    ClassSchedule.query.filter_by(
-        studio_id=user.studio_id,
-        is_recurring=True
-    ).delete()
-    
-    # Save new schedule
-    schedule_ids = generator.save_schedule(result)
+    # Replace existing recurring schedules
+    schedule_ids = generator.replace_recurring_schedule(result)
     
     return jsonify({
         'success': True,
         'schedules_created': len(schedule_ids),
         'unscheduled': len(result.unscheduled),
         'utilization': result.utilization,
-        'score': result.score
+        'score': result.score,
+        'engine': result.engine,
+        'optimization_score': result.optimization_score
     })
 
 
+@scheduling_bp.route('/optimize/jobs', methods=['POST'])
+@jwt_required()
+def submit_optimize_job():
+    """
+    Run schedule optimization as a background job.
+    
+    Body: same as /optimize, plus optional "save": true to replace the
+    recurring schedule when the job finishes (admin only).
+    
+    Returns 202 with the job id. If the same constraints were already
+    optimized for unchanged studio data, the cached result is returned
+    as a completed job (unless saving).
+    """
+    from app import redis_client
+    from app.scheduling.jobs import ScheduleJobStore, constraints_to_dict
+    from app.scheduling.registry import get_optimizer
+    
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json() or {}
+    save = bool(data.get('save'))
+    
+    if save and user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    if redis_client is None:
+        return jsonify({'error': 'Background jobs are unavailable'}), 503
+    
+    engine = data.get('engine')
+    try:
+        constraints = _constraints_from_request(data)
+        engine_options = _engine_options(data)
+        get_optimizer(engine, constraints, **engine_options)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    store = ScheduleJobStore(redis_client)
+    generator = ScheduleGenerator(user.studio_id)
+    input_hash = generator.input_hash(constraints, engine, **engine_options)
+    job_id = str(uuid.uuid4())
+    
+    cached = None if save else store.cached_result(input_hash)
+    if cached is not None:
+        job = store.create(
+            job_id, user.studio_id,
+            state='completed',
+            engine=cached.get('engine'),
+            input_hash=input_hash,
+            cached=True,
+            placed=len(cached.get('schedule', [])),
+            score=cached.get('score', 0),
+            result=cached
+        )
+        return jsonify(job)
+    
+    from app.tasks import optimize_schedule_job
+    
+    job = store.create(
+        job_id, user.studio_id,
+        engine=engine or 'greedy',
+        input_hash=input_hash,
+        cached=False,
+        save=save
+    )
+    optimize_schedule_job.apply_async(
+        args=[job_id, user.studio_id, {
+            'constraints': constraints_to_dict(constraints),
+            'engine': engine,
+            'engine_options': engine_options,
+            'save': save,
+        }],
+        task_id=job_id
+    )
+    
+    return jsonify({
+        **job,
+        'status_url': f'/api/scheduling/optimize/jobs/{job_id}',
+        'events_url': f'/api/scheduling/optimize/jobs/{job_id}/events',
+    }), 202
+
+
+def _load_job(job_id):
+    """Fetch a job owned by the current user's studio, or an error response."""
+    from app import redis_client
+    from app.scheduling.jobs import ScheduleJobStore
+    
+    user = User.query.get(get_jwt_identity())
+    if not user:
+        return None, None, (jsonify({'error': 'User not found'}), 404)
+    if redis_client is None:
+        return None, None, (jsonify({'error': 'Background jobs are unavailable'}), 503)
+    
+    store = ScheduleJobStore(redis_client)
+    job = store.get(job_id)
+    if not job or job.get('studio_id') != user.studio_id:
+        return None, None, (jsonify({'error': 'Job not found'}), 404)
+    return store, job, None
+
+
+@scheduling_bp.route('/optimize/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_optimize_job(job_id):
+    """Poll a background optimization job (includes the result once completed)."""
+    store, job, error = _load_job(job_id)
+    if error:
+        return error
+    return jsonify(job)
+
+
+@scheduling_bp.route('/optimize/jobs/<job_id>/events', methods=['GET'])
+@jwt_required()
+def wait_for_optimize_job(job_id):
+    """
+    Long-poll a background job's progress.
+    
+    Query: since=<updated_at of the state the client already has>.
+    Returns the job state without the result as soon as it changes (at
+    once if it already differs from `since`), or the unchanged state after
+    MAX_EVENT_WAIT_SECONDS. Re-issue the request with the new updated_at
+    to keep following; fetch the job once its state is "completed".
+    """
+    store, job, error = _load_job(job_id)
+    if error:
+        return error
+    
+    event = store.wait_for_update(job_id, request.args.get('since'), MAX_EVENT_WAIT_SECONDS)
+    return jsonify(event or {k: v for k, v in job.items() if k != 'result'})
+
+
+@scheduling_bp.route('/optimize/incremental', methods=['POST'])
+@jwt_required()
+def reoptimize_incremental():
+    """
+    Re-plan only the classes affected by a change to the saved schedule.
+    
+    Body (optional):
+    {
+        "changed_class_ids": ["uuid"],
+        "changed_instructor_ids": ["uuid"],
+        "opening_time": "09:00",
+        "closing_time": "21:00",
+        "save": false
+    }
+    
+    Without change ids every saved row is re-checked. With "save": true the
+    diff is applied: moved rows are updated in place, removed rows cancelled.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json() or {}
+    save = bool(data.get('save'))
+    
+    if save and user.role not in ['owner', 'admin']:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    try:
+        constraints = _constraints_from_request(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    changed_class_ids = data.get('changed_class_ids')
+    changed_instructor_ids = data.get('changed_instructor_ids')
+    
+    started = perf_counter()
+    generator = ScheduleGenerator(user.studio_id)
+    incremental = generator.reoptimize_incremental(
+        changed_class_ids=set(changed_class_ids) if changed_class_ids is not None else None,
+        changed_instructor_ids=set(changed_instructor_ids) if changed_instructor_ids is not None else None,
+        constraints=constraints
+    )
+    
+    response = {
+        'success': True,
+        'diff': incremental.diff(),
+        'unscheduled': [{'id': c.id, 'name': c.name} for c in incremental.result.unscheduled],
+        'score': incremental.result.score,
+        'optimization_score': incremental.result.optimization_score,
+        'elapsed_ms': round((perf_counter() - started) * 1000, 1),
+    }
+    
+    if save and incremental.has_changes:
+        response['saved'] = generator.apply_incremental(incremental)
+    
+    return jsonify(response)
+
+
 @scheduling_bp.route('/suggest', methods=['POST'])
 @jwt_required()
 def suggest_time():
     """
-    Get suggested times for a new class.
+    Get suggested times for a new class, or for several new classes jointly.
     
     Body:
     {
         "dance_style": "salsa",
         "level": "Beginner",
-        "duration_minutes": 60
+        "duration_minutes": 60,
+        "top_k": 5,
+        "time_budget_ms": 200
     }
+    
+    or, for a batch, {"classes": [{...}, {...}], "top_k": 3}. In a batch the
+    first suggestion of every class can be accepted together.
     """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
@@ -339,18 +593,46 @@ def suggest_time():
     
     from app.scheduling.optimizer import ClassDefinition
     
-    class_def = ClassDefinition(
-        id='temp',
-        name='New Class',
-        dance_style=data.get('dance_style', 'general'),
-        level=data.get('level', 'All Levels'),
-        duration_minutes=data.get('duration_minutes', 60),
-        min_capacity=data.get('min_capacity', 3),
-        max_capacity=data.get('max_capacity', 20)
-    )
+    def class_definition(item, position):
+        return ClassDefinition(
+            id=str(item.get('id') or f'new-{position}'),
+            name=item.get('name', 'New Class'),
+            dance_style=item.get('dance_style', 'general'),
+            level=item.get('level', 'All Levels'),
+            duration_minutes=item.get('duration_minutes', 60),
+            min_capacity=item.get('min_capacity', 3),
+            max_capacity=item.get('max_capacity', 20)
+        )
+    
+    try:
+        top_k = max(1, min(int(data.get('top_k', 5)), MAX_SUGGESTIONS))
+        time_budget_ms = data.get('time_budget_ms')
+        if time_budget_ms is not None:
+            time_budget_ms = max(1, min(float(time_budget_ms), MAX_SUGGEST_BUDGET_MS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top_k and time_budget_ms must be numbers'}), 400
     
     generator = ScheduleGenerator(user.studio_id)
-    suggestions = generator.suggest_new_class_time(class_def)
+    
+    if 'classes' in data:
+        class_defs = [
+            class_definition(item, position)
+            for position, item in enumerate(data['classes'][:MAX_SUGGEST_BATCH])
+        ]
+        results = generator.suggest_new_class_times(class_defs, top_k, time_budget_ms)
+        return jsonify({
+            'results': [
+                {
+                    'class_id': c.id,
+                    'class_name': c.name,
+                    'suggestions': results.get(c.id, [])
+                }
+                for c in class_defs
+            ]
+        })
+    
+    class_def = class_definition(data, 0)
+    suggestions = generator.suggest_new_class_time(class_def, top_k, time_budget_ms)
     
     return jsonify({
         'suggestions': suggestions
@@ -367,43 +649,73 @@ def check_conflicts():
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    from app.scheduling import ConflictResolver
-    from app.scheduling.optimizer import ScheduledClass, ClassDefinition, Instructor, Room as OptRoom, TimeSlot, DayOfWeek
+    from app.scheduling.conflict_resolver import find_overlap_groups
     
     generator = ScheduleGenerator(user.studio_id)
-    current = generator.get_current_schedule()
-    
-    # Convert to ScheduledClass objects for conflict detection
-    # This is a simplified version - full implementation would load all data
-    
-    resolver = ConflictResolver()
+    current = [
+        cls for cls in generator.get_current_schedule()
+        if cls['start_time'] and cls['end_time']
+    ]
+    
+    def intervals(field):
+        for cls in current:
+            if cls.get(field):
+                yield (
+                    (cls[field], cls['day_of_week']),
+                    datetime.strptime(cls['start_time'], '%H:%M').time(),
+                    datetime.strptime(cls['end_time'], '%H:%M').time(),
+                    cls
+                )
     
-    # For now, just check for time overlaps
     conflicts = []
-    for i, cls1 in enumerate(current):
-        for cls2 in current[i+1:]:
-            if cls1['day_of_week'] == cls2['day_of_week']:
-                start1 = datetime.strptime(cls1['start_time'], '%H:%M').time()
-                end1 = datetime.strptime(cls1['end_time'], '%H:%M').time()
-                start2 = datetime.strptime(cls2['start_time'], '%H:%M').time()
-                end2 = datetime.strptime(cls2['end_time'], '%H:%M').time()
-                
-                if not (end1 <= start2 or start1 >= end2):
-                    # Check if same instructor or room
-                    if cls1.get('instructor_name') == cls2.get('instructor_name'):
-                        conflicts.append({
-                            'type': 'instructor',
-                            'description': f"Instructor double-booked: {cls1['class_name']} and {cls2['class_name']}",
-                            'classes': [cls1['id'], cls2['id']]
-                        })
-                    if cls1.get('room') == cls2.get('room'):
-                        conflicts.append({
-                            'type': 'room',
-                            'description': f"Room double-booked: {cls1['class_name']} and {cls2['class_name']}",
-                            'classes': [cls1['id'], cls2['id']]
-                        })
+    for _, group in find_overlap_groups(intervals('instructor_name')):
+        conflicts.append({
+            'type': 'instructor',
+            'description': f"Instructor double-booked: {', '.join(c['class_name'] for c in group)}",
+            'classes': [c['id'] for c in group]
+        })
+    for _, group in find_overlap_groups(intervals('room')):
+        conflicts.append({
+            'type': 'room',
+            'description': f"Room double-booked: {', '.join(c['class_name'] for c in group)}",
+            'classes': [c['id'] for c in group]
+        })
     
     return jsonify({
         'conflicts': conflicts,
         'total': len(conflicts)
     })
+
+
+@scheduling_bp.route('/conflicts/sessions', methods=['GET'])
+@jwt_required()
+def check_session_conflicts():
+    """
+    Check concrete class sessions for double-booked instructors and rooms.
+    
+    Query params:
+        start_date: YYYY-MM-DD (default: today)
+        end_date: YYYY-MM-DD (default: start_date + 14 days)
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+            if request.args.get('start_date') else datetime.utcnow().date()
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else start_date + timedelta(days=14)
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    generator = ScheduleGenerator(user.studio_id)
+    resolver = generator.detect_session_conflicts(start_date, end_date)
+    
+    return jsonify({
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        **resolver.get_conflict_summary()
+    })
@@ -7,7 +7,9 @@ import json
 
 from app import db
 from app.models import User, Studio, StudioKnowledge, DanceClass, ClassSchedule, ClassSession
+from app.services.razorpay_clients import razorpay_clients
 from app.services.s3_service import get_s3_service, S3ServiceError
+from app.services.session_materializer import SessionMaterializer
 
 studio_bp = Blueprint('studio', __name__)
 
@@ -199,6 +201,7 @@ def save_onboarding_step(step):
             # Step 2: Set Up Classes
             classes_data = data.get('classes', [])
             today = datetime.utcnow().date()
+            occurrences = []  # (schedule, class, date) to create sessions for
             
             for class_data in classes_data:
                 if class_data.get('name'):
@@ -242,21 +245,7 @@ def save_onboarding_step(step):
                                 is_recurring=False
                             )
                             db.session.add(schedule)
-                            
-                            # Create actual session instance
-                            session = ClassSession(
-                                id=str(uuid.uuid4()),
-                                studio_id=studio.id,
-                                schedule_id=schedule.id,
-                                class_id=dance_class.id,
-                                date=session_date,
-                                start_time=datetime.combine(session_date, default_start_time),
-                                end_time=datetime.combine(session_date, default_end_time),
-                                max_capacity=dance_class.max_capacity,
-                                booked_count=0,
-                                status='SCHEDULED'
-                            )
-                            db.session.add(session)
+                            occurrences.append((schedule, dance_class, session_date))
                     else:
                         # Use provided schedule
                         for sched in schedule_times:
@@ -277,20 +266,10 @@ def save_onboarding_step(step):
                                 is_recurring=False
                             )
                             db.session.add(schedule)
-                            
-                            session = ClassSession(
-                                id=str(uuid.uuid4()),
-                                studio_id=studio.id,
-                                schedule_id=schedule.id,
-                                class_id=dance_class.id,
-                                date=session_date,
-                                start_time=datetime.combine(session_date, start_time),
-                                end_time=datetime.combine(session_date, end_time),
-                                max_capacity=dance_class.max_capacity,
-                                booked_count=0,
-                                status='SCHEDULED'
-                            )
-                            db.session.add(session)
+                            occurrences.append((schedule, dance_class, session_date))
+            
+            # Create the actual session instances in one bulk insert
+            SessionMaterializer.insert_sessions(occurrences)
                     
         elif step == 3:
             # Step 3: Payment Setup
@@ -307,6 +286,8 @@ def save_onboarding_step(step):
         studio.onboarding_step = max(studio.onboarding_step, step + 1)
         
         db.session.commit()
+        if step == 3:
+            razorpay_clients.invalidate(studio.id)
         
         return jsonify({
             'success': True,
@@ -606,6 +587,7 @@ def update_payment_settings():
     
     try:
         db.session.commit()
+        razorpay_clients.invalidate(studio.id)
         return jsonify({'settings': studio.payment_settings, 'message': 'Payment settings saved'})
     except Exception as e:
         db.session.rollback()
@@ -1,5 +1,11 @@
 # Class Scheduling Module
 from .optimizer import ScheduleOptimizer, ScheduleConstraints, OptimizationResult
+from .bitset_engine import BitsetScheduleOptimizer
+from .exact_engine import ExactScheduleOptimizer
+from .multistart import MultiStartScheduleOptimizer
+from .registry import OPTIMIZER_ENGINES, get_optimizer
+from .incremental import IncrementalOptimizer, IncrementalResult
+from .snapshot import ScheduleSnapshot
 from .generator import ScheduleGenerator
 from .conflict_resolver import ConflictResolver
 
@@ -7,6 +13,14 @@ __all__ = [
     'ScheduleOptimizer',
     'ScheduleConstraints',
     'OptimizationResult',
+    'BitsetScheduleOptimizer',
+    'ExactScheduleOptimizer',
+    'MultiStartScheduleOptimizer',
+    'OPTIMIZER_ENGINES',
+    'get_optimizer',
+    'IncrementalOptimizer',
+    'IncrementalResult',
+    'ScheduleSnapshot',
     'ScheduleGenerator',
     'ConflictResolver'
 ]
@@ -0,0 +1,436 @@
+# Scheduling Benchmark - Measure optimizer engines, conflict detection and
+# suggestions on synthetic studios
+#
+# Usage:
+#   python -m app.scheduling.benchmark
+#   python -m app.scheduling.benchmark --engines greedy bitset --tiers small medium
+#   python -m app.scheduling.benchmark --output baseline.json
+#   python -m app.scheduling.benchmark --compare baseline.json
+import argparse
+import json
+import platform
+import random
+import sys
+import time as timer
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from .optimizer import (
+    ScheduleConstraints, OptimizationResult,
+    ClassDefinition, Instructor, Room, ScheduledClass, TimeSlot, DayOfWeek
+)
+from .registry import OPTIMIZER_ENGINES, get_optimizer
+from .conflict_resolver import ConflictResolver
+from .incremental import ExistingAssignment
+from .suggest import SuggestionIndex
+
+
+DANCE_STYLES = ['salsa', 'bachata', 'hip-hop', 'ballet', 'contemporary', 'jazz', 'kathak', 'bollywood']
+LEVELS = ['Beginner', 'Intermediate', 'Advanced', 'All Levels']
+ROOM_FEATURES = ['mirrors', 'sound_system', 'sprung_floor', 'barre']
+
+# Tier name -> (instructors, rooms, classes)
+SIZE_TIERS: Dict[str, Tuple[int, int, int]] = {
+    'small': (5, 2, 10),
+    'medium': (10, 5, 30),
+    'large': (20, 10, 60),
+    'xlarge': (40, 20, 120),
+}
+DEFAULT_SIZES: List[Tuple[int, int, int]] = list(SIZE_TIERS.values())
+
+# New classes ranked per tier by the suggestion benchmark
+SUGGEST_QUERIES = 10
+
+# Regression thresholds for --compare
+DEFAULT_MAX_SLOWDOWN = 1.5  # seconds may grow by this factor
+DEFAULT_MAX_MEMORY_GROWTH = 1.5  # peak memory may grow by this factor
+MIN_COMPARABLE_SECONDS = 0.01  # faster rows are too noisy to compare times
+
+
+@dataclass
+class SyntheticStudio:
+    """A randomly generated studio for benchmarking."""
+    instructors: List[Instructor]
+    rooms: List[Room]
+    classes: List[ClassDefinition]
+
+    @property
+    def size_label(self) -> str:
+        return f"{len(self.instructors)}i/{len(self.rooms)}r/{len(self.classes)}c"
+
+
+def generate_synthetic_studio(
+    num_instructors: int,
+    num_rooms: int,
+    num_classes: int,
+    seed: int = 42
+) -> SyntheticStudio:
+    """
+    Generate a deterministic synthetic studio.
+
+    Instructors get 2-4 specialties and a morning and/or evening window on
+    most days; rooms get random features; classes get a style, level,
+    duration and occasionally required features and preferred times.
+    """
+    rng = random.Random(seed)
+
+    instructors = []
+    for i in range(num_instructors):
+        availability = []
+        for day in DayOfWeek:
+            if rng.random() < 0.2:
+                continue  # Day off
+            if rng.random() < 0.6:
+                availability.append(TimeSlot(day, time(9, 0), time(rng.choice([12, 13, 14]), 0)))
+            if rng.random() < 0.8:
+                availability.append(TimeSlot(day, time(rng.choice([15, 16, 17]), 0), time(21, 0)))
+        instructors.append(Instructor(
+            id=f"instructor-{i}",
+            name=f"Instructor {i}",
+            specialties=rng.sample(DANCE_STYLES, rng.randint(2, 4)),
+            availability=availability,
+            max_hours_per_week=rng.choice([15, 20, 25])
+        ))
+
+    rooms = [
+        Room(
+            id=f"room-{r}",
+            name=f"Room {r}",
+            capacity=rng.choice([10, 15, 20, 30, 40]),
+            features=rng.sample(ROOM_FEATURES, rng.randint(1, len(ROOM_FEATURES)))
+        )
+        for r in range(num_rooms)
+    ]
+
+    classes = []
+    for c in range(num_classes):
+        min_capacity = rng.choice([3, 5, 8])
+        preferred = []
+        if rng.random() < 0.5:
+            start_hour = rng.choice([9, 10, 17, 18, 19])
+            preferred.append(TimeSlot(
+                DayOfWeek(rng.randint(0, 6)), time(start_hour, 0), time(start_hour + 2, 0)
+            ))
+        classes.append(ClassDefinition(
+            id=f"class-{c}",
+            name=f"Class {c}",
+            dance_style=rng.choice(DANCE_STYLES),
+            level=rng.choice(LEVELS),
+            duration_minutes=rng.choice([60, 60, 75, 90]),
+            min_capacity=min_capacity,
+            max_capacity=rng.choice([12, 15, 20, 25]),
+            required_features=rng.sample(ROOM_FEATURES, 1) if rng.random() < 0.3 else [],
+            preferred_times=preferred
+        ))
+
+    return SyntheticStudio(instructors=instructors, rooms=rooms, classes=classes)
+
+
+def schedule_signature(result: OptimizationResult) -> List[Tuple[str, str, str, str]]:
+    """Comparable view of a result's assignments."""
+    return [
+        (s.class_def.id, s.instructor.id, s.room.id, str(s.time_slot))
+        for s in result.schedule
+    ]
+
+
+def generate_synthetic_schedule(studio: SyntheticStudio, seed: int = 42) -> List[ScheduledClass]:
+    """
+    Randomly placed classes, ignoring every constraint.
+
+    Used as conflict-detection input: unlike optimizer output it is full of
+    double-booked instructors and rooms.
+    """
+    rng = random.Random(seed)
+    schedule = []
+    for class_def in studio.classes:
+        day = DayOfWeek(rng.randint(0, 6))
+        start = rng.randrange(9 * 60, 20 * 60, 30)
+        end = min(start + class_def.duration_minutes, 23 * 60)
+        schedule.append(ScheduledClass(
+            class_def=class_def,
+            instructor=rng.choice(studio.instructors),
+            room=rng.choice(studio.rooms),
+            time_slot=TimeSlot(day, time(start // 60, start % 60), time(end // 60, end % 60))
+        ))
+    return schedule
+
+
+def measure(fn: Callable[[], Any], trace_memory: bool = True) -> Tuple[Any, float, Optional[int]]:
+    """Call fn and return (value, wall seconds, peak traced bytes or None)."""
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        started = timer.perf_counter()
+        value = fn()
+        elapsed = timer.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def run_engine(
+    engine: str,
+    studio: SyntheticStudio,
+    constraints: ScheduleConstraints = None
+) -> Tuple[OptimizationResult, float]:
+    """Run one engine on a studio and return (result, wall time in seconds)."""
+    optimizer = get_optimizer(engine, constraints)
+    result, elapsed, _ = measure(
+        lambda: optimizer.optimize(studio.classes, studio.instructors, studio.rooms),
+        trace_memory=False
+    )
+    return result, elapsed
+
+
+def run_suite(
+    engines: List[str] = None,
+    tiers: List[str] = None,
+    seed: int = 42,
+    trace_memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Run every benchmark on each size tier.
+
+    Benchmarks per tier:
+        optimize:<engine>  ScheduleOptimizer.optimize for each engine
+        conflicts          ConflictResolver.detect_conflicts on a random schedule
+        suggest            ranking times for SUGGEST_QUERIES new classes against
+                           the first engine's schedule (the index behind
+                           ScheduleGenerator.suggest_new_class_time)
+
+    Each row records wall time, peak traced memory, placement rate and
+    score. Optimize rows also record whether the schedule matches the
+    first engine's schedule exactly.
+
+    Returns:
+        {'meta': {...}, 'results': [row, ...]}
+    """
+    engines = engines or list(OPTIMIZER_ENGINES)
+    tiers = tiers or list(SIZE_TIERS)
+    rows = []
+
+    def row(tier: str, studio: SyntheticStudio, benchmark: str, seconds: float, peak: Optional[int], **extra):
+        rows.append({
+            'tier': tier,
+            'size': studio.size_label,
+            'benchmark': benchmark,
+            'seconds': seconds,
+            'peak_kib': round(peak / 1024, 1) if peak is not None else None,
+            **extra,
+        })
+
+    for tier in tiers:
+        num_instructors, num_rooms, num_classes = SIZE_TIERS[tier]
+        studio = generate_synthetic_studio(num_instructors, num_rooms, num_classes, seed)
+
+        baseline = None
+        baseline_result = None
+        for engine in engines:
+            optimizer = get_optimizer(engine)
+            result, elapsed, peak = measure(
+                lambda: optimizer.optimize(studio.classes, studio.instructors, studio.rooms),
+                trace_memory
+            )
+            signature = schedule_signature(result)
+            if baseline is None:
+                baseline, baseline_result = signature, result
+            row(
+                tier, studio, f'optimize:{engine}', elapsed, peak,
+                scheduled=len(result.schedule),
+                unscheduled=len(result.unscheduled),
+                placement_rate=len(result.schedule) / len(studio.classes) if studio.classes else 1.0,
+                score=result.score,
+                optimization_score=result.optimization_score,
+                matches_baseline=signature == baseline
+            )
+
+        random_schedule = generate_synthetic_schedule(studio, seed)
+        conflicts, elapsed, peak = measure(
+            lambda: ConflictResolver().detect_conflicts(random_schedule),
+            trace_memory
+        )
+        row(tier, studio, 'conflicts', elapsed, peak,
+            scheduled=len(random_schedule), conflicts=len(conflicts))
+
+        if baseline_result is not None:
+            current = [
+                ExistingAssignment(
+                    schedule_id=f'row-{n}',
+                    class_id=s.class_def.id,
+                    instructor_id=s.instructor.id,
+                    room_name=s.room.name,
+                    time_slot=s.time_slot
+                )
+                for n, s in enumerate(baseline_result.schedule)
+            ]
+            queries = generate_synthetic_studio(
+                num_instructors, num_rooms, SUGGEST_QUERIES, seed + 1
+            ).classes
+
+            def suggest_all():
+                index = SuggestionIndex(studio.instructors, studio.rooms, current)
+                return [index.suggest(c) for c in queries]
+
+            suggestions, elapsed, peak = measure(suggest_all, trace_memory)
+            answered = sum(1 for s in suggestions if s)
+            row(
+                tier, studio, 'suggest', elapsed, peak,
+                queries=len(queries),
+                placement_rate=answered / len(queries) if queries else 1.0,
+                score=sum(s[0].score for s in suggestions if s) / answered if answered else 0.0
+            )
+
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'seed': seed,
+            'engines': engines,
+            'tiers': tiers,
+            'trace_memory': trace_memory,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        },
+        'results': rows,
+    }
+
+
+def compare_engines(
+    engines: List[str] = None,
+    sizes: List[Tuple[int, int, int]] = None,
+    seed: int = 42
+) -> List[Dict[str, Any]]:
+    """
+    Run every engine on synthetic studios of increasing size.
+
+    Each row records the wall time per engine and whether the engine's
+    schedule matches the first engine's schedule exactly.
+    """
+    engines = engines or list(OPTIMIZER_ENGINES)
+    sizes = sizes or DEFAULT_SIZES
+    rows = []
+
+    for num_instructors, num_rooms, num_classes in sizes:
+        studio = generate_synthetic_studio(num_instructors, num_rooms, num_classes, seed)
+        baseline = None
+        for engine in engines:
+            result, elapsed = run_engine(engine, studio)
+            signature = schedule_signature(result)
+            if baseline is None:
+                baseline = signature
+            rows.append({
+                'size': studio.size_label,
+                'engine': engine,
+                'seconds': elapsed,
+                'scheduled': len(result.schedule),
+                'unscheduled': len(result.unscheduled),
+                'score': result.score,
+                'optimization_score': result.optimization_score,
+                'matches_baseline': signature == baseline,
+            })
+
+    return rows
+
+
+def compare_to_baseline(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    max_slowdown: float = DEFAULT_MAX_SLOWDOWN,
+    max_memory_growth: float = DEFAULT_MAX_MEMORY_GROWTH
+) -> List[Dict[str, Any]]:
+    """
+    Compare a suite run against a saved one.
+
+    Rows are matched on (tier, benchmark). A row regresses when it is more
+    than `max_slowdown` times slower (rows under MIN_COMPARABLE_SECONDS in
+    both runs are skipped as noise), uses more than `max_memory_growth`
+    times the peak memory, places fewer classes or scores lower.
+
+    Returns:
+        One entry per regression: tier, benchmark, metric, baseline, current
+    """
+    previous = {(r['tier'], r['benchmark']): r for r in baseline.get('results', [])}
+    regressions = []
+
+    def regress(r, metric, before, after):
+        regressions.append({
+            'tier': r['tier'],
+            'benchmark': r['benchmark'],
+            'metric': metric,
+            'baseline': before,
+            'current': after,
+        })
+
+    for r in current.get('results', []):
+        before = previous.get((r['tier'], r['benchmark']))
+        if before is None:
+            continue
+
+        if max(r['seconds'], before['seconds']) >= MIN_COMPARABLE_SECONDS:
+            if r['seconds'] > before['seconds'] * max_slowdown:
+                regress(r, 'seconds', before['seconds'], r['seconds'])
+
+        if r.get('peak_kib') and before.get('peak_kib'):
+            if r['peak_kib'] > before['peak_kib'] * max_memory_growth:
+                regress(r, 'peak_kib', before['peak_kib'], r['peak_kib'])
+
+        if r.get('placement_rate', 0) < before.get('placement_rate', 0):
+            regress(r, 'placement_rate', before['placement_rate'], r['placement_rate'])
+        elif r.get('placement_rate') == before.get('placement_rate'):
+            # Scores are only comparable at the same placement rate
+            if r.get('score', 0) < before.get('score', 0) - 1e-9:
+                regress(r, 'score', before['score'], r['score'])
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scheduling package')
+    parser.add_argument('--engines', nargs='+', default=list(OPTIMIZER_ENGINES))
+    parser.add_argument('--tiers', nargs='+', default=list(SIZE_TIERS), choices=list(SIZE_TIERS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip tracemalloc (faster, no peak memory)')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON to check for regressions')
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN)
+    parser.add_argument('--max-memory-growth', type=float, default=DEFAULT_MAX_MEMORY_GROWTH)
+    args = parser.parse_args()
+
+    suite = run_suite(args.engines, args.tiers, args.seed, trace_memory=not args.no_memory)
+
+    print(f"{'size':<16}{'benchmark':<22}{'seconds':>10}{'peak KiB':>12}{'placed':>9}{'score':>10}  same")
+    for row in suite['results']:
+        peak = f"{row['peak_kib']:>12.1f}" if row['peak_kib'] is not None else f"{'-':>12}"
+        rate = f"{row['placement_rate']:>8.0%}" if 'placement_rate' in row else f"{'-':>8}"
+        score = f"{row['score']:>10.2f}" if 'score' in row else f"{'-':>10}"
+        same = '' if 'matches_baseline' not in row else ('yes' if row['matches_baseline'] else 'NO')
+        print(f"{row['size']:<16}{row['benchmark']:<22}{row['seconds']:>10.3f}{peak} {rate}{score}  {same}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(suite, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('trace_memory') != suite['meta']['trace_memory']:
+            print('\nWarning: memory tracing differs from the baseline; timings are not comparable')
+        regressions = compare_to_baseline(
+            suite, baseline, args.max_slowdown, args.max_memory_growth
+        )
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for r in regressions:
+                print(f"  {r['tier']:<8}{r['benchmark']:<22}{r['metric']:<16}{r['baseline']} -> {r['current']}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+# Bitset Schedule Optimizer - Indexed constraint checks for large studios
+from typing import Dict, List, Any, Tuple
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+from .optimizer import (
+    ScheduleOptimizer, OptimizationResult,
+    ClassDefinition, Instructor, Room, ScheduledClass, TimeSlot
+)
+
+
+def to_minutes(t) -> int:
+    """Convert a time of day to minutes since midnight."""
+    return t.hour * 60 + t.minute
+
+
+def minute_mask(start: int, end: int) -> int:
+    """Bitmask with one bit set per minute in [start, end)."""
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+class DayOccupancy:
+    """
+    Occupancy of a single resource on a single day.
+
+    `busy` has a bit per occupied minute; `starts` and `ends` mark the
+    boundary minutes of every booked slot so break-time rules can be
+    checked without walking the booked slots.
+    """
+    __slots__ = ('busy', 'starts', 'ends', 'count')
+
+    def __init__(self):
+        self.busy = 0
+        self.starts = 0
+        self.ends = 0
+        self.count = 0
+
+    def add(self, start: int, end: int):
+        self.busy |= minute_mask(start, end)
+        self.starts |= 1 << start
+        self.ends |= 1 << end
+        self.count += 1
+
+    def remove(self, start: int, end: int):
+        """Undo `add` (slots on one resource never overlap, so bits are unique)."""
+        self.busy &= ~minute_mask(start, end)
+        self.starts &= ~(1 << start)
+        self.ends &= ~(1 << end)
+        self.count -= 1
+
+
+class AvailabilityIndex:
+    """
+    Per-day availability windows for one instructor.
+
+    Windows are sorted by start with a running maximum of their end times,
+    so "is there a single window covering [start, end]" is one bisect.
+    """
+    __slots__ = ('_starts', '_max_ends')
+
+    def __init__(self, availability: List[TimeSlot]):
+        by_day: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for avail in availability:
+            by_day[avail.day.value].append(
+                (to_minutes(avail.start_time), to_minutes(avail.end_time))
+            )
+
+        self._starts: Dict[int, List[int]] = {}
+        self._max_ends: Dict[int, List[int]] = {}
+        for day, windows in by_day.items():
+            windows.sort()
+            starts, max_ends = [], []
+            running = -1
+            for start, end in windows:
+                running = max(running, end)
+                starts.append(start)
+                max_ends.append(running)
+            self._starts[day] = starts
+            self._max_ends[day] = max_ends
+
+    def covers(self, day: int, start: int, end: int) -> bool:
+        starts = self._starts.get(day)
+        if not starts:
+            return False
+        idx = bisect_right(starts, start) - 1
+        return idx >= 0 and self._max_ends[day][idx] >= end
+
+
+class BitsetScheduleOptimizer(ScheduleOptimizer):
+    """
+    Greedy schedule optimizer backed by minute-granularity bitsets.
+
+    Produces the same OptimizationResult as ScheduleOptimizer, but replaces
+    the list scans in `_is_valid_assignment` with indexed lookups:
+
+    - Instructor/room double-booking: one AND against a per-day bitset
+    - Break between classes: one AND against slot start/end marker bitsets
+    - Instructor availability: bisect over sorted availability windows
+    - Max concurrent classes: bisect over sorted start/end times per day
+
+    Candidate slots are also filtered per instructor once per class rather
+    than once per (instructor, room) pair.
+    """
+
+    engine_name = 'bitset'
+    continuity_weight = 5  # Same as `_score_assignment`
+
+    def optimize(
+        self,
+        classes: List[ClassDefinition],
+        instructors: List[Instructor],
+        rooms: List[Room],
+        pinned: List[ScheduledClass] = None
+    ) -> OptimizationResult:
+        """
+        Run schedule optimization.
+
+        Args:
+            classes: Classes to schedule
+            instructors: Available instructors
+            rooms: Available rooms
+            pinned: Existing assignments to keep as-is; they occupy their
+                instructor, room and time before `classes` are placed
+
+        Returns:
+            OptimizationResult with optimized schedule (pinned entries first)
+        """
+        catalog = self.slot_catalog(c.duration_minutes for c in classes)
+        all_slots = catalog.time_slots
+        slot_days, slot_starts, slot_ends = catalog.days, catalog.starts, catalog.ends
+        slot_masks = [minute_mask(s, e) for s, e in zip(slot_starts, slot_ends)]
+
+        scheduled: List[ScheduledClass] = []
+        unscheduled: List[ClassDefinition] = []
+        conflicts: List[Dict[str, Any]] = []
+
+        # Track assignments (lists kept for final scoring and utilization)
+        instructor_schedule: Dict[str, List[TimeSlot]] = defaultdict(list)
+        room_schedule: Dict[str, List[TimeSlot]] = defaultdict(list)
+
+        # Indexes
+        availability = {i.id: AvailabilityIndex(i.availability) for i in instructors}
+        instructor_days: Dict[Tuple[str, int], DayOccupancy] = defaultdict(DayOccupancy)
+        room_days: Dict[Tuple[str, int], DayOccupancy] = defaultdict(DayOccupancy)
+        day_starts: Dict[int, List[int]] = defaultdict(list)
+        day_ends: Dict[int, List[int]] = defaultdict(list)
+
+        min_break = self.constraints.min_break_between_classes
+        max_concurrent = self.constraints.max_concurrent_classes
+
+        def place(class_def, instructor, room, slot):
+            day, start, end = slot.day.value, to_minutes(slot.start_time), to_minutes(slot.end_time)
+            scheduled.append(ScheduledClass(
+                class_def=class_def,
+                instructor=instructor,
+                room=room,
+                time_slot=slot
+            ))
+            instructor_schedule[instructor.id].append(slot)
+            room_schedule[room.id].append(slot)
+            instructor_days[(instructor.id, day)].add(start, end)
+            room_days[(room.id, day)].add(start, end)
+            insort(day_starts[day], start)
+            insort(day_ends[day], end)
+
+        for existing in pinned or []:
+            place(existing.class_def, existing.instructor, existing.room, existing.time_slot)
+
+        sorted_classes = self._prioritize_classes(classes, instructors)
+        running_score = 0.0
+
+        for done, class_def in enumerate(sorted_classes, 1):
+            candidates = catalog.indices_for(class_def.duration_minutes)
+            best_assignment = None
+            best_score = -1
+
+            # Slot-only checks and scores are shared by every instructor/room
+            concurrency_ok = {}
+            slot_scores = {}
+            for idx in candidates:
+                day, start, end = slot_days[idx], slot_starts[idx], slot_ends[idx]
+                concurrent = (
+                    bisect_left(day_starts[day], end) -
+                    bisect_right(day_ends[day], start)
+                )
+                concurrency_ok[idx] = concurrent < max_concurrent
+                slot_scores[idx] = self._score_slot(class_def, all_slots[idx])
+
+            for instructor in instructors:
+                if not instructor.can_teach(class_def.dance_style):
+                    continue
+
+                valid_slots = [
+                    idx for idx in candidates
+                    if concurrency_ok[idx]
+                    and self._instructor_free(
+                        availability[instructor.id],
+                        instructor_days.get((instructor.id, slot_days[idx])),
+                        slot_days[idx], slot_starts[idx], slot_ends[idx],
+                        slot_masks[idx], min_break
+                    )
+                ]
+                if not valid_slots:
+                    continue
+
+                for room in rooms:
+                    if room.capacity < class_def.min_capacity:
+                        continue
+                    if not room.has_features(class_def.required_features):
+                        continue
+
+                    room_score = self._score_room(class_def, room)
+
+                    for idx in valid_slots:
+                        occupancy = room_days.get((room.id, slot_days[idx]))
+                        if occupancy is not None and occupancy.busy & slot_masks[idx]:
+                            continue
+
+                        score = slot_scores[idx] + room_score
+                        same_day = instructor_days.get((instructor.id, slot_days[idx]))
+                        if same_day is not None and same_day.count:
+                            score += self.continuity_weight * same_day.count
+
+                        if score > best_score:
+                            best_score = score
+                            best_assignment = (instructor, room, idx)
+
+            if best_assignment:
+                instructor, room, idx = best_assignment
+                place(class_def, instructor, room, all_slots[idx])
+                running_score += best_score
+            else:
+                unscheduled.append(class_def)
+                conflicts.append({
+                    'class': class_def.name,
+                    'reason': self._get_failure_reason(class_def, instructors, rooms)
+                })
+
+            self._report_progress(done, len(sorted_classes), len(scheduled), running_score)
+
+        return self._build_result(
+            scheduled, unscheduled, conflicts,
+            instructor_schedule, instructors, rooms
+        )
+
+    def _instructor_free(
+        self,
+        availability: AvailabilityIndex,
+        occupancy: DayOccupancy,
+        day: int,
+        start: int,
+        end: int,
+        mask: int,
+        min_break: int
+    ) -> bool:
+        """Check availability, double-booking and break time for an instructor."""
+        if not availability.covers(day, start, end):
+            return False
+        if occupancy is None:
+            return True
+        if occupancy.busy & mask:
+            return False
+        # A booked slot ending 1..min_break-1 minutes before this one starts,
+        # or starting 1..min_break-1 minutes after it ends, violates the break
+        if min_break > 1:
+            if occupancy.ends & minute_mask(max(start - min_break + 1, 0), start):
+                return False
+            if occupancy.starts & minute_mask(end + 1, end + min_break):
+                return False
+        return True
+
+    def _score_slot(self, class_def: ClassDefinition, slot: TimeSlot) -> float:
+        """Slot-dependent part of `_score_assignment`."""
+        score = 0.0
+
+        for pref in class_def.preferred_times:
+            if slot.day == pref.day:
+                if pref.start_time <= slot.start_time <= pref.end_time:
+                    score += 20
+
+        is_peak = self.constraints.peak_hours_start <= slot.start_time <= self.constraints.peak_hours_end
+        is_beginner = 'beginner' in class_def.level.lower()
+
+        if self.constraints.prefer_beginners_in_peak:
+            if is_peak and is_beginner:
+                score += 15
+            elif is_peak and not is_beginner:
+                score -= 5
+
+        return score
+
+    def _score_room(self, class_def: ClassDefinition, room: Room) -> float:
+        """Room-dependent part of `_score_assignment`."""
+        size_ratio = class_def.max_capacity / room.capacity
+        if 0.5 <= size_ratio <= 1.0:
+            return 10
+        elif size_ratio > 1.0:
+            return -20  # Room too small
+        return 0
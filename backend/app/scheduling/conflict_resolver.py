@@ -1,11 +1,15 @@
 # Conflict Resolver - Handles schedule conflicts and adjustments
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Hashable, TypeVar
 from datetime import datetime, time, date, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from collections import defaultdict
 
 from .optimizer import TimeSlot, DayOfWeek, ScheduledClass
 
 
+T = TypeVar('T')
+
+
 @dataclass
 class Conflict:
     """Represents a scheduling conflict."""
@@ -14,6 +18,48 @@ class Conflict:
     description: str
     affected_classes: List[str]
     suggested_resolution: Optional[str] = None
+    affected_sessions: List[str] = field(default_factory=list)
+
+
+def find_overlap_groups(
+    intervals: Iterable[Tuple[Hashable, Any, Any, T]]
+) -> List[Tuple[Hashable, List[T]]]:
+    """
+    Find groups of overlapping intervals per resource with a sweep line.
+    
+    Args:
+        intervals: (resource_key, start, end, item) tuples; start/end can be
+            any comparable values (times, datetimes, minutes)
+    
+    Returns:
+        (resource_key, items) for every group of two or more items whose
+        intervals chain together through overlaps, items in start order.
+        Intervals that only touch (end == start) do not overlap.
+    
+    Sorting dominates, so this is O(n log n) overall.
+    """
+    by_resource: Dict[Hashable, List[Tuple[Any, Any, T]]] = defaultdict(list)
+    for key, start, end, item in intervals:
+        by_resource[key].append((start, end, item))
+    
+    groups = []
+    for key, entries in by_resource.items():
+        entries.sort(key=lambda e: (e[0], e[1]))
+        group: List[T] = []
+        group_end = None
+        for start, end, item in entries:
+            if group and start < group_end:
+                group.append(item)
+                group_end = max(group_end, end)
+                continue
+            if len(group) > 1:
+                groups.append((key, group))
+            group = [item]
+            group_end = end
+        if len(group) > 1:
+            groups.append((key, group))
+    
+    return groups
 
 
 class ConflictResolver:
@@ -59,52 +105,96 @@ class ConflictResolver:
     
     def _check_instructor_conflicts(self, schedule: List[ScheduledClass]):
         """Check for instructor double-booking."""
-        instructor_classes: Dict[str, List[ScheduledClass]] = {}
+        groups = find_overlap_groups(
+            ((cls.instructor.id, cls.time_slot.day.value), cls.time_slot.start_time, cls.time_slot.end_time, cls)
+            for cls in schedule
+        )
         
-        for cls in schedule:
-            instructor_id = cls.instructor.id
-            if instructor_id not in instructor_classes:
-                instructor_classes[instructor_id] = []
-            instructor_classes[instructor_id].append(cls)
-        
-        for instructor_id, classes in instructor_classes.items():
-            # Sort by day and time
-            classes.sort(key=lambda c: (c.time_slot.day.value, c.time_slot.start_time))
-            
-            for i, cls1 in enumerate(classes):
-                for cls2 in classes[i+1:]:
-                    if cls1.time_slot.overlaps(cls2.time_slot):
-                        self.conflicts.append(Conflict(
-                            type='instructor',
-                            severity='hard',
-                            description=f"Instructor {cls1.instructor.name} double-booked",
-                            affected_classes=[cls1.class_def.id, cls2.class_def.id],
-                            suggested_resolution=f"Move {cls2.class_def.name} to different time or assign different instructor"
-                        ))
+        for _, classes in groups:
+            self.conflicts.append(Conflict(
+                type='instructor',
+                severity='hard',
+                description=f"Instructor {classes[0].instructor.name} double-booked",
+                affected_classes=[c.class_def.id for c in classes],
+                suggested_resolution=f"Move {', '.join(c.class_def.name for c in classes[1:])} to different time or assign different instructor"
+            ))
     
     def _check_room_conflicts(self, schedule: List[ScheduledClass]):
         """Check for room double-booking."""
-        room_classes: Dict[str, List[ScheduledClass]] = {}
+        groups = find_overlap_groups(
+            ((cls.room.id, cls.time_slot.day.value), cls.time_slot.start_time, cls.time_slot.end_time, cls)
+            for cls in schedule
+        )
         
-        for cls in schedule:
-            room_id = cls.room.id
-            if room_id not in room_classes:
-                room_classes[room_id] = []
-            room_classes[room_id].append(cls)
+        for _, classes in groups:
+            self.conflicts.append(Conflict(
+                type='room',
+                severity='hard',
+                description=f"Room {classes[0].room.name} double-booked",
+                affected_classes=[c.class_def.id for c in classes],
+                suggested_resolution=f"Move {', '.join(c.class_def.name for c in classes[1:])} to different room"
+            ))
+    
+    def detect_session_conflicts(
+        self,
+        sessions: Iterable[Any],
+        start_date: date = None,
+        end_date: date = None
+    ) -> List[Conflict]:
+        """
+        Detect double-booked instructors and rooms across concrete class sessions.
         
-        for room_id, classes in room_classes.items():
-            classes.sort(key=lambda c: (c.time_slot.day.value, c.time_slot.start_time))
-            
-            for i, cls1 in enumerate(classes):
-                for cls2 in classes[i+1:]:
-                    if cls1.time_slot.overlaps(cls2.time_slot):
-                        self.conflicts.append(Conflict(
-                            type='room',
-                            severity='hard',
-                            description=f"Room {cls1.room.name} double-booked",
-                            affected_classes=[cls1.class_def.id, cls2.class_def.id],
-                            suggested_resolution=f"Move {cls2.class_def.name} to different room"
-                        ))
+        Args:
+            sessions: ClassSession rows (or objects with the same attributes);
+                may span several studios
+            start_date: Ignore sessions before this date
+            end_date: Ignore sessions after this date
+        
+        Returns:
+            List of detected conflicts, one per overlapping group
+        """
+        self.conflicts = []
+        
+        active = [
+            s for s in sessions
+            if s.status != 'CANCELLED'
+            and (start_date is None or s.date >= start_date)
+            and (end_date is None or s.date <= end_date)
+        ]
+        
+        instructor_groups = find_overlap_groups(
+            (s.substitute_instructor_id or s.instructor_id, s.start_time, s.end_time, s)
+            for s in active
+            if s.substitute_instructor_id or s.instructor_id
+        )
+        for _, group in instructor_groups:
+            first = group[0]
+            name = first.substitute_instructor_name or first.instructor_name or 'Instructor'
+            self.conflicts.append(Conflict(
+                type='instructor',
+                severity='hard',
+                description=f"{name} double-booked on {first.date.isoformat()}",
+                affected_classes=[s.class_id for s in group],
+                affected_sessions=[s.id for s in group],
+                suggested_resolution="Assign a substitute instructor or reschedule the later sessions"
+            ))
+        
+        room_groups = find_overlap_groups(
+            (s.room_id, s.start_time, s.end_time, s)
+            for s in active
+            if s.room_id
+        )
+        for _, group in room_groups:
+            self.conflicts.append(Conflict(
+                type='room',
+                severity='hard',
+                description=f"Room double-booked on {group[0].date.isoformat()}",
+                affected_classes=[s.class_id for s in group],
+                affected_sessions=[s.id for s in group],
+                suggested_resolution="Move the later sessions to a different room"
+            ))
+        
+        return self.conflicts
     
     def _check_capacity_issues(self, schedule: List[ScheduledClass]):
         """Check for capacity issues."""
@@ -231,7 +321,9 @@ class ConflictResolver:
                     'type': c.type,
                     'severity': c.severity,
                     'description': c.description,
-                    'resolution': c.suggested_resolution
+                    'resolution': c.suggested_resolution,
+                    'affected_classes': c.affected_classes,
+                    'affected_sessions': c.affected_sessions
                 }
                 for c in self.conflicts
             ]
@@ -0,0 +1,481 @@
+# Exact Schedule Optimizer - Constraint model solved within a time budget
+import time as timer
+from typing import Dict, List, Any, Optional, Tuple
+from collections import defaultdict
+
+from .optimizer import (
+    ScheduleConstraints, OptimizationResult, PLACEMENT_WEIGHT,
+    ClassDefinition, Instructor, Room, ScheduledClass, TimeSlot
+)
+from .bitset_engine import (
+    BitsetScheduleOptimizer, AvailabilityIndex, DayOccupancy,
+    to_minutes, minute_mask
+)
+
+try:
+    from ortools.sat.python import cp_model
+    ORTOOLS_AVAILABLE = True
+except ImportError:
+    ORTOOLS_AVAILABLE = False
+
+
+# (instructor index, room index, slot index) chosen for a class
+Assignment = Tuple[int, int, int]
+
+# CP-SAT spends time loading a model before its own time limit applies,
+# roughly this fraction of the time it took to build the model
+SOLVER_LOAD_FACTOR = 0.3
+
+
+class _BudgetExceeded(Exception):
+    """Raised inside a search or model build when time runs out."""
+
+
+class _ClassOptions:
+    """Statically valid placements for one class."""
+    __slots__ = ('class_def', 'pairs', 'slot_instructors', 'upper_bound')
+
+    def __init__(self, class_def: ClassDefinition):
+        self.class_def = class_def
+        self.pairs: List[Tuple[float, int, int]] = []  # (score, slot, room), best first
+        self.slot_instructors: Dict[int, List[int]] = {}
+        self.upper_bound = 0.0
+
+
+class ExactScheduleOptimizer(BitsetScheduleOptimizer):
+    """
+    Schedule optimizer that searches for the best schedule within a time budget.
+
+    The problem is modelled as choosing at most one (instructor, room, slot)
+    per class, subject to:
+
+    - Instructor qualification and availability
+    - Room capacity and features
+    - No instructor/room double-booking, with the same break rule as the
+      greedy engine
+    - At most `max_concurrent_classes` classes running at any moment
+
+    The objective maximizes placed classes first (PLACEMENT_WEIGHT each),
+    then the slot and room terms of `_score_assignment` (preferred times,
+    peak-hour fit, room size). Instructor continuity depends on the order of
+    placement, so it is left out of the model but still counted in the
+    reported score.
+
+    Uses OR-Tools CP-SAT when installed, otherwise a pure-Python
+    branch-and-bound. Both are seeded with the greedy schedule, so the
+    result is never worse than the greedy engine by `optimization_score`.
+    """
+
+    engine_name = 'exact'
+
+    def __init__(
+        self,
+        constraints: ScheduleConstraints = None,
+        time_budget_seconds: float = 10.0,
+        backend: str = None
+    ):
+        super().__init__(constraints)
+        self.time_budget_seconds = time_budget_seconds
+        if backend is None:
+            backend = 'cp-sat' if ORTOOLS_AVAILABLE else 'branch-and-bound'
+        if backend == 'cp-sat' and not ORTOOLS_AVAILABLE:
+            raise ValueError("OR-Tools is not installed; use backend='branch-and-bound'")
+        if backend not in ('cp-sat', 'branch-and-bound'):
+            raise ValueError(f"Unknown exact solver backend '{backend}'")
+        self.backend = backend
+        self.proved_optimal = False
+
+    def optimize(
+        self,
+        classes: List[ClassDefinition],
+        instructors: List[Instructor],
+        rooms: List[Room]
+    ) -> OptimizationResult:
+        """
+        Run schedule optimization.
+
+        Args:
+            classes: Classes to schedule
+            instructors: Available instructors
+            rooms: Available rooms
+
+        Returns:
+            The best OptimizationResult found within the time budget
+        """
+        deadline = timer.perf_counter() + self.time_budget_seconds
+        self.proved_optimal = False
+
+        greedy = super().optimize(classes, instructors, rooms)
+
+        all_slots = self.generate_time_slots(c.duration_minutes for c in classes)
+        sorted_classes = self._prioritize_classes(classes, instructors)
+        options = self._build_options(sorted_classes, instructors, rooms, all_slots)
+
+        index_of_instructor = {id(i): n for n, i in enumerate(instructors)}
+        index_of_room = {id(r): n for n, r in enumerate(rooms)}
+        slot_key = {(s.day, s.start_time, s.end_time): n for n, s in enumerate(all_slots)}
+        warm_start: Dict[int, Assignment] = {}
+        position = {id(o.class_def): k for k, o in enumerate(options)}
+        for s in greedy.schedule:
+            warm_start[position[id(s.class_def)]] = (
+                index_of_instructor[id(s.instructor)],
+                index_of_room[id(s.room)],
+                slot_key[(s.time_slot.day, s.time_slot.start_time, s.time_slot.end_time)]
+            )
+
+        if self.backend == 'cp-sat':
+            assignments = self._solve_cp_sat(
+                options, instructors, rooms, all_slots, warm_start, deadline
+            )
+        else:
+            assignments = self._solve_branch_and_bound(
+                options, instructors, rooms, all_slots, warm_start, deadline
+            )
+
+        result = self._result_from_assignments(
+            options, assignments, instructors, rooms, all_slots
+        )
+        if greedy.optimization_score > result.optimization_score:
+            result = greedy
+        self._report_progress(len(classes), len(classes), len(result.schedule), result.score)
+        return result
+
+    def _build_options(
+        self,
+        sorted_classes: List[ClassDefinition],
+        instructors: List[Instructor],
+        rooms: List[Room],
+        all_slots: List[TimeSlot]
+    ) -> List[_ClassOptions]:
+        """Enumerate statically valid (slot, room, instructor) choices per class."""
+        availability = [AvailabilityIndex(i.availability) for i in instructors]
+        slot_bounds = [
+            (s.day.value, to_minutes(s.start_time), to_minutes(s.end_time))
+            for s in all_slots
+        ]
+
+        options = []
+        for class_def in sorted_classes:
+            opt = _ClassOptions(class_def)
+            teachers = [
+                n for n, i in enumerate(instructors)
+                if i.can_teach(class_def.dance_style)
+            ]
+            suitable_rooms = [
+                (n, self._score_room(class_def, r)) for n, r in enumerate(rooms)
+                if r.capacity >= class_def.min_capacity
+                and r.has_features(class_def.required_features)
+            ]
+
+            if teachers and suitable_rooms:
+                for idx, slot in enumerate(all_slots):
+                    if slot.duration_minutes() != class_def.duration_minutes:
+                        continue
+                    day, start, end = slot_bounds[idx]
+                    available = [n for n in teachers if availability[n].covers(day, start, end)]
+                    if not available:
+                        continue
+                    opt.slot_instructors[idx] = available
+                    slot_score = self._score_slot(class_def, slot)
+                    for room_idx, room_score in suitable_rooms:
+                        opt.pairs.append((slot_score + room_score, idx, room_idx))
+
+            # Stable sort keeps slot/room order among equal scores
+            opt.pairs.sort(key=lambda p: -p[0])
+            if opt.pairs:
+                opt.upper_bound = PLACEMENT_WEIGHT + opt.pairs[0][0]
+            options.append(opt)
+
+        return options
+
+    def _solve_branch_and_bound(
+        self,
+        options: List[_ClassOptions],
+        instructors: List[Instructor],
+        rooms: List[Room],
+        all_slots: List[TimeSlot],
+        warm_start: Dict[int, Assignment],
+        deadline: float
+    ) -> Dict[int, Assignment]:
+        """Depth-first branch-and-bound over classes, most constrained first."""
+        count = len(options)
+        min_break = self.constraints.min_break_between_classes
+        max_concurrent = self.constraints.max_concurrent_classes
+        if max_concurrent <= 0:
+            return {}
+
+        availability = [AvailabilityIndex(i.availability) for i in instructors]
+        slot_bounds = [
+            (s.day.value, to_minutes(s.start_time), to_minutes(s.end_time))
+            for s in all_slots
+        ]
+        slot_masks = [minute_mask(start, end) for _, start, end in slot_bounds]
+
+        # suffix_bound[k]: best value classes k.. could still add
+        suffix_bound = [0.0] * (count + 1)
+        for k in range(count - 1, -1, -1):
+            suffix_bound[k] = suffix_bound[k + 1] + options[k].upper_bound
+
+        pair_score = [
+            {(idx, room_idx): score for score, idx, room_idx in opt.pairs}
+            for opt in options
+        ]
+        best_value = sum(
+            PLACEMENT_WEIGHT + pair_score[k][(slot_idx, room_idx)]
+            for k, (_, room_idx, slot_idx) in warm_start.items()
+        )
+        best: Dict[int, Assignment] = dict(warm_start)
+
+        instructor_days: Dict[Tuple[int, int], DayOccupancy] = defaultdict(DayOccupancy)
+        room_days: Dict[Tuple[int, int], DayOccupancy] = defaultdict(DayOccupancy)
+        # levels[day][k] has a bit for every minute with more than k classes running
+        levels: Dict[int, List[int]] = defaultdict(lambda: [0] * max_concurrent)
+        current: Dict[int, Assignment] = {}
+        nodes = 0
+
+        def search(k: int, value: float):
+            nonlocal best_value, best, nodes
+            nodes += 1
+            if nodes % 512 == 0 and timer.perf_counter() > deadline:
+                raise _BudgetExceeded()
+            if value + suffix_bound[k] <= best_value:
+                return
+            if k == count:
+                best_value = value
+                best = dict(current)
+                return
+
+            opt = options[k]
+            for score, slot_idx, room_idx in opt.pairs:
+                gain = PLACEMENT_WEIGHT + score
+                if value + gain + suffix_bound[k + 1] <= best_value:
+                    break  # Pairs are sorted, the rest can't do better
+                day, start, end = slot_bounds[slot_idx]
+                mask = slot_masks[slot_idx]
+                day_levels = levels[day]
+                if day_levels[-1] & mask:
+                    continue
+                room_occupancy = room_days[(room_idx, day)]
+                if room_occupancy.busy & mask:
+                    continue
+
+                for inst_idx in opt.slot_instructors[slot_idx]:
+                    occupancy = instructor_days[(inst_idx, day)]
+                    if not self._instructor_free(
+                        availability[inst_idx], occupancy,
+                        day, start, end, mask, min_break
+                    ):
+                        continue
+
+                    saved_levels = list(day_levels)
+                    for level in range(max_concurrent - 1, 0, -1):
+                        day_levels[level] |= day_levels[level - 1] & mask
+                    day_levels[0] |= mask
+                    occupancy.add(start, end)
+                    room_occupancy.add(start, end)
+                    current[k] = (inst_idx, room_idx, slot_idx)
+
+                    search(k + 1, value + gain)
+
+                    del current[k]
+                    room_occupancy.remove(start, end)
+                    occupancy.remove(start, end)
+                    day_levels[:] = saved_levels
+
+            # Leave this class unscheduled
+            search(k + 1, value)
+
+        try:
+            search(0, 0.0)
+            self.proved_optimal = True
+        except _BudgetExceeded:
+            pass
+
+        return best
+
+    def _solve_cp_sat(
+        self,
+        options: List[_ClassOptions],
+        instructors: List[Instructor],
+        rooms: List[Room],
+        all_slots: List[TimeSlot],
+        warm_start: Dict[int, Assignment],
+        deadline: float
+    ) -> Dict[int, Assignment]:
+        """Solve the placement model with OR-Tools CP-SAT."""
+        build_started = timer.perf_counter()
+        model = cp_model.CpModel()
+        min_break = self.constraints.min_break_between_classes
+        slot_bounds = [
+            (s.day.value, to_minutes(s.start_time), to_minutes(s.end_time))
+            for s in all_slots
+        ]
+
+        placed: Dict[Tuple[int, int], Any] = {}  # (class, slot)
+        taught: Dict[Tuple[int, int, int], Any] = {}  # (class, instructor, slot)
+        hosted: Dict[Tuple[int, int, int], Any] = {}  # (class, room, slot)
+        instructor_vars: Dict[int, Dict[int, List[Any]]] = defaultdict(lambda: defaultdict(list))
+        room_vars: Dict[int, Dict[int, List[Any]]] = defaultdict(lambda: defaultdict(list))
+        slot_vars: Dict[int, List[Any]] = defaultdict(list)
+        objective_vars: List[Any] = []
+        objective_coeffs: List[int] = []
+
+        for k, opt in enumerate(options):
+            if timer.perf_counter() > deadline:
+                return dict(warm_start)  # Model too large for the budget
+            rooms_by_slot: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+            for score, slot_idx, room_idx in opt.pairs:
+                rooms_by_slot[slot_idx].append((room_idx, score))
+
+            for slot_idx, room_scores in rooms_by_slot.items():
+                z = model.NewBoolVar(f"place_{k}_{slot_idx}")
+                placed[(k, slot_idx)] = z
+                slot_vars[slot_idx].append(z)
+                objective_vars.append(z)
+                objective_coeffs.append(PLACEMENT_WEIGHT)
+
+                teachers = []
+                for inst_idx in opt.slot_instructors[slot_idx]:
+                    a = model.NewBoolVar(f"teach_{k}_{inst_idx}_{slot_idx}")
+                    taught[(k, inst_idx, slot_idx)] = a
+                    instructor_vars[inst_idx][slot_idx].append(a)
+                    teachers.append(a)
+                model.Add(sum(teachers) == z)
+
+                hosts = []
+                for room_idx, score in room_scores:
+                    b = model.NewBoolVar(f"host_{k}_{room_idx}_{slot_idx}")
+                    hosted[(k, room_idx, slot_idx)] = b
+                    room_vars[room_idx][slot_idx].append(b)
+                    hosts.append(b)
+                    objective_vars.append(b)
+                    objective_coeffs.append(int(round(score)))
+                model.Add(sum(hosts) == z)
+
+            class_slots = [placed[(k, s)] for s in rooms_by_slot]
+            if class_slots:
+                model.Add(sum(class_slots) <= 1)
+
+        def check_budget():
+            if timer.perf_counter() > deadline:
+                raise _BudgetExceeded()
+
+        def add_no_overlap(vars_by_slot: Dict[int, List[Any]], capacity: int):
+            """At most `capacity` selected slots contain any slot start point."""
+            by_day: Dict[int, List[int]] = defaultdict(list)
+            for slot_idx in vars_by_slot:
+                by_day[slot_bounds[slot_idx][0]].append(slot_idx)
+            for day_slots in by_day.values():
+                for point in {slot_bounds[s][1] for s in day_slots}:
+                    check_budget()
+                    covering = [
+                        v for s in day_slots
+                        if slot_bounds[s][1] <= point < slot_bounds[s][2]
+                        for v in vars_by_slot[s]
+                    ]
+                    if len(covering) > capacity:
+                        model.Add(sum(covering) <= capacity)
+            return by_day
+
+        # The overlap and break constraints grow with the square of the slots
+        # per day, so building them can use up the budget on its own
+        try:
+            for vars_by_slot in instructor_vars.values():
+                by_day = add_no_overlap(vars_by_slot, 1)
+                if min_break <= 1:
+                    continue
+                for day_slots in by_day.values():
+                    for first in day_slots:
+                        check_budget()
+                        for second in day_slots:
+                            gap = slot_bounds[second][1] - slot_bounds[first][2]
+                            if 0 < gap < min_break:
+                                model.Add(sum(vars_by_slot[first]) + sum(vars_by_slot[second]) <= 1)
+
+            for vars_by_slot in room_vars.values():
+                add_no_overlap(vars_by_slot, 1)
+
+            add_no_overlap(slot_vars, self.constraints.max_concurrent_classes)
+
+            # model.Maximize() takes seconds on a few hundred thousand terms;
+            # writing the proto directly is about ten times faster. CP-SAT
+            # minimizes, so maximizing is a negated objective scaled by -1
+            objective = model.Proto().objective
+            objective.vars.extend(v.Index() for v in objective_vars)
+            objective.coeffs.extend(-c for c in objective_coeffs)
+            objective.scaling_factor = -1
+            check_budget()
+        except _BudgetExceeded:
+            return dict(warm_start)
+
+        for k, (inst_idx, room_idx, slot_idx) in warm_start.items():
+            model.AddHint(placed[(k, slot_idx)], 1)
+            model.AddHint(taught[(k, inst_idx, slot_idx)], 1)
+            model.AddHint(hosted[(k, room_idx, slot_idx)], 1)
+
+        solver = cp_model.CpSolver()
+        now = timer.perf_counter()
+        remaining = deadline - now - SOLVER_LOAD_FACTOR * (now - build_started)
+        if remaining <= 0:
+            return dict(warm_start)
+        solver.parameters.max_time_in_seconds = remaining
+        status = solver.Solve(model)
+
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return dict(warm_start)
+        self.proved_optimal = status == cp_model.OPTIMAL
+
+        assignments: Dict[int, Assignment] = {}
+        for (k, slot_idx), z in placed.items():
+            if not solver.Value(z):
+                continue
+            inst_idx = next(
+                i for i in options[k].slot_instructors[slot_idx]
+                if solver.Value(taught[(k, i, slot_idx)])
+            )
+            room_idx = next(
+                r for _, s, r in options[k].pairs
+                if s == slot_idx and solver.Value(hosted[(k, r, slot_idx)])
+            )
+            assignments[k] = (inst_idx, room_idx, slot_idx)
+        return assignments
+
+    def _result_from_assignments(
+        self,
+        options: List[_ClassOptions],
+        assignments: Dict[int, Assignment],
+        instructors: List[Instructor],
+        rooms: List[Room],
+        all_slots: List[TimeSlot]
+    ) -> OptimizationResult:
+        """Turn solver assignments into an OptimizationResult."""
+        scheduled: List[ScheduledClass] = []
+        unscheduled: List[ClassDefinition] = []
+        conflicts: List[Dict[str, Any]] = []
+        instructor_schedule: Dict[str, List[TimeSlot]] = defaultdict(list)
+
+        for k, opt in enumerate(options):
+            class_def = opt.class_def
+            assignment: Optional[Assignment] = assignments.get(k)
+            if assignment is None:
+                unscheduled.append(class_def)
+                conflicts.append({
+                    'class': class_def.name,
+                    'reason': self._get_failure_reason(class_def, instructors, rooms)
+                })
+                continue
+
+            inst_idx, room_idx, slot_idx = assignment
+            slot = all_slots[slot_idx]
+            scheduled.append(ScheduledClass(
+                class_def=class_def,
+                instructor=instructors[inst_idx],
+                room=rooms[room_idx],
+                time_slot=slot
+            ))
+            instructor_schedule[instructors[inst_idx].id].append(slot)
+
+        return self._build_result(
+            scheduled, unscheduled, conflicts,
+            instructor_schedule, instructors, rooms
+        )
@@ -1,13 +1,21 @@
 # Schedule Generator - Generates schedules from database models
 import uuid
-from typing import List, Dict, Any, Optional
-from datetime import time, date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Set, Callable
+from datetime import time, date, timedelta
+from time import perf_counter
 
-from app.models import db, DanceClass, ClassSchedule, User, Room as RoomModel, InstructorAvailability
+from app.models import db, ClassSchedule, ClassSession
+from app.services.session_materializer import SessionMaterializer
 from .optimizer import (
-    ScheduleOptimizer, ScheduleConstraints, OptimizationResult,
+    ScheduleConstraints, OptimizationResult,
     ClassDefinition, Instructor, Room, TimeSlot, DayOfWeek
 )
+from .registry import get_optimizer
+from .incremental import IncrementalOptimizer, IncrementalResult, ExistingAssignment
+from .conflict_resolver import ConflictResolver, Conflict
+from .snapshot import ScheduleSnapshot
+from .jobs import schedule_input_hash
+from .suggest import SuggestionIndex, DEFAULT_TOP_K
 
 
 class ScheduleGenerator:
@@ -15,29 +23,22 @@ class ScheduleGenerator:
     Generates and manages class schedules using the optimizer.
     
     Bridges between database models and the optimization algorithm.
+    Database rows are read through a ScheduleSnapshot, so the loaders can
+    be called repeatedly within a request without re-querying.
     """
     
-    def __init__(self, studio_id: str):
+    def __init__(self, studio_id: str, snapshot: ScheduleSnapshot = None):
         self.studio_id = studio_id
+        self.snapshot = snapshot or ScheduleSnapshot(studio_id)
         
     def load_instructors(self) -> List[Instructor]:
         """Load instructors from database."""
-        # Get users who are instructors
-        users = User.query.filter_by(
-            studio_id=self.studio_id,
-            role='INSTRUCTOR'
-        ).all()
+        availability_by_instructor = self.snapshot.availability
         
         instructors = []
-        for user in users:
-            # Load availability
-            availability_records = InstructorAvailability.query.filter_by(
-                instructor_id=user.id,
-                is_available=True
-            ).all()
-            
+        for user in self.snapshot.instructors:
             availability = []
-            for avail in availability_records:
+            for avail in availability_by_instructor.get(user.id, []):
                 if avail.specific_date is None:  # Regular weekly availability
                     availability.append(TimeSlot(
                         day=DayOfWeek(avail.day_of_week),
@@ -46,30 +47,26 @@ class ScheduleGenerator:
                     ))
             
             # Get specialties from user profile or default
-            specialties = user.extra_data.get('specialties', []) if user.extra_data else []
+            extra_data = getattr(user, 'extra_data', None) or {}
+            specialties = extra_data.get('specialties', [])
             if not specialties:
                 # Default to all styles
                 specialties = ['salsa', 'bachata', 'hip-hop', 'ballet', 'contemporary', 'jazz']
             
             instructors.append(Instructor(
                 id=user.id,
-                name=f"{user.first_name} {user.last_name}",
+                name=user.name,
                 specialties=specialties,
                 availability=availability,
-                max_hours_per_week=user.extra_data.get('max_hours', 20) if user.extra_data else 20
+                max_hours_per_week=extra_data.get('max_hours', 20)
             ))
         
         return instructors
     
     def load_rooms(self) -> List[Room]:
         """Load rooms from database."""
-        room_records = RoomModel.query.filter_by(
-            studio_id=self.studio_id,
-            is_active=True
-        ).all()
-        
         rooms = []
-        for room in room_records:
+        for room in self.snapshot.rooms:
             rooms.append(Room(
                 id=room.id,
                 name=room.name,
@@ -81,13 +78,8 @@ class ScheduleGenerator:
     
     def load_classes(self) -> List[ClassDefinition]:
         """Load class definitions from database."""
-        class_records = DanceClass.query.filter_by(
-            studio_id=self.studio_id,
-            is_active=True
-        ).all()
-        
         classes = []
-        for cls in class_records:
+        for cls in self.snapshot.classes:
             classes.append(ClassDefinition(
                 id=cls.id,
                 name=cls.name,
@@ -101,13 +93,35 @@ class ScheduleGenerator:
         
         return classes
     
+    def input_hash(
+        self,
+        constraints: ScheduleConstraints = None,
+        engine: str = None,
+        **engine_options
+    ) -> str:
+        """Hash of the constraints, engine and studio data an optimization would use."""
+        return schedule_input_hash(
+            self.studio_id, engine, engine_options,
+            constraints or ScheduleConstraints(),
+            self.load_classes(), self.load_instructors(), self.load_rooms()
+        )
+    
     def generate_optimized_schedule(
         self,
-        constraints: ScheduleConstraints = None
+        constraints: ScheduleConstraints = None,
+        engine: str = None,
+        progress_callback: Callable[[int, int, int, float], None] = None,
+        **engine_options
     ) -> OptimizationResult:
         """
         Generate an optimized schedule for all active classes.
         
+        Args:
+            constraints: Optimization constraints
+            engine: Optimizer engine name (see OPTIMIZER_ENGINES)
+            progress_callback: Called as (done, total, placed, score) while optimizing
+            **engine_options: Engine-specific options, e.g. time_budget_seconds
+        
         Returns:
             OptimizationResult with the generated schedule
         """
@@ -135,9 +149,115 @@ class ScheduleGenerator:
                 score=0
             )
         
-        optimizer = ScheduleOptimizer(constraints)
+        optimizer = get_optimizer(engine, constraints, **engine_options)
+        optimizer.progress_callback = progress_callback
         return optimizer.optimize(classes, instructors, rooms)
     
+    def load_current_assignments(self) -> List[ExistingAssignment]:
+        """Load saved recurring schedule rows as optimizer warm-start input."""
+        return [
+            ExistingAssignment(
+                schedule_id=schedule.id,
+                class_id=schedule.class_id,
+                instructor_id=schedule.instructor_id,
+                room_name=schedule.room,
+                time_slot=TimeSlot(
+                    day=DayOfWeek(schedule.day_of_week),
+                    start_time=schedule.start_time,
+                    end_time=schedule.end_time
+                )
+            )
+            for schedule in self.snapshot.schedules
+            if schedule.is_recurring and schedule.day_of_week is not None
+        ]
+    
+    def reoptimize_incremental(
+        self,
+        changed_class_ids: Set[str] = None,
+        changed_instructor_ids: Set[str] = None,
+        constraints: ScheduleConstraints = None
+    ) -> IncrementalResult:
+        """
+        Re-plan only the classes touched by a change, keeping the rest pinned.
+        
+        Args:
+            changed_class_ids: Classes that were added or edited
+            changed_instructor_ids: Instructors whose availability changed
+            constraints: Optimization constraints
+        
+        Returns:
+            IncrementalResult with the diff against the saved schedule
+        """
+        optimizer = IncrementalOptimizer(constraints)
+        return optimizer.reoptimize(
+            self.load_current_assignments(),
+            self.load_classes(),
+            self.load_instructors(),
+            self.load_rooms(),
+            changed_class_ids=changed_class_ids,
+            changed_instructor_ids=changed_instructor_ids
+        )
+    
+    def apply_incremental(self, incremental: IncrementalResult) -> Dict[str, List[str]]:
+        """
+        Persist an incremental result.
+        
+        Moved rows are updated in place so their ids (and the sessions that
+        reference them) stay stable; removed rows are cancelled, not deleted.
+        
+        Returns:
+            Schedule ids grouped by 'added', 'moved' and 'removed'
+        """
+        changes = {'added': [], 'moved': [], 'removed': []}
+        
+        moved_ids = [row.schedule_id for row, _ in incremental.moved]
+        removed_ids = [row.schedule_id for row, _ in incremental.removed]
+        rows = {
+            s.id: s for s in ClassSchedule.query.filter(
+                ClassSchedule.studio_id == self.studio_id,
+                ClassSchedule.id.in_(moved_ids + removed_ids)
+            ).all()
+        } if moved_ids or removed_ids else {}
+        
+        for row, scheduled in incremental.moved:
+            schedule = rows.get(row.schedule_id)
+            if not schedule:
+                continue
+            schedule.day_of_week = scheduled.time_slot.day.value
+            schedule.start_time = scheduled.time_slot.start_time
+            schedule.end_time = scheduled.time_slot.end_time
+            schedule.room = scheduled.room.name
+            schedule.instructor_id = scheduled.instructor.id
+            changes['moved'].append(schedule.id)
+        
+        for row, reason in incremental.removed:
+            schedule = rows.get(row.schedule_id)
+            if not schedule:
+                continue
+            schedule.is_cancelled = True
+            schedule.cancellation_reason = reason
+            changes['removed'].append(schedule.id)
+        
+        for scheduled in incremental.added:
+            schedule = ClassSchedule(
+                id=str(uuid.uuid4()),
+                studio_id=self.studio_id,
+                class_id=scheduled.class_def.id,
+                day_of_week=scheduled.time_slot.day.value,
+                start_time=scheduled.time_slot.start_time,
+                end_time=scheduled.time_slot.end_time,
+                room=scheduled.room.name,
+                instructor_id=scheduled.instructor.id,
+                is_recurring=True
+            )
+            db.session.add(schedule)
+            changes['added'].append(schedule.id)
+        
+        db.session.commit()
+        self.snapshot.invalidate('schedules')
+        SessionMaterializer.materialize(self.studio_id)
+        return changes
+    
     def save_schedule(self, result: OptimizationResult) -> List[str]:
         """
         Save optimization result to database.
@@ -163,19 +283,36 @@ class ScheduleGenerator:
             schedule_ids.append(schedule.id)
         
         db.session.commit()
+        self.snapshot.invalidate('schedules')
+        SessionMaterializer.materialize(self.studio_id)
         return schedule_ids
     
+    def replace_recurring_schedule(self, result: OptimizationResult) -> List[str]:
+        """
+        Replace all recurring schedule rows with an optimization result.
+        
+        Returns:
+            List of created schedule IDs
+        """
+        recurring = ClassSchedule.query.filter_by(
+            studio_id=self.studio_id,
+            is_recurring=True
+        )
+        # Sessions still point at the rows about to be deleted
+        SessionMaterializer.detach_schedules([s.id for s in recurring.with_entities(ClassSchedule.id)])
+        recurring.delete()
+        
+        return self.save_schedule(result)
+    
     def get_current_schedule(self) -> List[Dict[str, Any]]:
         """Get current schedule from database."""
-        schedules = ClassSchedule.query.filter_by(
-            studio_id=self.studio_id,
-            is_cancelled=False
-        ).all()
+        classes_by_id = self.snapshot.schedule_classes
+        instructors_by_id = self.snapshot.schedule_instructors
         
         result = []
-        for schedule in schedules:
-            dance_class = DanceClass.query.get(schedule.class_id)
-            instructor = User.query.get(schedule.instructor_id) if schedule.instructor_id else None
+        for schedule in self.snapshot.schedules:
+            dance_class = classes_by_id.get(schedule.class_id)
+            instructor = instructors_by_id.get(schedule.instructor_id)
             
             result.append({
                 'id': schedule.id,
@@ -187,66 +324,144 @@ class ScheduleGenerator:
                 'start_time': schedule.start_time.strftime('%H:%M') if schedule.start_time else None,
                 'end_time': schedule.end_time.strftime('%H:%M') if schedule.end_time else None,
                 'room': schedule.room,
-                'instructor_name': f"{instructor.first_name} {instructor.last_name}" if instructor else None,
+                'instructor_name': instructor.name if instructor else None,
                 'current_enrollment': schedule.current_enrollment
             })
         
         return result
     
+    def detect_session_conflicts(
+        self,
+        start_date: date,
+        end_date: date
+    ) -> ConflictResolver:
+        """
+        Detect double-booked instructors and rooms in this studio's sessions.
+        
+        Returns:
+            The resolver holding the detected conflicts
+        """
+        sessions = ClassSession.query.filter(
+            ClassSession.studio_id == self.studio_id,
+            ClassSession.date >= start_date,
+            ClassSession.date <= end_date,
+            ClassSession.status != 'CANCELLED'
+        ).all()
+        
+        resolver = ConflictResolver()
+        resolver.detect_session_conflicts(sessions)
+        return resolver
+    
+    def suggestion_index(self, constraints: ScheduleConstraints = None) -> SuggestionIndex:
+        """Free-time index over the saved schedule, for ranking new class times."""
+        current = [
+            ExistingAssignment(
+                schedule_id=schedule.id,
+                class_id=schedule.class_id,
+                instructor_id=schedule.instructor_id,
+                room_name=schedule.room,
+                time_slot=TimeSlot(
+                    day=DayOfWeek(schedule.day_of_week),
+                    start_time=schedule.start_time,
+                    end_time=schedule.end_time
+                )
+            )
+            for schedule in self.snapshot.schedules
+            if schedule.day_of_week is not None
+        ]
+        return SuggestionIndex(self.load_instructors(), self.load_rooms(), current, constraints)
+    
     def suggest_new_class_time(
         self,
-        class_def: ClassDefinition
+        class_def: ClassDefinition,
+        top_k: int = DEFAULT_TOP_K,
+        time_budget_ms: float = None,
+        constraints: ScheduleConstraints = None
     ) -> List[Dict[str, Any]]:
         """
         Suggest optimal times for a new class.
         
-        Returns top 3 suggested time slots.
+        Returns the top_k (slot, instructor, room) options, best first. With
+        a time budget, the best options found within it are returned.
         """
-        instructors = self.load_instructors()
-        rooms = self.load_rooms()
-        
-        # Get current schedule to avoid conflicts
-        current = self.get_current_schedule()
-        
-        # Find instructors who can teach this style
-        qualified = [i for i in instructors if i.can_teach(class_def.dance_style)]
+        deadline = perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
+        index = self.suggestion_index(constraints)
+        return [s.to_dict() for s in index.suggest(class_def, top_k, deadline)]
+    
+    def suggest_new_class_times(
+        self,
+        class_defs: List[ClassDefinition],
+        top_k: int = DEFAULT_TOP_K,
+        time_budget_ms: float = None,
+        constraints: ScheduleConstraints = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Suggest times for several new classes jointly.
         
-        suggestions = []
-        optimizer = ScheduleOptimizer()
-        all_slots = optimizer.generate_time_slots()
+        Each class's first suggestion is reserved before the next class is
+        ranked, so taking every class's first suggestion gives a schedule
+        without conflicts.
         
-        for slot in all_slots:
-            if slot.duration_minutes() != class_def.duration_minutes:
-                continue
-            
-            for instructor in qualified:
-                if not instructor.is_available(slot):
-                    continue
-                
-                # Check for conflicts
-                has_conflict = False
-                for existing in current:
-                    if existing['day_of_week'] == slot.day.value:
-                        existing_start = datetime.strptime(existing['start_time'], '%H:%M').time()
-                        existing_end = datetime.strptime(existing['end_time'], '%H:%M').time()
-                        if not (slot.end_time <= existing_start or slot.start_time >= existing_end):
-                            has_conflict = True
-                            break
-                
-                if not has_conflict:
-                    # Find suitable room
-                    for room in rooms:
-                        if room.capacity >= class_def.min_capacity:
-                            suggestions.append({
-                                'day': slot.day.name,
-                                'start_time': slot.start_time.strftime('%H:%M'),
-                                'end_time': slot.end_time.strftime('%H:%M'),
-                                'instructor': instructor.name,
-                                'instructor_id': instructor.id,
-                                'room': room.name,
-                                'room_id': room.id
-                            })
-                            break
-        
-        # Return top suggestions (limit to 5)
-        return suggestions[:5]
+        Returns:
+            Suggestions keyed by class id
+        """
+        deadline = perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
+        index = self.suggestion_index(constraints)
+        results = index.suggest_many(class_defs, top_k, deadline)
+        return {
+            class_id: [s.to_dict() for s in suggestions]
+            for class_id, suggestions in results.items()
+        }
+
+
+# Columns the session conflict sweep reads; the cross-studio scan loads
+# only these instead of full ClassSession rows
+SESSION_CONFLICT_COLUMNS = (
+    ClassSession.id,
+    ClassSession.studio_id,
+    ClassSession.class_id,
+    ClassSession.date,
+    ClassSession.start_time,
+    ClassSession.end_time,
+    ClassSession.status,
+    ClassSession.instructor_id,
+    ClassSession.instructor_name,
+    ClassSession.substitute_instructor_id,
+    ClassSession.substitute_instructor_name,
+    ClassSession.room_id,
+)
+
+# Rows fetched from the database at a time by the cross-studio scan
+SCAN_BATCH_SIZE = 1000
+
+
+def scan_session_conflicts(start_date: date, end_date: date) -> Dict[str, List[Conflict]]:
+    """
+    Detect session conflicts across all studios in one pass.
+    
+    Streams the non-cancelled sessions in the date range from a single
+    query, as plain rows of the columns the sweep needs, and sweeps them
+    together (instructor and room ids are globally unique).
+    
+    Returns:
+        Conflicts grouped by studio id (studios without conflicts omitted)
+    """
+    rows = ClassSession.query.filter(
+        ClassSession.date >= start_date,
+        ClassSession.date <= end_date,
+        ClassSession.status != 'CANCELLED'
+    ).with_entities(*SESSION_CONFLICT_COLUMNS).yield_per(SCAN_BATCH_SIZE)
+    
+    studio_of: Dict[str, str] = {}
+    
+    def sessions():
+        for row in rows:
+            studio_of[row.id] = row.studio_id
+            yield row
+    
+    by_studio: Dict[str, List[Conflict]] = {}
+    for conflict in ConflictResolver().detect_session_conflicts(sessions()):
+        studio_id = studio_of[conflict.affected_sessions[0]]
+        by_studio.setdefault(studio_id, []).append(conflict)
+    
+    return by_studio
@@ -0,0 +1,225 @@
+# Incremental Optimizer - Re-plan only the part of a schedule touched by a change
+from typing import Dict, List, Any, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from collections import defaultdict
+
+from .optimizer import (
+    ScheduleConstraints, OptimizationResult,
+    ClassDefinition, Instructor, Room, ScheduledClass, TimeSlot
+)
+from .bitset_engine import BitsetScheduleOptimizer
+
+
+@dataclass
+class ExistingAssignment:
+    """A saved schedule row, as loaded from the database."""
+    schedule_id: str
+    class_id: str
+    instructor_id: Optional[str]
+    room_name: Optional[str]
+    time_slot: TimeSlot
+
+
+@dataclass
+class IncrementalResult:
+    """Result of an incremental re-optimization."""
+    result: OptimizationResult
+    added: List[ScheduledClass] = field(default_factory=list)
+    moved: List[Tuple[ExistingAssignment, ScheduledClass]] = field(default_factory=list)
+    removed: List[Tuple[ExistingAssignment, str]] = field(default_factory=list)  # (row, reason)
+    unchanged: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.moved or self.removed)
+
+    def diff(self) -> Dict[str, Any]:
+        """Moved, added and removed classes relative to the saved schedule."""
+        def slot_dict(slot: TimeSlot) -> Dict[str, str]:
+            return {
+                'day': slot.day.name,
+                'start_time': slot.start_time.strftime('%H:%M'),
+                'end_time': slot.end_time.strftime('%H:%M'),
+            }
+
+        return {
+            'added': [s.to_dict() for s in self.added],
+            'moved': [
+                {
+                    'schedule_id': row.schedule_id,
+                    'class_id': row.class_id,
+                    'from': {
+                        **slot_dict(row.time_slot),
+                        'instructor_id': row.instructor_id,
+                        'room_name': row.room_name,
+                    },
+                    'to': s.to_dict(),
+                }
+                for row, s in self.moved
+            ],
+            'removed': [
+                {
+                    'schedule_id': row.schedule_id,
+                    'class_id': row.class_id,
+                    **slot_dict(row.time_slot),
+                    'reason': reason,
+                }
+                for row, reason in self.removed
+            ],
+            'unchanged': self.unchanged,
+        }
+
+
+class IncrementalOptimizer:
+    """
+    Re-optimizes a saved schedule after a small change.
+
+    Saved rows act as a warm start. Rows outside the change neighborhood,
+    and rows inside it that are still valid, are pinned; only invalid rows
+    and new classes are placed again, around the pinned assignments.
+
+    The neighborhood is the rows whose class is in `changed_class_ids` or
+    whose instructor is in `changed_instructor_ids`, plus new classes from
+    `changed_class_ids`. With no change ids given, every row is checked and
+    every class without a row is placed.
+
+    Rows with no instructor or room assigned can't be checked or moved and
+    are left untouched.
+    """
+
+    def __init__(self, constraints: ScheduleConstraints = None):
+        self.optimizer = BitsetScheduleOptimizer(constraints)
+
+    def reoptimize(
+        self,
+        current: List[ExistingAssignment],
+        classes: List[ClassDefinition],
+        instructors: List[Instructor],
+        rooms: List[Room],
+        changed_class_ids: Set[str] = None,
+        changed_instructor_ids: Set[str] = None
+    ) -> IncrementalResult:
+        """
+        Re-plan the neighborhood of a change.
+
+        Args:
+            current: Saved schedule rows
+            classes: Active class definitions
+            instructors: Instructors with current availability
+            rooms: Active rooms
+            changed_class_ids: Classes added or edited
+            changed_instructor_ids: Instructors whose availability or skills changed
+
+        Returns:
+            IncrementalResult with the full schedule and the diff
+        """
+        full_scope = changed_class_ids is None and changed_instructor_ids is None
+        changed_class_ids = set(changed_class_ids or ())
+        changed_instructor_ids = set(changed_instructor_ids or ())
+
+        classes_by_id = {c.id: c for c in classes}
+        instructors_by_id = {i.id: i for i in instructors}
+        rooms_by_name = {r.name: r for r in rooms}
+
+        pinned: List[ScheduledClass] = []
+        pinned_rows = 0
+        untouched = 0
+        pending: Dict[str, List[ExistingAssignment]] = defaultdict(list)
+        removed: List[Tuple[ExistingAssignment, str]] = []
+        scheduled_class_ids = set()
+
+        for row in current:
+            scheduled_class_ids.add(row.class_id)
+            class_def = classes_by_id.get(row.class_id)
+            if class_def is None:
+                removed.append((row, 'Class is no longer active'))
+                continue
+
+            in_scope = (
+                full_scope or
+                row.class_id in changed_class_ids or
+                row.instructor_id in changed_instructor_ids
+            )
+            instructor = instructors_by_id.get(row.instructor_id)
+            room = rooms_by_name.get(row.room_name)
+            if instructor is None or room is None:
+                if in_scope and row.instructor_id and row.room_name:
+                    # Instructor or room was removed since the row was saved
+                    pending[row.class_id].append(row)
+                else:
+                    untouched += 1  # Not managed by the optimizer
+                continue
+
+            if in_scope and not self._is_still_valid(class_def, instructor, room, row.time_slot):
+                pending[row.class_id].append(row)
+                continue
+
+            pinned.append(ScheduledClass(
+                class_def=class_def,
+                instructor=instructor,
+                room=room,
+                time_slot=row.time_slot
+            ))
+            pinned_rows += 1
+
+        to_place = [
+            classes_by_id[class_id]
+            for class_id, rows in pending.items()
+            for _ in rows
+        ]
+        new_classes = [
+            c for c in classes
+            if c.id not in scheduled_class_ids
+            and (full_scope or c.id in changed_class_ids)
+        ]
+        to_place.extend(new_classes)
+
+        result = self.optimizer.optimize(to_place, instructors, rooms, pinned=pinned)
+
+        added: List[ScheduledClass] = []
+        moved: List[Tuple[ExistingAssignment, ScheduledClass]] = []
+        unchanged = pinned_rows + untouched
+        for placed in result.schedule[len(pinned):]:
+            rows = pending.get(placed.class_def.id)
+            if not rows:
+                added.append(placed)
+                continue
+            row = rows.pop(0)
+            if (
+                row.instructor_id == placed.instructor.id and
+                row.room_name == placed.room.name and
+                row.time_slot == placed.time_slot
+            ):
+                unchanged += 1
+            else:
+                moved.append((row, placed))
+
+        for rows in pending.values():
+            for row in rows:
+                removed.append((row, 'No valid time slot after the change'))
+
+        return IncrementalResult(
+            result=result,
+            added=added,
+            moved=moved,
+            removed=removed,
+            unchanged=unchanged
+        )
+
+    def _is_still_valid(
+        self,
+        class_def: ClassDefinition,
+        instructor: Instructor,
+        room: Room,
+        slot: TimeSlot
+    ) -> bool:
+        """Check a saved assignment against the current class, instructor and room."""
+        if slot.duration_minutes() != class_def.duration_minutes:
+            return False
+        if not instructor.can_teach(class_def.dance_style):
+            return False
+        if not instructor.is_available(slot):
+            return False
+        if room.capacity < class_def.min_capacity:
+            return False
+        return room.has_features(class_def.required_features)
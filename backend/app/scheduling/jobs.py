@@ -0,0 +1,171 @@
+# Schedule Jobs - Background optimization job state, progress and result cache
+import hashlib
+import json
+import time as timer
+from dataclasses import asdict, fields
+from datetime import datetime, time
+from typing import Dict, List, Any, Callable, Optional
+
+from .optimizer import ScheduleConstraints, ClassDefinition, Instructor, Room
+
+
+JOB_TTL_SECONDS = 60 * 60
+RESULT_CACHE_TTL_SECONDS = 24 * 60 * 60
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+JOB_KEY = 'schedule_job:{job_id}'
+JOB_CHANNEL = 'schedule_job:{job_id}:events'
+RESULT_KEY = 'schedule_result:{input_hash}'
+
+TERMINAL_STATES = ('completed', 'failed')
+
+
+def constraints_to_dict(constraints: ScheduleConstraints) -> Dict[str, Any]:
+    """JSON-safe form of constraints (times as HH:MM)."""
+    data = asdict(constraints)
+    for name, value in data.items():
+        if isinstance(value, time):
+            data[name] = value.strftime('%H:%M')
+    return data
+
+
+def constraints_from_dict(data: Dict[str, Any]) -> ScheduleConstraints:
+    """Inverse of `constraints_to_dict`; unknown keys are ignored."""
+    constraints = ScheduleConstraints()
+    for f in fields(ScheduleConstraints):
+        if f.name not in (data or {}):
+            continue
+        value = data[f.name]
+        if isinstance(getattr(constraints, f.name), time):
+            value = datetime.strptime(value, '%H:%M').time()
+        setattr(constraints, f.name, value)
+    return constraints
+
+
+def schedule_input_hash(
+    studio_id: str,
+    engine: Optional[str],
+    engine_options: Dict[str, Any],
+    constraints: ScheduleConstraints,
+    classes: List[ClassDefinition],
+    instructors: List[Instructor],
+    rooms: List[Room]
+) -> str:
+    """
+    Stable hash of everything that determines an optimization result.
+
+    Includes the loaded classes, instructors and rooms, so any edit to the
+    studio's data produces a new hash and bypasses the result cache.
+    """
+    payload = {
+        'studio_id': studio_id,
+        'engine': engine,
+        'engine_options': engine_options,
+        'constraints': constraints_to_dict(constraints),
+        'classes': sorted((asdict(c) for c in classes), key=lambda c: c['id']),
+        'instructors': sorted((asdict(i) for i in instructors), key=lambda i: i['id']),
+        'rooms': sorted((asdict(r) for r in rooms), key=lambda r: r['id']),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ScheduleJobStore:
+    """
+    Redis-backed state for background optimization jobs.
+
+    Each job is a JSON document under `schedule_job:<id>`; every update is
+    also published on `schedule_job:<id>:events` for long-polling clients.
+    Finished results are cached under `schedule_result:<input hash>`.
+    """
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    def create(self, job_id: str, studio_id: str, **extra) -> Dict[str, Any]:
+        job = {
+            'job_id': job_id,
+            'studio_id': studio_id,
+            'state': 'queued',
+            'done': 0,
+            'total': 0,
+            'placed': 0,
+            'score': 0,
+            'created_at': datetime.utcnow().isoformat(),
+        }
+        job.update(extra)
+        self._write(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.get(JOB_KEY.format(job_id=job_id))
+        return json.loads(raw) if raw else None
+
+    def update(self, job_id: str, **changes) -> Dict[str, Any]:
+        job = self.get(job_id) or {'job_id': job_id}
+        job.update(changes)
+        self._write(job)
+        return job
+
+    def _write(self, job: Dict[str, Any]):
+        job['updated_at'] = datetime.utcnow().isoformat()
+        encoded = json.dumps(job, default=str)
+        self.redis.set(JOB_KEY.format(job_id=job['job_id']), encoded, ex=JOB_TTL_SECONDS)
+        # Subscribers get the state without the (possibly large) result
+        event = {k: v for k, v in job.items() if k != 'result'}
+        self.redis.publish(JOB_CHANNEL.format(job_id=job['job_id']), json.dumps(event, default=str))
+
+    def cached_result(self, input_hash: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.get(RESULT_KEY.format(input_hash=input_hash))
+        return json.loads(raw) if raw else None
+
+    def cache_result(self, input_hash: str, result: Dict[str, Any]):
+        self.redis.set(
+            RESULT_KEY.format(input_hash=input_hash),
+            json.dumps(result, default=str),
+            ex=RESULT_CACHE_TTL_SECONDS
+        )
+
+    def progress_reporter(self, job_id: str) -> Callable[[int, int, int, float], None]:
+        """Optimizer progress callback that writes at most every PROGRESS_INTERVAL_SECONDS."""
+        last_write = [0.0]
+
+        def report(done: int, total: int, placed: int, score: float):
+            now = timer.monotonic()
+            if done < total and now - last_write[0] < PROGRESS_INTERVAL_SECONDS:
+                return
+            last_write[0] = now
+            self.update(job_id, done=done, total=total, placed=placed, score=score)
+
+        return report
+
+    def wait_for_update(self, job_id: str, since: Optional[str], max_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Job state (without the result) once it differs from `since`.
+
+        `since` is the `updated_at` of the state the caller already has.
+        Returns at once if the job changed since then or is finished,
+        otherwise waits up to `max_seconds` for the next update and returns
+        the state at that point, changed or not.
+        """
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(JOB_CHANNEL.format(job_id=job_id))
+        try:
+            # Read after subscribing so no update falls between the two
+            job = self.get(job_id)
+            if job is None:
+                return None
+            job.pop('result', None)
+            if job.get('updated_at') != since or job.get('state') in TERMINAL_STATES:
+                return job
+
+            # get_message() also returns None after consuming the
+            # subscribe confirmation, so keep waiting until the deadline
+            deadline = timer.monotonic() + max_seconds
+            while timer.monotonic() < deadline:
+                message = pubsub.get_message(timeout=max(deadline - timer.monotonic(), 0))
+                if message is not None:
+                    return json.loads(message['data'])
+            return job
+        finally:
+            pubsub.close()
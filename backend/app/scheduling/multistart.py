@@ -0,0 +1,290 @@
+# Multi-Start Schedule Optimizer - Randomized greedy restarts across CPU cores
+import os
+import random
+import time as timer
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Tuple
+from collections import defaultdict
+
+from .optimizer import (
+    ScheduleConstraints, OptimizationResult,
+    ClassDefinition, Instructor, Room, ScheduledClass, TimeSlot, DayOfWeek
+)
+from .bitset_engine import BitsetScheduleOptimizer
+
+
+# Soft-constraint weights used by `_score_assignment`
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    'preferred_time': 20,
+    'peak_beginner': 15,
+    'peak_other': -5,
+    'room_fit': 10,
+    'room_too_small': -20,
+    'continuity': 5,
+}
+
+# How long to wait for a terminated worker process to exit
+POOL_JOIN_SECONDS = 5
+
+# (class position, instructor position, room position, day, start, end)
+CompactAssignment = Tuple[int, int, int, int, Any, Any]
+
+
+class PerturbedScheduleOptimizer(BitsetScheduleOptimizer):
+    """
+    Bitset greedy with a randomized class order and scaled scoring weights.
+
+    Placement decisions use the perturbed weights; the final result is still
+    scored with the standard `_score_assignment`, so runs stay comparable.
+    """
+
+    def __init__(
+        self,
+        constraints: ScheduleConstraints = None,
+        weights: Dict[str, float] = None,
+        order_jitter: float = 0.0,
+        seed: int = 0
+    ):
+        super().__init__(constraints)
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.continuity_weight = self.weights['continuity']
+        self.order_jitter = order_jitter
+        self.rng = random.Random(seed)
+
+    def _prioritize_classes(
+        self,
+        classes: List[ClassDefinition],
+        instructors: List[Instructor]
+    ) -> List[ClassDefinition]:
+        """Most constrained first, with random noise added to the priority."""
+        if not self.order_jitter:
+            return super()._prioritize_classes(classes, instructors)
+
+        def constraint_score(c: ClassDefinition) -> float:
+            available_instructors = sum(
+                1 for i in instructors if i.can_teach(c.dance_style)
+            )
+            noise = self.rng.uniform(-self.order_jitter, self.order_jitter)
+            return -available_instructors + len(c.required_features) * 10 + noise
+
+        return sorted(classes, key=constraint_score, reverse=True)
+
+    def _score_slot(self, class_def: ClassDefinition, slot: TimeSlot) -> float:
+        score = 0.0
+
+        for pref in class_def.preferred_times:
+            if slot.day == pref.day:
+                if pref.start_time <= slot.start_time <= pref.end_time:
+                    score += self.weights['preferred_time']
+
+        is_peak = self.constraints.peak_hours_start <= slot.start_time <= self.constraints.peak_hours_end
+        is_beginner = 'beginner' in class_def.level.lower()
+
+        if self.constraints.prefer_beginners_in_peak:
+            if is_peak and is_beginner:
+                score += self.weights['peak_beginner']
+            elif is_peak and not is_beginner:
+                score += self.weights['peak_other']
+
+        return score
+
+    def _score_room(self, class_def: ClassDefinition, room: Room) -> float:
+        size_ratio = class_def.max_capacity / room.capacity
+        if 0.5 <= size_ratio <= 1.0:
+            return self.weights['room_fit']
+        elif size_ratio > 1.0:
+            return self.weights['room_too_small']
+        return 0
+
+
+def perturbation_for_start(start: int, seed: int) -> Tuple[Dict[str, float], float, int]:
+    """
+    Deterministic (weights, order jitter, rng seed) for one start.
+
+    Start 0 is the unperturbed greedy, so multi-start never does worse.
+    """
+    if start == 0:
+        return dict(DEFAULT_WEIGHTS), 0.0, seed
+    rng = random.Random(seed * 1_000_003 + start)
+    weights = {
+        name: value * rng.uniform(0.5, 1.5)
+        for name, value in DEFAULT_WEIGHTS.items()
+    }
+    return weights, rng.choice([1.0, 3.0, 10.0]), rng.randrange(2 ** 31)
+
+
+def run_start(
+    start: int,
+    seed: int,
+    constraints: ScheduleConstraints,
+    classes: List[ClassDefinition],
+    instructors: List[Instructor],
+    rooms: List[Room]
+) -> List[CompactAssignment]:
+    """
+    Run one randomized start and return its placements by list position.
+
+    Module-level so it can be sent to a worker process; returning positions
+    keeps the pickled result small and lets the parent rebuild the schedule
+    with its own objects.
+    """
+    weights, jitter, start_seed = perturbation_for_start(start, seed)
+    optimizer = PerturbedScheduleOptimizer(constraints, weights, jitter, start_seed)
+    result = optimizer.optimize(classes, instructors, rooms)
+
+    class_pos = {id(c): n for n, c in enumerate(classes)}
+    instructor_pos = {id(i): n for n, i in enumerate(instructors)}
+    room_pos = {id(r): n for n, r in enumerate(rooms)}
+    return [
+        (
+            class_pos[id(s.class_def)],
+            instructor_pos[id(s.instructor)],
+            room_pos[id(s.room)],
+            s.time_slot.day.value,
+            s.time_slot.start_time,
+            s.time_slot.end_time,
+        )
+        for s in result.schedule
+    ]
+
+
+def _terminate_pool(executor: ProcessPoolExecutor):
+    """Shut a pool down without waiting for the starts still running."""
+    # The executor has no public way to stop running work before 3.14
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=POOL_JOIN_SECONDS)
+
+
+class MultiStartScheduleOptimizer(BitsetScheduleOptimizer):
+    """
+    Runs many randomized greedy starts in parallel and keeps the best.
+
+    Each start perturbs the class ordering from `_prioritize_classes` and
+    the soft-constraint weights. Starts run in a ProcessPoolExecutor and are
+    collected until `time_budget_seconds` elapses. The winner has the fewest
+    unscheduled classes, then the highest `optimization_score`, then the
+    lowest start number, so a fixed seed gives a reproducible schedule when
+    all starts finish within the budget.
+
+    Starts still running at the deadline are abandoned and their worker
+    processes terminated, so nothing keeps using CPU after the call returns.
+    """
+
+    engine_name = 'multistart'
+
+    def __init__(
+        self,
+        constraints: ScheduleConstraints = None,
+        starts: int = 16,
+        time_budget_seconds: float = 10.0,
+        seed: int = 0,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__(constraints)
+        self.starts = max(1, starts)
+        self.time_budget_seconds = time_budget_seconds
+        self.seed = seed
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.completed_starts = 0
+
+    def optimize(
+        self,
+        classes: List[ClassDefinition],
+        instructors: List[Instructor],
+        rooms: List[Room]
+    ) -> OptimizationResult:
+        """
+        Run schedule optimization.
+
+        Args:
+            classes: Classes to schedule
+            instructors: Available instructors
+            rooms: Available rooms
+
+        Returns:
+            The best OptimizationResult over all completed starts
+        """
+        deadline = timer.perf_counter() + self.time_budget_seconds
+        args = (self.constraints, classes, instructors, rooms)
+        best: Optional[OptimizationResult] = None
+        best_key = None
+        self.completed_starts = 0
+
+        def collect(start: int, assignments: List[CompactAssignment]):
+            nonlocal best, best_key
+            result = self._rebuild(assignments, classes, instructors, rooms)
+            key = (len(result.unscheduled), -result.optimization_score, start)
+            if best_key is None or key < best_key:
+                best, best_key = result, key
+            self.completed_starts += 1
+            self._report_progress(self.completed_starts, self.starts, len(best.schedule), best.score)
+
+        # Start 0 runs in-process so there is always a result
+        collect(0, run_start(0, self.seed, *args))
+
+        remaining_starts = list(range(1, self.starts))
+        if remaining_starts and self.max_workers > 1:
+            executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(remaining_starts)))
+            pending = set()
+            try:
+                futures = {
+                    executor.submit(run_start, start, self.seed, *args): start
+                    for start in remaining_starts
+                }
+                pending = set(futures)
+                while pending:
+                    remaining = deadline - timer.perf_counter()
+                    if remaining <= 0:
+                        break
+                    done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(futures[future], future.result())
+            finally:
+                if pending:
+                    _terminate_pool(executor)
+                else:
+                    executor.shutdown(wait=True)
+        else:
+            for start in remaining_starts:
+                if timer.perf_counter() >= deadline:
+                    break
+                collect(start, run_start(start, self.seed, *args))
+
+        return best
+
+    def _rebuild(
+        self,
+        assignments: List[CompactAssignment],
+        classes: List[ClassDefinition],
+        instructors: List[Instructor],
+        rooms: List[Room]
+    ) -> OptimizationResult:
+        """Rebuild a full result from a worker's compact placements."""
+        scheduled: List[ScheduledClass] = []
+        instructor_schedule: Dict[str, List[TimeSlot]] = defaultdict(list)
+        placed = set()
+        for class_idx, inst_idx, room_idx, day, start_time, end_time in assignments:
+            slot = TimeSlot(day=DayOfWeek(day), start_time=start_time, end_time=end_time)
+            scheduled.append(ScheduledClass(
+                class_def=classes[class_idx],
+                instructor=instructors[inst_idx],
+                room=rooms[room_idx],
+                time_slot=slot
+            ))
+            instructor_schedule[instructors[inst_idx].id].append(slot)
+            placed.add(class_idx)
+
+        unscheduled = [c for n, c in enumerate(classes) if n not in placed]
+        conflicts = [
+            {'class': c.name, 'reason': self._get_failure_reason(c, instructors, rooms)}
+            for c in unscheduled
+        ]
+        return self._build_result(
+            scheduled, unscheduled, conflicts,
+            instructor_schedule, instructors, rooms
+        )
@@ -1,8 +1,10 @@
 # Schedule Optimizer - Constraint-based class scheduling optimization
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Iterable, Callable
 from dataclasses import dataclass, field
-from datetime import datetime, time, timedelta, date
+from datetime import time
 from enum import Enum
+from array import array
+from functools import lru_cache
 import uuid
 from collections import defaultdict
 
@@ -136,6 +138,121 @@ class ScheduleConstraints:
     slot_increment: int = 30  # minutes between potential start times
 
 
+# Class durations offered when the classes to schedule aren't known
+DEFAULT_SLOT_DURATIONS: Tuple[int, ...] = (60, 75, 90)
+
+# Distinct (hours, increment, durations, days) combinations kept in memory
+SLOT_CATALOG_CACHE_SIZE = 64
+
+
+class SlotCatalog:
+    """
+    Every candidate time slot for one set of operating hours and durations.
+
+    Slots are stored as parallel arrays of day and start/end minutes, in
+    (day, start, duration) order. `TimeSlot` objects are built once, on
+    first use, and shared by every caller of the cached catalog, so they
+    must not be modified.
+    """
+    __slots__ = ('days', 'starts', 'ends', '_by_duration', '_time_slots')
+
+    def __init__(
+        self,
+        opening_minutes: int,
+        closing_minutes: int,
+        increment: int,
+        durations: Tuple[int, ...],
+        days: Tuple[int, ...]
+    ):
+        self.days = array('B')
+        self.starts = array('H')
+        self.ends = array('H')
+        self._by_duration: Dict[int, List[int]] = defaultdict(list)
+        self._time_slots: Optional[Tuple[TimeSlot, ...]] = None
+
+        for day in days:
+            start = opening_minutes
+            while start < closing_minutes:
+                for duration in durations:
+                    end = start + duration
+                    if end <= closing_minutes:
+                        self._by_duration[duration].append(len(self.days))
+                        self.days.append(day)
+                        self.starts.append(start)
+                        self.ends.append(end)
+                start += increment
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def time_slots(self) -> Tuple[TimeSlot, ...]:
+        """All slots as `TimeSlot` objects, in catalog order."""
+        if self._time_slots is None:
+            self._time_slots = tuple(
+                TimeSlot(
+                    day=DayOfWeek(day),
+                    start_time=time(start // 60, start % 60),
+                    end_time=time(end // 60, end % 60)
+                )
+                for day, start, end in zip(self.days, self.starts, self.ends)
+            )
+        return self._time_slots
+
+    def indices_for(self, duration_minutes: int) -> List[int]:
+        """Catalog positions of the slots with the given duration."""
+        return self._by_duration.get(duration_minutes, [])
+
+    def slots_for(self, duration_minutes: int) -> List[TimeSlot]:
+        """Slots with the given duration, in catalog order."""
+        time_slots = self.time_slots
+        return [time_slots[idx] for idx in self.indices_for(duration_minutes)]
+
+
+@lru_cache(maxsize=SLOT_CATALOG_CACHE_SIZE)
+def get_slot_catalog(
+    opening_minutes: int,
+    closing_minutes: int,
+    increment: int,
+    durations: Tuple[int, ...] = DEFAULT_SLOT_DURATIONS,
+    days: Tuple[int, ...] = tuple(day.value for day in DayOfWeek)
+) -> SlotCatalog:
+    """Build (or fetch the cached) slot catalog for a set of hours and durations."""
+    return SlotCatalog(opening_minutes, closing_minutes, increment, durations, days)
+
+
+def slot_catalog_for(
+    constraints: 'ScheduleConstraints',
+    durations: Iterable[int] = None,
+    days: Iterable[int] = None
+) -> SlotCatalog:
+    """
+    Slot catalog for a set of constraints.
+
+    Args:
+        constraints: Operating hours and slot increment
+        durations: Class durations in minutes (defaults to 60, 75 and 90)
+        days: Day numbers to include (defaults to every day)
+    """
+    opening = constraints.opening_time
+    closing = constraints.closing_time
+    durations = tuple(sorted({int(d) for d in durations or () if d and d > 0}))
+    days = tuple(sorted({int(d) for d in days or ()}))
+    return get_slot_catalog(
+        opening.hour * 60 + opening.minute,
+        closing.hour * 60 + closing.minute,
+        constraints.slot_increment,
+        durations or DEFAULT_SLOT_DURATIONS,
+        days or tuple(day.value for day in DayOfWeek)
+    )
+
+
+# Weight of one placed class in `optimization_score`. Larger than any
+# soft-constraint score a single class can earn, so placing more classes
+# always wins over a better-scored but smaller schedule.
+PLACEMENT_WEIGHT = 1000
+
+
 @dataclass
 class OptimizationResult:
     """Result of schedule optimization."""
@@ -145,6 +262,13 @@ class OptimizationResult:
     conflicts: List[Dict[str, Any]]
     utilization: Dict[str, float]  # Resource utilization metrics
     score: float  # Optimization score
+    engine: str = 'greedy'  # Engine that produced the schedule
+    
+    @property
+    def optimization_score(self) -> float:
+        """Objective comparable across engines: placed classes, then total soft score."""
+        placed = len(self.schedule)
+        return placed * PLACEMENT_WEIGHT + self.score * placed
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -153,7 +277,9 @@ class OptimizationResult:
             'unscheduled': [{'id': c.id, 'name': c.name} for c in self.unscheduled],
             'conflicts': self.conflicts,
             'utilization': self.utilization,
-            'score': self.score
+            'score': self.score,
+            'engine': self.engine,
+            'optimization_score': self.optimization_score
         }
 
 
@@ -177,30 +303,27 @@ class ScheduleOptimizer:
     - Balance room utilization
     """
     
+    engine_name = 'greedy'
+    
+    # Called as progress_callback(done, total, placed, score) while optimizing;
+    # done/total count classes considered (starts, for the multi-start engine)
+    progress_callback: Optional[Callable[[int, int, int, float], None]] = None
+    
     def __init__(self, constraints: ScheduleConstraints = None):
         self.constraints = constraints or ScheduleConstraints()
         
-    def generate_time_slots(self) -> List[TimeSlot]:
+    def _report_progress(self, done: int, total: int, placed: int, score: float):
+        """Forward progress to `progress_callback`, if one is set."""
+        if self.progress_callback is not None:
+            self.progress_callback(done, total, placed, score)
+    
+    def slot_catalog(self, durations: Iterable[int] = None) -> SlotCatalog:
+        """Cached catalog of candidate slots for the given class durations."""
+        return slot_catalog_for(self.constraints, durations)
+    
+    def generate_time_slots(self, durations: Iterable[int] = None) -> List[TimeSlot]:
         """Generate all possible time slots based on constraints."""
-        slots = []
-        increment = timedelta(minutes=self.constraints.slot_increment)
-        
-        for day in DayOfWeek:
-            current = datetime.combine(date.today(), self.constraints.opening_time)
-            closing = datetime.combine(date.today(), self.constraints.closing_time)
-            
-            while current < closing:
-                for duration in [60, 75, 90]:  # Common class durations
-                    end = current + timedelta(minutes=duration)
-                    if end.time() <= self.constraints.closing_time:
-                        slots.append(TimeSlot(
-                            day=day,
-                            start_time=current.time(),
-                            end_time=end.time()
-                        ))
-                current += increment
-        
-        return slots
+        return list(self.slot_catalog(durations).time_slots)
     
     def optimize(
         self,
@@ -219,7 +342,7 @@ class ScheduleOptimizer:
         Returns:
             OptimizationResult with optimized schedule
         """
-        all_slots = self.generate_time_slots()
+        catalog = self.slot_catalog(c.duration_minutes for c in classes)
         scheduled: List[ScheduledClass] = []
         unscheduled: List[ClassDefinition] = []
         conflicts: List[Dict[str, Any]] = []
@@ -230,10 +353,12 @@ class ScheduleOptimizer:
         
         # Sort classes by priority (more constrained first)
         sorted_classes = self._prioritize_classes(classes, instructors)
+        running_score = 0.0
         
-        for class_def in sorted_classes:
+        for done, class_def in enumerate(sorted_classes, 1):
             best_assignment = None
             best_score = -1
+            candidate_slots = catalog.slots_for(class_def.duration_minutes)
             
             # Find all valid assignments
             for instructor in instructors:
@@ -246,10 +371,7 @@ class ScheduleOptimizer:
                     if not room.has_features(class_def.required_features):
                         continue
                     
-                    for slot in all_slots:
-                        if slot.duration_minutes() != class_def.duration_minutes:
-                            continue
-                        
+                    for slot in candidate_slots:
                         # Check hard constraints
                         if not self._is_valid_assignment(
                             class_def, instructor, room, slot,
@@ -278,13 +400,31 @@ class ScheduleOptimizer:
                 scheduled.append(scheduled_class)
                 instructor_schedule[instructor.id].append(slot)
                 room_schedule[room.id].append(slot)
+                running_score += best_score
             else:
                 unscheduled.append(class_def)
                 conflicts.append({
                     'class': class_def.name,
                     'reason': self._get_failure_reason(class_def, instructors, rooms)
                 })
+            
+            self._report_progress(done, len(sorted_classes), len(scheduled), running_score)
         
+        return self._build_result(
+            scheduled, unscheduled, conflicts,
+            instructor_schedule, instructors, rooms
+        )
+    
+    def _build_result(
+        self,
+        scheduled: List[ScheduledClass],
+        unscheduled: List[ClassDefinition],
+        conflicts: List[Dict[str, Any]],
+        instructor_schedule: Dict[str, List[TimeSlot]],
+        instructors: List[Instructor],
+        rooms: List[Room]
+    ) -> OptimizationResult:
+        """Assemble utilization metrics and the overall score into a result."""
         # Calculate utilization metrics
         utilization = self._calculate_utilization(
             scheduled, instructors, rooms
@@ -305,7 +445,8 @@ class ScheduleOptimizer:
             unscheduled=unscheduled,
             conflicts=conflicts,
             utilization=utilization,
-            score=total_score / max(len(scheduled), 1)
+            score=total_score / max(len(scheduled), 1),
+            engine=self.engine_name
         )
     
     def _prioritize_classes(
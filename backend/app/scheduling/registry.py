@@ -0,0 +1,41 @@
+# Optimizer Registry - Selects the scheduling engine used for optimization
+from typing import Dict, Type
+
+from .optimizer import ScheduleOptimizer, ScheduleConstraints
+from .bitset_engine import BitsetScheduleOptimizer
+from .exact_engine import ExactScheduleOptimizer
+from .multistart import MultiStartScheduleOptimizer
+
+
+DEFAULT_ENGINE = 'greedy'
+
+OPTIMIZER_ENGINES: Dict[str, Type[ScheduleOptimizer]] = {
+    'greedy': ScheduleOptimizer,
+    'bitset': BitsetScheduleOptimizer,
+    'exact': ExactScheduleOptimizer,
+    'multistart': MultiStartScheduleOptimizer,
+}
+
+
+def get_optimizer(
+    engine: str = None,
+    constraints: ScheduleConstraints = None,
+    **options
+) -> ScheduleOptimizer:
+    """
+    Create an optimizer for the given engine name.
+
+    Extra keyword options (e.g. `time_budget_seconds` for the exact engine)
+    are passed to the engine's constructor.
+
+    Raises:
+        ValueError: If the engine is not registered
+    """
+    engine = engine or DEFAULT_ENGINE
+    optimizer_class = OPTIMIZER_ENGINES.get(engine)
+    if optimizer_class is None:
+        raise ValueError(
+            f"Unknown scheduling engine '{engine}'. "
+            f"Available: {', '.join(OPTIMIZER_ENGINES)}"
+        )
+    return optimizer_class(constraints, **options)
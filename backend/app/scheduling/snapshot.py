@@ -0,0 +1,112 @@
+# Schedule Snapshot - Bulk-loaded studio scheduling data shared within a request
+from typing import Dict, List, Any, Callable, Iterable
+from collections import defaultdict
+
+from app.models import DanceClass, ClassSchedule, User, Room as RoomModel, InstructorAvailability
+
+
+class ScheduleSnapshot:
+    """
+    Scheduling data for one studio, loaded with one query per table.
+
+    Each collection is loaded on first access and reused afterwards, so a
+    generator can call `load_instructors`, `get_current_schedule` and friends
+    any number of times for a fixed number of queries. A snapshot is meant
+    to live for a single request; call `invalidate` after writing rows that
+    a cached collection covers.
+    """
+
+    # Collections derived from another collection
+    DEPENDENTS = {
+        'instructors': ('availability',),
+        'schedules': ('schedule_classes', 'schedule_instructors'),
+    }
+
+    def __init__(self, studio_id: str):
+        self.studio_id = studio_id
+        self._cache: Dict[str, Any] = {}
+
+    def _cached(self, name: str, loader: Callable[[], Any]) -> Any:
+        if name not in self._cache:
+            self._cache[name] = loader()
+        return self._cache[name]
+
+    def invalidate(self, *names: str):
+        """Drop cached collections (all of them if no names are given)."""
+        if not names:
+            self._cache.clear()
+        for name in names:
+            self._cache.pop(name, None)
+            for dependent in self.DEPENDENTS.get(name, ()):
+                self._cache.pop(dependent, None)
+
+    @property
+    def instructors(self) -> List[User]:
+        """Users with the INSTRUCTOR role."""
+        return self._cached('instructors', lambda: User.query.filter_by(
+            studio_id=self.studio_id,
+            role='INSTRUCTOR'
+        ).all())
+
+    @property
+    def availability(self) -> Dict[str, List[InstructorAvailability]]:
+        """Available-time records grouped by instructor id."""
+        def load():
+            records = InstructorAvailability.query.join(
+                User, User.id == InstructorAvailability.instructor_id
+            ).filter(
+                User.studio_id == self.studio_id,
+                User.role == 'INSTRUCTOR',
+                InstructorAvailability.is_available == True
+            ).all()
+            grouped = defaultdict(list)
+            for record in records:
+                grouped[record.instructor_id].append(record)
+            return grouped
+
+        return self._cached('availability', load)
+
+    @property
+    def rooms(self) -> List[RoomModel]:
+        """Active rooms."""
+        return self._cached('rooms', lambda: RoomModel.query.filter_by(
+            studio_id=self.studio_id,
+            is_active=True
+        ).all())
+
+    @property
+    def classes(self) -> List[DanceClass]:
+        """Active class definitions."""
+        return self._cached('classes', lambda: DanceClass.query.filter_by(
+            studio_id=self.studio_id,
+            is_active=True
+        ).all())
+
+    @property
+    def schedules(self) -> List[ClassSchedule]:
+        """Schedule rows that aren't cancelled."""
+        return self._cached('schedules', lambda: ClassSchedule.query.filter_by(
+            studio_id=self.studio_id,
+            is_cancelled=False
+        ).all())
+
+    @property
+    def schedule_classes(self) -> Dict[str, DanceClass]:
+        """Classes referenced by `schedules` (including inactive ones), by id."""
+        return self._cached('schedule_classes', lambda: self._by_id(
+            DanceClass, (s.class_id for s in self.schedules)
+        ))
+
+    @property
+    def schedule_instructors(self) -> Dict[str, User]:
+        """Instructors referenced by `schedules`, by id."""
+        return self._cached('schedule_instructors', lambda: self._by_id(
+            User, (s.instructor_id for s in self.schedules)
+        ))
+
+    @staticmethod
+    def _by_id(model, ids: Iterable[str]) -> Dict[str, Any]:
+        ids = {i for i in ids if i}
+        if not ids:
+            return {}
+        return {row.id: row for row in model.query.filter(model.id.in_(ids)).all()}
@@ -0,0 +1,187 @@
+# Slot Suggestions - Ranked time suggestions for new classes from a free-time index
+import heapq
+import time as timer
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+from collections import defaultdict
+from bisect import bisect_left, bisect_right, insort
+
+from .optimizer import (
+    ScheduleConstraints, ClassDefinition, Instructor, Room, TimeSlot
+)
+from .bitset_engine import (
+    BitsetScheduleOptimizer, AvailabilityIndex, DayOccupancy,
+    to_minutes, minute_mask
+)
+from .incremental import ExistingAssignment
+
+
+DEFAULT_TOP_K = 5
+
+
+@dataclass
+class Suggestion:
+    """One ranked (time slot, instructor, room) option for a class."""
+    time_slot: TimeSlot
+    instructor: Instructor
+    room: Room
+    score: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'day': self.time_slot.day.name,
+            'start_time': self.time_slot.start_time.strftime('%H:%M'),
+            'end_time': self.time_slot.end_time.strftime('%H:%M'),
+            'instructor': self.instructor.name,
+            'instructor_id': self.instructor.id,
+            'room': self.room.name,
+            'room_id': self.room.id,
+            'score': self.score
+        }
+
+
+class SuggestionIndex:
+    """
+    Free-time index of a studio's instructors and rooms.
+
+    Built once from the saved schedule, then queried for any number of new
+    classes. Suggestions respect the optimizer's hard constraints
+    (availability, double-booking, breaks, max concurrent classes) and are
+    ranked by the same soft-constraint score as `_score_assignment`.
+    """
+
+    def __init__(
+        self,
+        instructors: List[Instructor],
+        rooms: List[Room],
+        current: List[ExistingAssignment],
+        constraints: ScheduleConstraints = None
+    ):
+        self.optimizer = BitsetScheduleOptimizer(constraints)
+        self.instructors = instructors
+        self.rooms = rooms
+        self.timed_out = False
+
+        self._availability = {i.id: AvailabilityIndex(i.availability) for i in instructors}
+        self._instructor_days: Dict[Tuple[str, int], DayOccupancy] = defaultdict(DayOccupancy)
+        self._room_days: Dict[Tuple[str, int], DayOccupancy] = defaultdict(DayOccupancy)
+        self._day_starts: Dict[int, List[int]] = defaultdict(list)
+        self._day_ends: Dict[int, List[int]] = defaultdict(list)
+
+        for row in current:
+            self._reserve(row.instructor_id, row.room_name, row.time_slot)
+
+    def _reserve(self, instructor_id: Optional[str], room_name: Optional[str], slot: TimeSlot):
+        day, start, end = slot.day.value, to_minutes(slot.start_time), to_minutes(slot.end_time)
+        if instructor_id:
+            self._instructor_days[(instructor_id, day)].add(start, end)
+        if room_name:
+            self._room_days[(room_name, day)].add(start, end)
+        insort(self._day_starts[day], start)
+        insort(self._day_ends[day], end)
+
+    def suggest(
+        self,
+        class_def: ClassDefinition,
+        top_k: int = DEFAULT_TOP_K,
+        deadline: float = None
+    ) -> List[Suggestion]:
+        """
+        Best `top_k` options for a class, highest score first.
+
+        Each (slot, instructor) pair contributes its best-scoring room. If
+        `deadline` (a `time.perf_counter()` value) passes, the best options
+        found so far are returned and `timed_out` is set.
+        """
+        optimizer = self.optimizer
+        constraints = optimizer.constraints
+        catalog = optimizer.slot_catalog([class_def.duration_minutes])
+        all_slots = catalog.time_slots
+
+        qualified = [i for i in self.instructors if i.can_teach(class_def.dance_style)]
+        suitable_rooms = sorted(
+            (
+                (optimizer._score_room(class_def, r), n, r) for n, r in enumerate(self.rooms)
+                if r.capacity >= class_def.min_capacity
+                and r.has_features(class_def.required_features)
+            ),
+            key=lambda item: (-item[0], item[1])
+        )
+        if not qualified or not suitable_rooms:
+            return []
+
+        # Min-heap of (score, -sequence, suggestion); earlier options win ties
+        heap: List[Tuple[float, int, Suggestion]] = []
+        sequence = 0
+
+        for idx in catalog.indices_for(class_def.duration_minutes):
+            if deadline is not None and timer.perf_counter() > deadline:
+                self.timed_out = True
+                break
+
+            day, start, end = catalog.days[idx], catalog.starts[idx], catalog.ends[idx]
+            concurrent = (
+                bisect_left(self._day_starts[day], end) -
+                bisect_right(self._day_ends[day], start)
+            )
+            if concurrent >= constraints.max_concurrent_classes:
+                continue
+
+            slot = all_slots[idx]
+            mask = minute_mask(start, end)
+            slot_score = optimizer._score_slot(class_def, slot)
+
+            room = None
+            for room_score, _, candidate in suitable_rooms:
+                occupancy = self._room_days.get((candidate.name, day))
+                if occupancy is None or not occupancy.busy & mask:
+                    room = candidate
+                    break
+            if room is None:
+                continue
+
+            for instructor in qualified:
+                occupancy = self._instructor_days.get((instructor.id, day))
+                if not optimizer._instructor_free(
+                    self._availability[instructor.id], occupancy,
+                    day, start, end, mask, constraints.min_break_between_classes
+                ):
+                    continue
+
+                score = slot_score + room_score
+                if occupancy is not None and occupancy.count:
+                    score += optimizer.continuity_weight * occupancy.count
+
+                entry = (score, -sequence, Suggestion(slot, instructor, room, score))
+                sequence += 1
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+
+        return [entry[2] for entry in sorted(heap, key=lambda e: e[:2], reverse=True)]
+
+    def suggest_many(
+        self,
+        classes: List[ClassDefinition],
+        top_k: int = DEFAULT_TOP_K,
+        deadline: float = None
+    ) -> Dict[str, List[Suggestion]]:
+        """
+        Suggest times for several new classes jointly.
+
+        Classes are handled most-constrained first; each class's top option
+        is reserved before the next class is ranked, so the first option of
+        every class can be accepted together without conflicts.
+
+        Returns:
+            Suggestions keyed by class id
+        """
+        results: Dict[str, List[Suggestion]] = {}
+        for class_def in self.optimizer._prioritize_classes(classes, self.instructors):
+            suggestions = self.suggest(class_def, top_k, deadline)
+            results[class_def.id] = suggestions
+            if suggestions:
+                best = suggestions[0]
+                self._reserve(best.instructor.id, best.room.name, best.time_slot)
+        return results
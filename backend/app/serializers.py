@@ -0,0 +1,267 @@
+"""
+Response serializers for session and booking listings.
+
+Each serializer loads everything its rows reference (classes, instructors,
+rooms, contacts, studios) up front with one `IN (...)` query per model and
+builds the response dicts from those maps, so a listing costs a fixed
+number of queries however many rows it returns.
+"""
+
+from datetime import datetime, time
+from typing import Dict, Iterable, List
+
+from app.models import User, Contact, ClassSession, Studio, DanceClass, Room
+
+# Keep IN lists well under SQL Server's 2100 parameter limit
+IN_QUERY_CHUNK_SIZE = 500
+
+# Shown on the public booking page when a class has no price set
+PUBLIC_DEFAULT_PRICE = 500
+
+
+def load_by_id(model, ids: Iterable) -> Dict[str, object]:
+    """Load the rows of `model` with the given ids, keyed by id."""
+    ids = list({id_ for id_ in ids if id_})
+    records = {}
+    for start in range(0, len(ids), IN_QUERY_CHUNK_SIZE):
+        chunk = ids[start:start + IN_QUERY_CHUNK_SIZE]
+        for record in model.query.filter(model.id.in_(chunk)).all():
+            records[record.id] = record
+    return records
+
+
+class SessionRelations:
+    """Classes, instructors and rooms referenced by a list of sessions."""
+
+    def __init__(self, sessions, class_instructors: bool = False):
+        self.classes = load_by_id(DanceClass, (s.class_id for s in sessions))
+
+        instructor_ids = [s.instructor_id for s in sessions]
+        if class_instructors:
+            instructor_ids += [c.instructor_id for c in self.classes.values()]
+        self.instructors = load_by_id(User, instructor_ids)
+
+        self.rooms = load_by_id(Room, (s.room_id for s in sessions))
+
+    def instructor_name(self, session):
+        """Session instructor, falling back to the class's instructor."""
+        if session.instructor_name:
+            return session.instructor_name
+        if session.instructor_id:
+            instructor = self.instructors.get(session.instructor_id)
+            return instructor.name if instructor else None
+
+        dance_class = self.classes.get(session.class_id)
+        if dance_class:
+            if dance_class.instructor_name:
+                return dance_class.instructor_name
+            instructor = self.instructors.get(dance_class.instructor_id)
+            if instructor:
+                return instructor.name
+        return None
+
+
+def serialize_sessions(sessions) -> List[dict]:
+    """Session list rows with class, instructor and room names."""
+    relations = SessionRelations(sessions, class_instructors=True)
+
+    result = []
+    for session in sessions:
+        session_data = session.to_dict()
+
+        dance_class = relations.classes.get(session.class_id)
+        if dance_class:
+            session_data['class_name'] = dance_class.name
+            session_data['class_type'] = dance_class.dance_style
+            session_data['level'] = dance_class.level
+            session_data['drop_in_price'] = float(dance_class.price) if dance_class.price else 0
+
+        instructor_name = relations.instructor_name(session)
+        if instructor_name:
+            session_data['instructor_name'] = instructor_name
+
+        room = relations.rooms.get(session.room_id)
+        if room:
+            session_data['room_name'] = room.name
+
+        result.append(session_data)
+    return result
+
+
+def serialize_weekly_schedule(sessions) -> Dict[int, List[dict]]:
+    """Sessions grouped by weekday (0=Monday to 6=Sunday)."""
+    relations = SessionRelations(sessions)
+
+    schedule = {i: [] for i in range(7)}
+    for session in sessions:
+        session_data = session.to_dict()
+
+        dance_class = relations.classes.get(session.class_id)
+        if dance_class:
+            session_data['class_name'] = dance_class.name
+            session_data['class_type'] = dance_class.dance_style
+            session_data['level'] = dance_class.level
+
+        instructor = relations.instructors.get(session.instructor_id)
+        if instructor:
+            session_data['instructor_name'] = instructor.name
+
+        schedule[session.date.weekday()].append(session_data)
+    return schedule
+
+
+def serialize_session_detail(session, attendees=None) -> dict:
+    """
+    One session with its class, instructor and room.
+
+    Args:
+        attendees: confirmed bookings to list as attendees, or None to leave
+            the attendee list out
+    """
+    relations = SessionRelations([session])
+    session_data = session.to_dict(include_bookings=False)
+
+    dance_class = relations.classes.get(session.class_id)
+    if dance_class:
+        session_data['class'] = dance_class.to_dict()
+
+    instructor = relations.instructors.get(session.instructor_id)
+    if instructor:
+        session_data['instructor'] = instructor.to_dict()
+
+    room = relations.rooms.get(session.room_id)
+    if room:
+        session_data['room'] = room.to_dict()
+
+    if attendees is not None:
+        contacts = load_by_id(Contact, (b.contact_id for b in attendees))
+        session_data['attendees'] = [
+            {
+                'booking_id': booking.id,
+                'contact_name': contacts[booking.contact_id].name,
+                'contact_phone': contacts[booking.contact_id].phone,
+                'checked_in': booking.checked_in_at is not None
+            }
+            for booking in attendees
+            if booking.contact_id in contacts
+        ]
+    return session_data
+
+
+def serialize_bookings(bookings, include_studio: bool = False) -> List[dict]:
+    """
+    Booking list rows with session date, class name and contact name.
+
+    Args:
+        include_studio: add the studio name and slug (for customers, whose
+            bookings can span studios)
+    """
+    sessions = load_by_id(ClassSession, (b.session_id for b in bookings))
+    classes = load_by_id(DanceClass, (s.class_id for s in sessions.values()))
+    studios = load_by_id(Studio, (c.studio_id for c in classes.values())) if include_studio else {}
+    contacts = load_by_id(Contact, (b.contact_id for b in bookings))
+
+    result = []
+    for booking in bookings:
+        booking_data = booking.to_dict()
+
+        session = sessions.get(booking.session_id)
+        if session:
+            booking_data['session_date'] = session.date.isoformat()
+            booking_data['session_time'] = session.start_time.isoformat() if session.start_time else None
+
+            dance_class = classes.get(session.class_id)
+            if dance_class:
+                booking_data['class_name'] = dance_class.name
+
+                studio = studios.get(dance_class.studio_id)
+                if studio:
+                    booking_data['studio_name'] = studio.name
+                    booking_data['studio_slug'] = studio.slug
+
+        contact = contacts.get(booking.contact_id)
+        if contact:
+            booking_data['contact_name'] = contact.name
+
+        result.append(booking_data)
+    return result
+
+
+def serialize_session_bookings(bookings) -> List[dict]:
+    """Bookings of one session with customer contact details."""
+    contacts = load_by_id(Contact, (b.contact_id for b in bookings))
+
+    result = []
+    for booking in bookings:
+        contact = contacts.get(booking.contact_id)
+        result.append({
+            'id': booking.id,
+            'booking_number': booking.booking_number,
+            'customer_name': contact.name if contact else 'Unknown',
+            'customer_email': contact.email if contact else '',
+            'customer_phone': contact.phone if contact else '',
+            'status': booking.status.lower() if booking.status else 'pending',
+            'payment_method': booking.payment_method,
+            'razorpay_payment_id': booking.razorpay_payment_id,
+            'razorpay_order_id': booking.razorpay_order_id,
+            'booked_at': booking.booked_at.isoformat() if booking.booked_at else booking.created_at.isoformat()
+        })
+    return result
+
+
+def _public_instructor_name(dance_class, instructors) -> str:
+    if dance_class:
+        # Prefer instructor_name field, fallback to instructor_id lookup
+        if dance_class.instructor_name:
+            return dance_class.instructor_name
+        instructor = instructors.get(dance_class.instructor_id)
+        if instructor:
+            return instructor.name
+    return 'Instructor'
+
+
+def _public_class_details(dance_class) -> dict:
+    return {
+        'class_id': dance_class.id,
+        'class_description': dance_class.description or '',
+        'class_images': dance_class.images if dance_class.images else [],
+        'class_videos': dance_class.videos if dance_class.videos else [],
+        'instructor_description': dance_class.instructor_description or '',
+        'instructor_instagram_handle': dance_class.instructor_instagram_handle or '',
+        'class_price': float(dance_class.price) if dance_class.price else PUBLIC_DEFAULT_PRICE,
+        'class_capacity': dance_class.max_capacity,
+        'class_duration': dance_class.duration_minutes,
+    }
+
+
+def serialize_public_sessions(sessions) -> List[dict]:
+    """Sessions for the public booking page, with class details."""
+    classes = load_by_id(DanceClass, (s.class_id for s in sessions))
+    instructors = load_by_id(User, (c.instructor_id for c in classes.values()))
+
+    result = []
+    for session in sessions:
+        dance_class = classes.get(session.class_id)
+        start_time = session.start_time or datetime.combine(session.date, time(18, 0))
+        end_time = session.end_time or datetime.combine(session.date, time(19, 0))
+
+        session_data = {
+            'id': session.id,
+            'class_name': dance_class.name if dance_class else 'Class',
+            'style': dance_class.dance_style if dance_class else '',
+            'level': dance_class.level if dance_class else 'All Levels',
+            'instructor_name': _public_instructor_name(dance_class, instructors),
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'date': session.date.isoformat(),
+            'spots_available': session.available_spots,
+            'max_students': session.max_capacity,
+            'drop_in_price': float(dance_class.price) if dance_class and dance_class.price else PUBLIC_DEFAULT_PRICE,
+            'is_cancelled': session.status == 'CANCELLED'
+        }
+        if dance_class:
+            session_data.update(_public_class_details(dance_class))
+
+        result.append(session_data)
+    return result
+
@@ -0,0 +1,198 @@
+"""
+Booking confirmation pipeline: QR code and PDF, upload, customer notification.
+
+A booking is committed with confirmation_status PENDING and the work runs
+afterwards as a Celery chain of two tasks (see app.tasks):
+
+    generate_confirmation_assets -> send_confirmation
+
+Both steps are keyed on the booking id and safe to run again. Assets are
+skipped once their URLs are stored, and the notification is claimed with a
+conditional UPDATE on notified_at, so a retried or duplicated task never
+sends the customer a second message.
+"""
+
+import logging
+from datetime import datetime
+
+from app import db
+from app.models import Booking, ClassSession, Contact, DanceClass, Studio, ConfirmationStatus
+from app.services.notification_service import NotificationService
+from app.services.qr_service import QRService
+
+logger = logging.getLogger(__name__)
+
+
+class ConfirmationError(Exception):
+    """A confirmation step failed and should be retried."""
+    pass
+
+
+class BookingConfirmation:
+    """Produces and delivers booking confirmations."""
+
+    @staticmethod
+    def booking_details(booking) -> dict:
+        """Booking details shown on the PDF and in the notification."""
+        contact = Contact.query.get(booking.contact_id) if booking.contact_id else None
+        session = ClassSession.query.get(booking.session_id) if booking.session_id else None
+        dance_class = DanceClass.query.get(session.class_id) if session and session.class_id else None
+        studio = Studio.query.get(booking.studio_id)
+
+        return {
+            'booking_number': booking.booking_number,
+            'customer_name': contact.name if contact else '',
+            'customer_email': contact.email or '' if contact else '',
+            'customer_phone': contact.phone or '' if contact else '',
+            'class_name': dance_class.name if dance_class else 'Class',
+            'session_date': session.date.strftime('%b %d, %Y') if session and session.date else 'N/A',
+            'session_time': session.start_time.strftime('%H:%M') if session and session.start_time else 'N/A',
+            'studio_name': studio.name if studio else '',
+            'studio_address': f"{studio.address}, {studio.city}" if studio and studio.address and studio.city else (studio.address or '' if studio else ''),
+            'payment_method': booking.payment_method or 'N/A',
+            'amount': float(dance_class.price) if dance_class and dance_class.price else 0,
+        }
+
+    @staticmethod
+    def generate_assets(booking_id: str):
+        """
+        Generate the QR code and PDF and upload them, unless already done.
+
+        Raises:
+            ConfirmationError: if the upload failed
+        """
+        booking = Booking.query.get(booking_id)
+        if not booking:
+            return None
+        if booking.qr_code_url and booking.pdf_url:
+            return booking
+
+        if not booking.qr_code_token:
+            booking.qr_code_token = QRService.generate_qr_token()
+
+        qr_url, pdf_url = QRService.generate_and_upload_booking_assets(
+            booking_number=booking.booking_number,
+            qr_token=booking.qr_code_token,
+            booking_data=BookingConfirmation.booking_details(booking),
+            studio_id=booking.studio_id
+        )
+        if not qr_url or not pdf_url:
+            db.session.rollback()
+            raise ConfirmationError('Failed to generate QR code/PDF')
+
+        booking.qr_code_url = qr_url
+        booking.pdf_url = pdf_url
+        booking.confirmation_status = ConfirmationStatus.ASSETS_READY.value
+        booking.confirmation_error = None
+        db.session.commit()
+        return booking
+
+    @staticmethod
+    def notify(booking_id: str):
+        """
+        Send the confirmation to the customer, at most once per booking.
+
+        Returns:
+            Channels used ({'email_sent', 'whatsapp_sent'}), or None if the
+            booking was already notified
+
+        Raises:
+            ConfirmationError: if no channel could deliver the confirmation
+        """
+        claimed = Booking.query.filter(
+            Booking.id == booking_id,
+            Booking.notified_at.is_(None)
+        ).update({Booking.notified_at: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return None
+
+        booking = Booking.query.get(booking_id)
+        contact = Contact.query.get(booking.contact_id) if booking.contact_id else None
+        if not contact:
+            booking.confirmation_status = ConfirmationStatus.NOTIFIED.value
+            db.session.commit()
+            return {'email_sent': False, 'whatsapp_sent': False}
+
+        contact_data = {
+            'name': contact.name,
+            'email': contact.email,
+            'phone': contact.phone
+        }
+        try:
+            result = NotificationService.send_booking_confirmation(
+                contact_data=contact_data,
+                booking_data=BookingConfirmation.booking_details(booking),
+                pdf_url=booking.pdf_url
+            )
+        except Exception as e:
+            result = None
+            logger.error(f"Booking confirmation for {booking_id} failed: {e}")
+
+        attempted = contact.email or (contact.phone and booking.pdf_url)
+        if result is None or (attempted and not any(result.values())):
+            # Release the claim so the retry can send it
+            Booking.query.filter_by(id=booking_id).update(
+                {Booking.notified_at: None}, synchronize_session=False
+            )
+            db.session.commit()
+            raise ConfirmationError('Failed to send booking confirmation')
+
+        booking.confirmation_status = ConfirmationStatus.NOTIFIED.value
+        booking.confirmation_error = None
+        db.session.commit()
+        return result
+
+    @staticmethod
+    def mark_failed(booking_id: str, error: str):
+        """Record that the pipeline gave up on a booking."""
+        db.session.rollback()
+        Booking.query.filter_by(id=booking_id).update({
+            Booking.confirmation_status: ConfirmationStatus.FAILED.value,
+            Booking.confirmation_error: str(error)[:500]
+        }, synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def reset(booking):
+        """Regenerate and resend a booking's confirmation. Does not commit."""
+        booking.qr_code_url = None
+        booking.pdf_url = None
+        booking.notified_at = None
+        booking.confirmation_status = ConfirmationStatus.PENDING.value
+        booking.confirmation_error = None
+
+    @staticmethod
+    def enqueue(booking_id: str):
+        """
+        Start the pipeline for a committed booking.
+
+        Falls back to running the steps in-process when the task queue is
+        unavailable, so bookings still get their confirmation.
+        """
+        from app import redis_client
+
+        if redis_client is not None:
+            try:
+                from celery import chain
+                from app.tasks import generate_confirmation_assets_job, send_confirmation_job
+
+                chain(
+                    generate_confirmation_assets_job.si(booking_id),
+                    send_confirmation_job.si(booking_id)
+                ).apply_async(retry=False)
+                return
+            except Exception as e:
+                logger.warning(f"Could not queue confirmation for booking {booking_id}: {e}")
+
+        BookingConfirmation.run(booking_id)
+
+    @staticmethod
+    def run(booking_id: str):
+        """Run the whole pipeline in-process, recording a failure."""
+        try:
+            BookingConfirmation.generate_assets(booking_id)
+            BookingConfirmation.notify(booking_id)
+        except Exception as e:
+            logger.error(f"Booking confirmation for {booking_id} failed: {e}")
+            BookingConfirmation.mark_failed(booking_id, e)
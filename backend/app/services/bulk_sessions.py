@@ -0,0 +1,300 @@
+"""
+Bulk cancel and reschedule of class sessions.
+
+Staff select sessions with a filter (date range, class, instructor) and the
+whole selection is changed in one transaction with set-based statements:
+one UPDATE per table and chunk of session ids, rather than a round trip
+per session and booking. Class pack credits of cancelled bookings are
+given back with one UPDATE per distinct credit count.
+
+Cancelled sessions are updated first, so a booking that races the
+cancellation fails its seat reservation instead of landing on a cancelled
+session. Customer notifications are sent afterwards by background tasks,
+NOTIFY_BATCH_SIZE bookings per task.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, update
+
+from app import db
+from app.models import (
+    Booking, ClassPackPurchase, ClassSession, Contact, DanceClass, SeatHold,
+    SeatHoldStatus, Studio, Waitlist
+)
+from app.serializers import IN_QUERY_CHUNK_SIZE, load_by_id
+from app.services.checkin import evict_on_commit
+from app.services.public_schedule_cache import invalidate_on_commit
+
+logger = logging.getLogger(__name__)
+
+# Bookings that still hold a seat or a waitlist spot
+LIVE_BOOKING_STATUSES = ('PENDING', 'CONFIRMED', 'WAITLIST')
+
+NOTIFY_BATCH_SIZE = 200
+
+CANCELLED = 'cancelled'
+RESCHEDULED = 'rescheduled'
+
+
+def _chunks(ids: List[str]) -> Iterable[List[str]]:
+    for start in range(0, len(ids), IN_QUERY_CHUNK_SIZE):
+        yield ids[start:start + IN_QUERY_CHUNK_SIZE]
+
+
+class BulkSessionOperations:
+    """Cancel or reschedule many sessions at once."""
+
+    @staticmethod
+    def session_query(studio_id: str, start_date, end_date, class_id: str = None, instructor_id: str = None):
+        """Scheduled sessions of a studio matching a bulk filter."""
+        query = ClassSession.query.filter(
+            ClassSession.studio_id == studio_id,
+            ClassSession.date >= start_date,
+            ClassSession.date <= end_date,
+            ClassSession.status == 'SCHEDULED'
+        )
+        if class_id:
+            query = query.filter(ClassSession.class_id == class_id)
+        if instructor_id:
+            query = query.filter(ClassSession.instructor_id == instructor_id)
+        return query
+
+    @staticmethod
+    def cancel(studio_id: str, reason: str, **filters) -> Dict:
+        """
+        Cancel matching sessions with their bookings, waitlists and holds.
+
+        Class pack credits of the cancelled bookings are refunded. Does not
+        commit.
+
+        Args:
+            filters: start_date, end_date, class_id, instructor_id (see session_query)
+
+        Returns:
+            Counts, and the ids of the cancelled bookings to notify
+        """
+        now = datetime.utcnow()
+        session_query = BulkSessionOperations.session_query(studio_id, **filters)
+        session_ids = [row[0] for row in session_query.with_entities(ClassSession.id).all()]
+
+        sessions_cancelled = 0
+        booking_ids = []
+        tokens = []
+        pack_credits = Counter()
+
+        for chunk in _chunks(session_ids):
+            sessions_cancelled += ClassSession.query.filter(
+                ClassSession.id.in_(chunk),
+                ClassSession.status == 'SCHEDULED'
+            ).update({
+                ClassSession.status: 'CANCELLED',
+                ClassSession.cancellation_reason: reason[:255],
+                ClassSession.held_count: 0,
+                ClassSession.updated_at: now
+            }, synchronize_session=False)
+
+            bookings = Booking.query.filter(
+                Booking.session_id.in_(chunk),
+                Booking.status.in_(LIVE_BOOKING_STATUSES)
+            )
+            for booking_id, pack_id, token in bookings.with_entities(
+                Booking.id, Booking.class_pack_purchase_id, Booking.qr_code_token
+            ):
+                booking_ids.append(booking_id)
+                tokens.append(token)
+                if pack_id:
+                    pack_credits[pack_id] += 1
+
+            bookings.update({
+                Booking.status: 'CANCELLED',
+                Booking.cancelled_at: now,
+                Booking.cancellation_reason: f'Class cancelled: {reason}'[:255],
+                Booking.updated_at: now
+            }, synchronize_session=False)
+
+            Waitlist.query.filter(
+                Waitlist.session_id.in_(chunk),
+                Waitlist.status.in_(('WAITING', 'NOTIFIED'))
+            ).update({Waitlist.status: 'CANCELLED'}, synchronize_session=False)
+
+            # Checkouts in progress get a 409 when their payment comes in
+            SeatHold.query.filter(
+                SeatHold.session_id.in_(chunk),
+                SeatHold.status == SeatHoldStatus.HELD.value
+            ).update({
+                SeatHold.status: SeatHoldStatus.RELEASED.value,
+                SeatHold.updated_at: now
+            }, synchronize_session=False)
+
+        BulkSessionOperations._refund_pack_credits(pack_credits)
+
+        if sessions_cancelled:
+            invalidate_on_commit(db.session(), {studio_id})
+            evict_on_commit(db.session(), tokens)
+
+        return {
+            'sessions_cancelled': sessions_cancelled,
+            'bookings_cancelled': len(booking_ids),
+            'credits_refunded': sum(pack_credits.values()),
+            'booking_ids': booking_ids,
+        }
+
+    @staticmethod
+    def reschedule(studio_id: str, shift_days: int = 0, start_time=None, **filters) -> Dict:
+        """
+        Move matching sessions by whole days and/or to a new start time.
+
+        Durations are kept. Sessions created from a schedule remember their
+        original date so the schedule doesn't put them back. Does not commit.
+
+        Args:
+            shift_days: days to move each session by (negative moves earlier)
+            start_time: new time of day (datetime.time), or None to keep it
+            filters: start_date, end_date, class_id, instructor_id (see session_query)
+
+        Returns:
+            Counts, and the ids of the affected live bookings to notify
+        """
+        sessions = BulkSessionOperations.session_query(studio_id, **filters).all()
+
+        rows = []
+        for session in sessions:
+            new_date = session.date + timedelta(days=shift_days)
+            new_start = datetime.combine(new_date, start_time or session.start_time.time())
+            if (new_date, new_start) == (session.date, session.start_time):
+                continue
+            rows.append({
+                'id': session.id,
+                'date': new_date,
+                'start_time': new_start,
+                'end_time': new_start + (session.end_time - session.start_time),
+                'rescheduled_from': session.rescheduled_from or (session.date if session.schedule_id else None),
+            })
+
+        booking_ids = []
+        if rows:
+            # Bulk UPDATE by primary key: one executemany round trip
+            db.session.execute(update(ClassSession), rows)
+            for session in sessions:
+                db.session.expire(session)
+
+            moved_ids = [row['id'] for row in rows]
+            tokens = []
+            for chunk in _chunks(moved_ids):
+                for booking_id, token in db.session.query(Booking.id, Booking.qr_code_token).filter(
+                    Booking.session_id.in_(chunk),
+                    Booking.status.in_(LIVE_BOOKING_STATUSES)
+                ):
+                    booking_ids.append(booking_id)
+                    tokens.append(token)
+            invalidate_on_commit(db.session(), {studio_id})
+            evict_on_commit(db.session(), tokens)
+
+        return {
+            'sessions_rescheduled': len(rows),
+            'bookings_affected': len(booking_ids),
+            'booking_ids': booking_ids,
+        }
+
+    @staticmethod
+    def _refund_pack_credits(pack_credits: Counter):
+        """Give back class pack credits, {purchase_id: credits}."""
+        by_count = defaultdict(list)
+        for pack_id, credits in pack_credits.items():
+            by_count[credits].append(pack_id)
+
+        for credits, pack_ids in by_count.items():
+            for chunk in _chunks(pack_ids):
+                used = db.func.coalesce(ClassPackPurchase.classes_used, 0)
+                ClassPackPurchase.query.filter(
+                    ClassPackPurchase.id.in_(chunk)
+                ).update({
+                    ClassPackPurchase.classes_used: case((used > credits, used - credits), else_=0),
+                    ClassPackPurchase.status: case(
+                        (ClassPackPurchase.status == 'EXHAUSTED', 'ACTIVE'),
+                        else_=ClassPackPurchase.status
+                    )
+                }, synchronize_session=False)
+
+    @staticmethod
+    def enqueue_notifications(booking_ids: List[str], kind: str, message: str) -> int:
+        """
+        Notify the customers of bookings in background batches.
+
+        Falls back to sending in-process when the task queue is unavailable.
+
+        Returns:
+            Number of batches
+        """
+        from app import redis_client
+
+        batches = [
+            booking_ids[start:start + NOTIFY_BATCH_SIZE]
+            for start in range(0, len(booking_ids), NOTIFY_BATCH_SIZE)
+        ]
+        for batch in batches:
+            if redis_client is not None:
+                try:
+                    from app.tasks import notify_session_changes_job
+                    notify_session_changes_job.apply_async(args=[batch, kind, message], retry=False)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Could not queue session change notifications: {e}")
+            BulkSessionOperations.send_notifications(batch, kind, message)
+        return len(batches)
+
+    @staticmethod
+    def send_notifications(booking_ids: List[str], kind: str, message: Optional[str]) -> int:
+        """
+        Send cancellation or update notices for a batch of bookings.
+
+        Related rows are loaded with one query per model.
+
+        Returns:
+            Number of customers notified
+        """
+        from app.services.notifications import notification_service
+
+        bookings = load_by_id(Booking, booking_ids)
+        sessions = load_by_id(ClassSession, (b.session_id for b in bookings.values()))
+        classes = load_by_id(DanceClass, (s.class_id for s in sessions.values()))
+        contacts = load_by_id(Contact, (b.contact_id for b in bookings.values()))
+        studios = load_by_id(Studio, (b.studio_id for b in bookings.values()))
+
+        notified = 0
+        for booking in bookings.values():
+            contact = contacts.get(booking.contact_id)
+            session = sessions.get(booking.session_id)
+            if not contact or not session:
+                continue
+            dance_class = classes.get(session.class_id)
+            class_name = dance_class.name if dance_class else 'Your class'
+            studio = studios.get(booking.studio_id)
+
+            try:
+                if kind == CANCELLED:
+                    notification_service.send_class_cancellation_notification(
+                        contact=contact,
+                        class_name=class_name,
+                        session_date=session.date,
+                        session_time=session.start_time,
+                        reason=message,
+                        studio=studio
+                    )
+                else:
+                    notification_service.send_class_update_notification(
+                        contact=contact,
+                        class_name=class_name,
+                        changes=[message],
+                        new_date=session.date,
+                        new_time=session.start_time,
+                        studio=studio
+                    )
+                notified += 1
+            except Exception as e:
+                logger.warning(f"Failed to notify contact {contact.id}: {e}")
+        return notified
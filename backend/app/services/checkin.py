@@ -0,0 +1,352 @@
+"""
+QR check-in at the studio door.
+
+Scanning a QR code looks its token up in a cache of check-in cards (the
+booking with its customer, class and studio already resolved), so a scan
+is one cache read plus, when attendance is marked, one conditional UPDATE:
+
+    UPDATE bookings SET status = 'ATTENDED', attendance_marked_at = :now
+     WHERE id = :id AND attendance_marked_at IS NULL AND status != 'CANCELLED'
+
+which also makes double scans harmless. The cards of a studio's upcoming
+sessions are loaded in bulk before class (warm), and a cache miss falls
+back to the indexed token lookup. Cards are kept in Redis, or in a small
+in-process LRU when Redis is unavailable, and evicted when their booking
+changes.
+"""
+
+import json
+import logging
+import threading
+import time as timer
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+import redis
+from sqlalchemy import bindparam, event, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Booking, ClassSession, Contact, DanceClass, Studio
+from app.serializers import IN_QUERY_CHUNK_SIZE, load_by_id
+
+logger = logging.getLogger(__name__)
+
+CARD_KEY = 'checkin:{token}'
+CARD_TTL_SECONDS = 12 * 60 * 60
+LOCAL_TTL_SECONDS = 5 * 60
+LOCAL_MAX_ENTRIES = 2048
+
+# Sessions starting this far ahead are warmed by the beat task
+WARM_AHEAD_MINUTES = 2 * 60
+
+# Scans a single offline sync may upload
+MAX_SYNC_SCANS = 500
+
+# How far ahead of the server clock a scanner's clock may run before its
+# scan times are rejected
+MAX_SCAN_CLOCK_SKEW = timedelta(minutes=5)
+
+# Marks a token whose only scans were in the future
+INVALID_TIME = object()
+
+# Session.info key for QR tokens of bookings changed in the current transaction
+PENDING_TOKENS_KEY = 'checkin_tokens'
+
+
+class CheckInCache:
+    """Check-in cards by QR token."""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES, ttl_seconds: float = LOCAL_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        from app import redis_client
+
+        if redis_client is not None:
+            try:
+                raw = redis_client.get(CARD_KEY.format(token=token))
+                return json.loads(raw) if raw else None
+            except redis.RedisError as e:
+                logger.warning(f"Check-in cache unavailable, using local cache: {e}")
+
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry and entry[0] > timer.monotonic():
+                self._entries.move_to_end(token)
+                return entry[1]
+        return None
+
+    def set_many(self, cards: Dict[str, dict]):
+        from app import redis_client
+
+        if not cards:
+            return
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for token, card in cards.items():
+                    pipe.set(CARD_KEY.format(token=token), json.dumps(card), ex=CARD_TTL_SECONDS)
+                pipe.execute()
+                return
+            except redis.RedisError as e:
+                logger.warning(f"Could not cache check-in cards: {e}")
+
+        expires = timer.monotonic() + self.ttl_seconds
+        with self._lock:
+            for token, card in cards.items():
+                self._entries[token] = (expires, card)
+                self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, tokens: Iterable[str]):
+        from app import redis_client
+
+        tokens = [token for token in tokens if token]
+        if not tokens:
+            return
+        with self._lock:
+            for token in tokens:
+                self._entries.pop(token, None)
+        if redis_client is not None:
+            try:
+                redis_client.delete(*[CARD_KEY.format(token=token) for token in tokens])
+            except redis.RedisError as e:
+                logger.warning(f"Could not evict check-in cards: {e}")
+
+
+checkin_cache = CheckInCache()
+
+
+class CheckInService:
+    """QR code verification and attendance marking."""
+
+    @staticmethod
+    def build_cards(bookings) -> Dict[str, dict]:
+        """Check-in cards of bookings, keyed by QR token (one query per related model)."""
+        sessions = load_by_id(ClassSession, (b.session_id for b in bookings))
+        classes = load_by_id(DanceClass, (s.class_id for s in sessions.values()))
+        contacts = load_by_id(Contact, (b.contact_id for b in bookings))
+        studios = load_by_id(Studio, (b.studio_id for b in bookings))
+
+        cards = {}
+        for booking in bookings:
+            if not booking.qr_code_token:
+                continue
+            contact = contacts.get(booking.contact_id)
+            session = sessions.get(booking.session_id)
+            dance_class = classes.get(session.class_id) if session else None
+            studio = studios.get(booking.studio_id)
+
+            cards[booking.qr_code_token] = {
+                'studio_id': booking.studio_id,
+                'booking': {
+                    'id': booking.id,
+                    'booking_number': booking.booking_number,
+                    'status': booking.status,
+                    'customer_name': contact.name if contact else 'Unknown',
+                    'customer_phone': contact.phone if contact else '',
+                    'customer_email': contact.email if contact else '',
+                    'class_name': dance_class.name if dance_class else 'N/A',
+                    'session_date': session.date.strftime('%b %d, %Y') if session and session.date else 'N/A',
+                    'session_time': session.start_time.strftime('%H:%M') if session and session.start_time else 'N/A',
+                    'studio_name': studio.name if studio else 'N/A',
+                    'payment_method': booking.payment_method,
+                    'razorpay_payment_id': booking.razorpay_payment_id,
+                    'booked_at': booking.booked_at.isoformat() if booking.booked_at else None,
+                    'attendance_marked_at': booking.attendance_marked_at.isoformat() if booking.attendance_marked_at else None,
+                    'already_attended': booking.attendance_marked_at is not None,
+                }
+            }
+        return cards
+
+    @staticmethod
+    def warm(start: datetime, end: datetime, studio_id: str = None) -> int:
+        """
+        Cache the cards of bookings for sessions starting in [start, end].
+
+        Returns:
+            Number of cards cached
+        """
+        query = db.session.query(Booking).join(
+            ClassSession, Booking.session_id == ClassSession.id
+        ).filter(
+            ClassSession.start_time >= start,
+            ClassSession.start_time <= end,
+            ClassSession.status != 'CANCELLED',
+            Booking.status.in_(('CONFIRMED', 'ATTENDED')),
+            Booking.qr_code_token.isnot(None)
+        )
+        if studio_id:
+            query = query.filter(ClassSession.studio_id == studio_id)
+
+        cards = CheckInService.build_cards(query.all())
+        checkin_cache.set_many(cards)
+        return len(cards)
+
+    @staticmethod
+    def card(token: str) -> Optional[dict]:
+        """Check-in card of a QR token, from the cache or the database."""
+        card = checkin_cache.get(token)
+        if card is not None:
+            return card
+
+        booking = Booking.query.filter_by(qr_code_token=token).first()
+        if not booking:
+            return None
+        cards = CheckInService.build_cards([booking])
+        checkin_cache.set_many(cards)
+        return cards.get(token)
+
+    @staticmethod
+    def check_in(token: str, mark_attendance: bool = False) -> Optional[dict]:
+        """
+        Card of a scanned QR token, marking attendance if asked.
+
+        Attendance is marked once; cancelled bookings can't be marked.
+        Commits when marking.
+
+        Returns:
+            The card, or None if the token is unknown
+        """
+        card = CheckInService.card(token)
+        if card is None or not mark_attendance or card['booking']['already_attended']:
+            return card
+
+        marked_at = datetime.utcnow()
+        updated = Booking.query.filter(
+            Booking.id == card['booking']['id'],
+            Booking.attendance_marked_at.is_(None),
+            Booking.status != 'CANCELLED'
+        ).update({
+            Booking.status: 'ATTENDED',
+            Booking.attendance_marked_at: marked_at
+        }, synchronize_session=False)
+        db.session.commit()
+
+        if updated:
+            card['booking'].update({
+                'status': 'ATTENDED',
+                'attendance_marked_at': marked_at.isoformat(),
+                'already_attended': True,
+            })
+            checkin_cache.set_many({token: card})
+            return card
+
+        # The cached card was stale (marked elsewhere or cancelled)
+        checkin_cache.evict([token])
+        return CheckInService.card(token)
+
+    @staticmethod
+    def sync(studio_id: str, scans: List[dict]) -> List[dict]:
+        """
+        Apply scans recorded by a scanner while it was offline.
+
+        Each scan is {'qr_token', 'scanned_at' (ISO, optional)}. Attendance
+        keeps the original scan time (converted to UTC if it has an offset);
+        the bookings are resolved with one query per chunk and marked with
+        one batched conditional UPDATE. Commits.
+
+        Returns:
+            One result per scan: {'qr_token', 'result'} where result is
+            checked_in, already_attended, cancelled, invalid, or
+            invalid_time for a scan time in the future
+        """
+        now = datetime.utcnow()
+        scanned = {}
+        for scan in scans:
+            token = scan.get('qr_token') if isinstance(scan, dict) else None
+            if not token:
+                continue
+            scanned_at = _scan_time(scan.get('scanned_at'))
+            if scanned_at and scanned_at > now + MAX_SCAN_CLOCK_SKEW:
+                scanned.setdefault(token, INVALID_TIME)
+                continue
+            # Keep the earliest scan of a token
+            earliest = scanned.get(token, INVALID_TIME)
+            if earliest is INVALID_TIME or (scanned_at and (earliest is None or scanned_at < earliest)):
+                scanned[token] = scanned_at
+
+        tokens = list(scanned)
+        bookings = {}
+        for start in range(0, len(tokens), IN_QUERY_CHUNK_SIZE):
+            chunk = tokens[start:start + IN_QUERY_CHUNK_SIZE]
+            for booking in Booking.query.filter(
+                Booking.qr_code_token.in_(chunk),
+                Booking.studio_id == studio_id
+            ):
+                bookings[booking.qr_code_token] = booking
+
+        results = {}
+        rows = []
+        for token in tokens:
+            booking = bookings.get(token)
+            if scanned[token] is INVALID_TIME:
+                results[token] = 'invalid_time'
+            elif not booking:
+                results[token] = 'invalid'
+            elif booking.attendance_marked_at:
+                results[token] = 'already_attended'
+            elif booking.status == 'CANCELLED':
+                results[token] = 'cancelled'
+            else:
+                results[token] = 'checked_in'
+                rows.append({'b_id': booking.id, 'b_marked_at': min(scanned[token] or now, now)})
+
+        if rows:
+            table = Booking.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.id == bindparam('b_id'))
+                .where(table.c.attendance_marked_at.is_(None))
+                .where(table.c.status != 'CANCELLED')
+                .values(status='ATTENDED', attendance_marked_at=bindparam('b_marked_at')),
+                rows
+            )
+        db.session.commit()
+        checkin_cache.evict(token for token, result in results.items() if result == 'checked_in')
+
+        return [{'qr_token': token, 'result': results[token]} for token in tokens]
+
+
+def _scan_time(value) -> Optional[datetime]:
+    """A scanner's ISO scan time as naive UTC, or None if missing or unreadable."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        scanned_at = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return scanned_at
+
+
+def evict_on_commit(session, tokens: Iterable[str]):
+    """Evict cards once `session` commits, for writes made with bulk UPDATEs."""
+    session.info.setdefault(PENDING_TOKENS_KEY, set()).update(token for token in tokens if token)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_bookings(session, flush_context):
+    tokens = session.info.setdefault(PENDING_TOKENS_KEY, set())
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, Booking) and obj.qr_code_token:
+            tokens.add(obj.qr_code_token)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed_bookings(session):
+    tokens = session.info.pop(PENDING_TOKENS_KEY, None)
+    if tokens:
+        checkin_cache.evict(tokens)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_bookings(session):
+    session.info.pop(PENDING_TOKENS_KEY, None)
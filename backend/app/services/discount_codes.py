@@ -0,0 +1,266 @@
+"""
+Discount code validation from a per-studio cache.
+
+A studio's active codes are loaded with one query and compiled into
+DiscountRule objects (validity window, minimum amount, purchase types,
+usage limit). The compiled set is cached in Redis, or in a small
+in-process cache when Redis is unavailable, so checking a code at
+checkout doesn't touch the database; unknown codes are answered from the
+cache too.
+
+The cache of a studio is dropped when one of its codes is created, edited
+or deleted (Session hooks), and when a use is counted against a code with
+a usage limit. Uses are counted with one atomic UPDATE.
+"""
+
+import json
+import logging
+import threading
+import time as timer
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import DiscountCode
+
+logger = logging.getLogger(__name__)
+
+CODES_KEY = 'discount_codes:{studio_id}'
+REDIS_TTL_SECONDS = 60 * 60
+# Edits handled by other processes can't reach this process's cache, so
+# local entries live only briefly
+LOCAL_TTL_SECONDS = 30
+LOCAL_MAX_ENTRIES = 512
+
+# Session.info key for studios whose codes changed in the current transaction
+PENDING_STUDIOS_KEY = 'discount_code_studios'
+
+
+@dataclass(frozen=True)
+class DiscountRule:
+    """A discount code compiled for validation."""
+    id: str
+    code: str
+    discount_type: str
+    discount_value: Decimal
+    minimum_amount: Decimal
+    max_uses: Optional[int]
+    uses_count: int
+    valid_from: Optional[datetime]
+    valid_until: Optional[datetime]
+    applicable_to: Optional[FrozenSet[str]]
+
+    @classmethod
+    def compile(cls, code) -> 'DiscountRule':
+        return cls(
+            id=code.id,
+            code=code.code.upper(),
+            discount_type=code.discount_type or 'PERCENTAGE',
+            discount_value=Decimal(str(code.discount_value or 0)),
+            minimum_amount=Decimal(str(code.minimum_amount or 0)),
+            max_uses=code.max_uses,
+            uses_count=code.uses_count or 0,
+            valid_from=code.valid_from,
+            valid_until=code.valid_until,
+            applicable_to=frozenset(code.applicable_to) if code.applicable_to else None,
+        )
+
+    def apply(self, amount: Decimal, purchase_type: str = None,
+              now: datetime = None) -> Tuple[Decimal, Optional[str]]:
+        """(discount, None), or (0, error message) if the code doesn't apply."""
+        now = now or datetime.utcnow()
+        if self.valid_from and now < self.valid_from:
+            return Decimal('0'), 'Discount code not yet valid'
+        if self.valid_until and now > self.valid_until:
+            return Decimal('0'), 'Discount code expired'
+        if self.max_uses and self.uses_count >= self.max_uses:
+            return Decimal('0'), 'Discount code usage limit reached'
+        if purchase_type and self.applicable_to and purchase_type not in self.applicable_to:
+            return Decimal('0'), 'Discount code not valid for this purchase'
+        if self.minimum_amount and amount < self.minimum_amount:
+            return Decimal('0'), f'Minimum purchase of ₹{self.minimum_amount} required'
+
+        if self.discount_type == 'PERCENTAGE':
+            discount = amount * (self.discount_value / Decimal('100'))
+        else:
+            discount = self.discount_value
+        return min(discount, amount), None
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        data['discount_value'] = str(self.discount_value)
+        data['minimum_amount'] = str(self.minimum_amount)
+        data['valid_from'] = self.valid_from.isoformat() if self.valid_from else None
+        data['valid_until'] = self.valid_until.isoformat() if self.valid_until else None
+        data['applicable_to'] = sorted(self.applicable_to) if self.applicable_to else None
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'DiscountRule':
+        return cls(
+            id=data['id'],
+            code=data['code'],
+            discount_type=data['discount_type'],
+            discount_value=Decimal(data['discount_value']),
+            minimum_amount=Decimal(data['minimum_amount']),
+            max_uses=data['max_uses'],
+            uses_count=data['uses_count'],
+            valid_from=datetime.fromisoformat(data['valid_from']) if data['valid_from'] else None,
+            valid_until=datetime.fromisoformat(data['valid_until']) if data['valid_until'] else None,
+            applicable_to=frozenset(data['applicable_to']) if data['applicable_to'] else None,
+        )
+
+
+class DiscountCodeCache:
+    """Compiled active discount codes by studio."""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES, ttl_seconds: float = LOCAL_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rules(self, studio_id: str) -> Dict[str, DiscountRule]:
+        """Active codes of a studio by upper-case code."""
+        from app import redis_client
+
+        if redis_client is not None:
+            key = CODES_KEY.format(studio_id=studio_id)
+            try:
+                raw = redis_client.get(key)
+                if raw is not None:
+                    return {code: DiscountRule.from_json(data) for code, data in json.loads(raw).items()}
+                rules = self._load(studio_id)
+                redis_client.set(
+                    key,
+                    json.dumps({code: rule.to_json() for code, rule in rules.items()}),
+                    ex=REDIS_TTL_SECONDS
+                )
+                return rules
+            except redis.RedisError as e:
+                logger.warning(f"Discount code cache unavailable, using local cache: {e}")
+
+        now = timer.monotonic()
+        with self._lock:
+            entry = self._entries.get(studio_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(studio_id)
+                return entry[1]
+
+        rules = self._load(studio_id)
+        with self._lock:
+            self._entries[studio_id] = (now + self.ttl_seconds, rules)
+            self._entries.move_to_end(studio_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rules
+
+    def invalidate(self, studio_ids: Iterable[str]):
+        from app import redis_client
+
+        studio_ids = [studio_id for studio_id in studio_ids if studio_id]
+        if not studio_ids:
+            return
+        with self._lock:
+            for studio_id in studio_ids:
+                self._entries.pop(studio_id, None)
+        if redis_client is not None:
+            try:
+                redis_client.delete(*[CODES_KEY.format(studio_id=studio_id) for studio_id in studio_ids])
+            except redis.RedisError as e:
+                logger.warning(f"Could not invalidate discount code cache: {e}")
+
+    @staticmethod
+    def _load(studio_id: str) -> Dict[str, DiscountRule]:
+        codes = DiscountCode.query.filter_by(studio_id=studio_id, is_active=True).all()
+        return {code.code.upper(): DiscountRule.compile(code) for code in codes}
+
+
+discount_code_cache = DiscountCodeCache()
+
+
+class DiscountCodeService:
+    """Discount code lookups and usage counting."""
+
+    @staticmethod
+    def rule(studio_id: str, code: str) -> Optional[DiscountRule]:
+        """Compiled active code of a studio, or None."""
+        if not code:
+            return None
+        return discount_code_cache.rules(studio_id).get(code.upper())
+
+    @staticmethod
+    def calculate(amount: Decimal, code: str, studio_id: str,
+                  purchase_type: str = None) -> Tuple[Decimal, Optional[str]]:
+        """Discount for an amount, as (discount, error message or None)."""
+        if not code:
+            return Decimal('0'), None
+
+        rule = DiscountCodeService.rule(studio_id, code)
+        if rule is None:
+            return Decimal('0'), 'Invalid discount code'
+        return rule.apply(amount, purchase_type)
+
+    @staticmethod
+    def record_use(studio_id: str, code: str) -> bool:
+        """
+        Count one use of a code with an atomic increment.
+
+        The increment only applies while the code is under its usage limit,
+        so concurrent checkouts can't take it past max_uses. Does not
+        commit. Codes with a usage limit are dropped from the cache on
+        commit, so the next validation sees the new count.
+
+        Returns:
+            False if the code doesn't exist or has reached its usage limit
+        """
+        if not code:
+            return False
+
+        updated = DiscountCode.query.filter(
+            DiscountCode.studio_id == studio_id,
+            DiscountCode.code == code.upper(),
+            db.or_(
+                DiscountCode.max_uses.is_(None),
+                db.func.coalesce(DiscountCode.uses_count, 0) < DiscountCode.max_uses
+            )
+        ).update({
+            DiscountCode.uses_count: db.func.coalesce(DiscountCode.uses_count, 0) + 1
+        }, synchronize_session=False)
+
+        rule = DiscountCodeService.rule(studio_id, code)
+        if updated and (rule is None or rule.max_uses):
+            invalidate_on_commit(db.session(), {studio_id})
+        return updated == 1
+
+
+def invalidate_on_commit(session, studio_ids: Iterable[str]):
+    """Drop studios' cached codes once `session` commits, for bulk UPDATEs."""
+    session.info.setdefault(PENDING_STUDIOS_KEY, set()).update(studio_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_codes(session, flush_context):
+    studio_ids = session.info.setdefault(PENDING_STUDIOS_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, DiscountCode):
+            studio_ids.add(obj.studio_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_codes(session):
+    studio_ids = session.info.pop(PENDING_STUDIOS_KEY, None)
+    if studio_ids:
+        discount_code_cache.invalidate(studio_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_codes(session):
+    session.info.pop(PENDING_STUDIOS_KEY, None)
@@ -0,0 +1,273 @@
+"""
+Razorpay webhook ingestion.
+
+The webhook endpoint only verifies the signature and appends the event to
+payment_webhook_events, keyed by Razorpay's event id, then acknowledges it.
+A redelivered event hits the unique constraint and is acknowledged without
+being stored again, so Razorpay's retries never repeat side effects.
+
+Events are processed by a Celery task per ordering key (the payment or
+subscription the event is about), oldest first. Each event is claimed
+with a conditional UPDATE on its status, and the handler's changes are
+committed together with the PROCESSED status. A failed event stops the
+events behind it until it succeeds or runs out of attempts, so a refund is
+never applied before the capture it refunds.
+
+An event whose worker died mid-processing stays PROCESSING; once its claim
+is older than CLAIM_TIMEOUT another worker takes it over, and
+requeue_stale() (run periodically) queues the keys of such events.
+
+replay() puts a window of events back in the queue after an outage.
+"""
+
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import PaymentWebhookEvent, WebhookEventStatus
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+
+# A PROCESSING event claimed longer ago than this is assumed to belong to a
+# dead worker; well above how long one event's handler runs
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+# Statuses replay() puts back in the queue unless asked for all events
+REPLAYABLE_STATUSES = (
+    WebhookEventStatus.RECEIVED.value,
+    WebhookEventStatus.PROCESSING.value,
+    WebhookEventStatus.FAILED.value,
+)
+
+
+class WebhookProcessingError(Exception):
+    """An event of an ordering key failed and should be retried."""
+    pass
+
+
+def event_id_for(header_value: Optional[str], raw_payload: str) -> str:
+    """Razorpay's event id, or a hash of the payload when the header is missing."""
+    if header_value:
+        return header_value
+    return 'sha256:' + hashlib.sha256(raw_payload.encode('utf-8')).hexdigest()
+
+
+def ordering_key_for(event: Dict) -> str:
+    """Id of the payment or subscription an event is about."""
+    payload = event.get('payload') or {}
+    for entity_name, field in (('payment', 'id'), ('refund', 'payment_id'), ('subscription', 'id')):
+        entity = (payload.get(entity_name) or {}).get('entity') or {}
+        if entity.get(field):
+            return entity[field]
+    return event.get('event') or 'unknown'
+
+
+class PaymentWebhookService:
+    """Store, process and replay payment webhook events."""
+
+    @staticmethod
+    def record(event_id: str, event: Dict, provider: str = 'RAZORPAY') -> Optional[PaymentWebhookEvent]:
+        """
+        Store a verified webhook event. Commits.
+
+        Returns:
+            The stored event, or None if it was delivered before
+        """
+        webhook_event = PaymentWebhookEvent(
+            id=str(uuid.uuid4()),
+            provider=provider,
+            event_id=event_id[:100],
+            event_type=(event.get('event') or 'unknown')[:50],
+            ordering_key=ordering_key_for(event)[:100],
+            payload=event,
+            status=WebhookEventStatus.RECEIVED.value,
+            attempts=0,
+            received_at=datetime.utcnow()
+        )
+        db.session.add(webhook_event)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return None
+        return webhook_event
+
+    @staticmethod
+    def enqueue(ordering_keys: List[str]):
+        """
+        Process the pending events of ordering keys in the background.
+
+        Falls back to processing in-process when the task queue is
+        unavailable; failures are left on the events for a retry or replay.
+        """
+        from app import redis_client
+
+        for ordering_key in ordering_keys:
+            if redis_client is not None:
+                try:
+                    from app.tasks import process_webhook_events_job
+                    process_webhook_events_job.apply_async(args=[ordering_key], retry=False)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Could not queue webhook events for {ordering_key}: {e}")
+            try:
+                PaymentWebhookService.process_pending(ordering_key)
+            except WebhookProcessingError:
+                pass  # Logged; retried with the key's next event or a replay
+
+    @staticmethod
+    def process_pending(ordering_key: str) -> int:
+        """
+        Process an ordering key's pending events, oldest first.
+
+        Stops at an event another worker is processing; it continues from
+        there, or the event is taken over once its claim is stale. Events that used up MAX_ATTEMPTS stay FAILED and are skipped.
+
+        Returns:
+            Number of events processed
+
+        Raises:
+            WebhookProcessingError: if an event failed and can be retried
+        """
+        processed = 0
+        while True:
+            webhook_event = PaymentWebhookEvent.query.filter(
+                PaymentWebhookEvent.ordering_key == ordering_key,
+                db.or_(
+                    PaymentWebhookEvent.status.in_((
+                        WebhookEventStatus.RECEIVED.value,
+                        WebhookEventStatus.PROCESSING.value
+                    )),
+                    db.and_(
+                        PaymentWebhookEvent.status == WebhookEventStatus.FAILED.value,
+                        PaymentWebhookEvent.attempts < MAX_ATTEMPTS
+                    )
+                )
+            ).order_by(
+                PaymentWebhookEvent.received_at, PaymentWebhookEvent.id
+            ).first()
+
+            if webhook_event is None or not PaymentWebhookService._claim(webhook_event):
+                return processed
+
+            try:
+                status = PaymentWebhookService._dispatch(webhook_event)
+                webhook_event.status = status.value
+                webhook_event.error = None
+                webhook_event.processed_at = datetime.utcnow()
+                db.session.commit()
+                processed += 1
+            except Exception as e:
+                db.session.rollback()
+                PaymentWebhookEvent.query.filter_by(id=webhook_event.id).update({
+                    PaymentWebhookEvent.status: WebhookEventStatus.FAILED.value,
+                    PaymentWebhookEvent.error: str(e)[:500]
+                }, synchronize_session=False)
+                db.session.commit()
+                db.session.expire(webhook_event)
+                logger.error(f"Webhook event {webhook_event.event_id} failed: {e}")
+
+                if webhook_event.attempts < MAX_ATTEMPTS:
+                    raise WebhookProcessingError(
+                        f"Webhook event {webhook_event.event_id} failed: {e}"
+                    ) from e
+
+    @staticmethod
+    def replay(start: datetime, end: datetime, include_processed: bool = False,
+               event_types: List[str] = None) -> Dict:
+        """
+        Queue the events received in [start, end] for processing again.
+
+        By default only events that never finished (received, stuck in
+        processing, failed) are replayed; with include_processed every
+        event in the window is. Attempts are reset. Commits.
+
+        Returns:
+            {'events': replayed events, 'ordering_keys': keys queued}
+        """
+        query = PaymentWebhookEvent.query.filter(
+            PaymentWebhookEvent.received_at >= start,
+            PaymentWebhookEvent.received_at <= end
+        )
+        if not include_processed:
+            query = query.filter(PaymentWebhookEvent.status.in_(REPLAYABLE_STATUSES))
+        if event_types:
+            query = query.filter(PaymentWebhookEvent.event_type.in_(event_types))
+
+        ordering_keys = sorted({
+            row[0] for row in query.with_entities(PaymentWebhookEvent.ordering_key).distinct()
+        })
+        replayed = query.update({
+            PaymentWebhookEvent.status: WebhookEventStatus.RECEIVED.value,
+            PaymentWebhookEvent.attempts: 0,
+            PaymentWebhookEvent.error: None,
+            PaymentWebhookEvent.claimed_at: None,
+            PaymentWebhookEvent.processed_at: None
+        }, synchronize_session=False)
+        db.session.commit()
+
+        PaymentWebhookService.enqueue(ordering_keys)
+        return {'events': replayed, 'ordering_keys': len(ordering_keys)}
+
+    @staticmethod
+    def requeue_stale(now: datetime = None) -> int:
+        """
+        Queue the ordering keys of events left PROCESSING by a dead worker.
+
+        Returns:
+            Number of ordering keys queued
+        """
+        now = now or datetime.utcnow()
+        ordering_keys = sorted({
+            row[0] for row in PaymentWebhookEvent.query.filter(
+                PaymentWebhookEvent.status == WebhookEventStatus.PROCESSING.value,
+                PaymentWebhookEvent.claimed_at < now - CLAIM_TIMEOUT
+            ).with_entities(PaymentWebhookEvent.ordering_key).distinct()
+        })
+        if ordering_keys:
+            logger.warning(f"Requeueing {len(ordering_keys)} ordering keys with stale webhook events")
+            PaymentWebhookService.enqueue(ordering_keys)
+        return len(ordering_keys)
+
+    @staticmethod
+    def _claim(webhook_event) -> bool:
+        """Mark an event as being processed, unless another worker has it."""
+        now = datetime.utcnow()
+        claimed = PaymentWebhookEvent.query.filter(
+            PaymentWebhookEvent.id == webhook_event.id,
+            db.or_(
+                PaymentWebhookEvent.status == WebhookEventStatus.RECEIVED.value,
+                PaymentWebhookEvent.status == WebhookEventStatus.FAILED.value,
+                db.and_(
+                    PaymentWebhookEvent.status == WebhookEventStatus.PROCESSING.value,
+                    PaymentWebhookEvent.claimed_at < now - CLAIM_TIMEOUT
+                )
+            )
+        ).update({
+            PaymentWebhookEvent.status: WebhookEventStatus.PROCESSING.value,
+            PaymentWebhookEvent.attempts: db.func.coalesce(PaymentWebhookEvent.attempts, 0) + 1,
+            PaymentWebhookEvent.claimed_at: now
+        }, synchronize_session=False)
+        db.session.commit()
+        db.session.expire(webhook_event)
+        return claimed == 1
+
+    @staticmethod
+    def _dispatch(webhook_event) -> WebhookEventStatus:
+        """Run the handler of an event. The handler does not commit."""
+        from app.routes.payments import WEBHOOK_HANDLERS
+
+        entry = WEBHOOK_HANDLERS.get(webhook_event.event_type)
+        if entry is None:
+            return WebhookEventStatus.IGNORED
+
+        entity_name, handler = entry
+        handler(webhook_event.payload['payload'][entity_name]['entity'])
+        return WebhookEventStatus.PROCESSED
@@ -0,0 +1,159 @@
+"""
+Read-through cache for the public studio schedule.
+
+The rendered JSON for a (studio, date window) is kept in Redis, or in a
+small in-process LRU when Redis is unavailable, together with a strong
+ETag so the booking page can poll with If-None-Match and get a 304.
+
+Entries are keyed by a per-studio version number. Every committed write to
+a studio's classes, schedules, sessions or bookings bumps the version,
+which orphans all of that studio's cached windows at once; the orphans
+simply expire.
+"""
+
+import hashlib
+import logging
+import threading
+import time as timer
+from collections import OrderedDict
+from typing import Callable, Iterable, Tuple
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Booking, ClassSchedule, ClassSession, DanceClass, SeatHold
+
+logger = logging.getLogger(__name__)
+
+REDIS_TTL_SECONDS = 5 * 60
+# Writes handled by other processes can't reach this process's LRU, so
+# local entries live only briefly
+LOCAL_TTL_SECONDS = 30
+LOCAL_MAX_ENTRIES = 256
+
+ENTRY_KEY = 'public_schedule:{studio_id}:{version}:{start}:{end}'
+VERSION_KEY = 'public_schedule_version:{studio_id}'
+
+# Writes to these models change what the public schedule shows
+INVALIDATING_MODELS = (DanceClass, ClassSchedule, ClassSession, Booking, SeatHold)
+
+# Session.info key for studios touched by the current transaction
+PENDING_STUDIOS_KEY = 'public_schedule_studios'
+
+
+class PublicScheduleCache:
+    """Versioned cache of rendered public schedules."""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES, ttl_seconds: float = LOCAL_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag_for(body: str) -> str:
+        return hashlib.sha256(body.encode()).hexdigest()
+
+    def get_or_render(self, studio_id: str, start_date, end_date, render: Callable[[], str]) -> Tuple[str, str]:
+        """
+        Cached schedule body for a studio and date window.
+
+        Args:
+            render: builds the JSON body; called only on a cache miss
+
+        Returns:
+            (body, etag)
+        """
+        from app import redis_client
+
+        if redis_client is not None:
+            try:
+                return self._redis_get_or_render(redis_client, studio_id, start_date, end_date, render)
+            except redis.RedisError as e:
+                logger.warning(f"Public schedule cache unavailable, using local cache: {e}")
+        return self._local_get_or_render(studio_id, start_date, end_date, render)
+
+    def invalidate(self, studio_ids: Iterable[str]):
+        """Drop every cached window for these studios."""
+        from app import redis_client
+
+        studio_ids = set(studio_ids)
+        with self._lock:
+            for studio_id in studio_ids:
+                self._versions[studio_id] = self._versions.get(studio_id, 0) + 1
+
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline()
+                for studio_id in studio_ids:
+                    pipe.incr(VERSION_KEY.format(studio_id=studio_id))
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Could not invalidate public schedule cache: {e}")
+
+    def _redis_get_or_render(self, client, studio_id, start_date, end_date, render):
+        version = int(client.get(VERSION_KEY.format(studio_id=studio_id)) or 0)
+        key = ENTRY_KEY.format(studio_id=studio_id, version=version, start=start_date, end=end_date)
+
+        body, etag = client.hmget(key, 'body', 'etag')
+        if body is not None and etag is not None:
+            return body.decode(), etag.decode()
+
+        # A write committed while rendering bumps the version, so a stale
+        # body can only land under a key nobody reads any more
+        body = render()
+        etag = self.etag_for(body)
+        pipe = client.pipeline()
+        pipe.hset(key, mapping={'body': body, 'etag': etag})
+        pipe.expire(key, REDIS_TTL_SECONDS)
+        pipe.execute()
+        return body, etag
+
+    def _local_get_or_render(self, studio_id, start_date, end_date, render):
+        now = timer.monotonic()
+        with self._lock:
+            key = (studio_id, self._versions.get(studio_id, 0), start_date, end_date)
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+
+        body = render()
+        etag = self.etag_for(body)
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+
+public_schedule_cache = PublicScheduleCache()
+
+
+def invalidate_on_commit(session, studio_ids: Iterable[str]):
+    """Invalidate studios once `session` commits, for writes made with bulk UPDATEs."""
+    session.info.setdefault(PENDING_STUDIOS_KEY, set()).update(studio_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_studios(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    studios = session.info.setdefault(PENDING_STUDIOS_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, INVALIDATING_MODELS) and obj.studio_id:
+            studios.add(obj.studio_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_studios(session):
+    studios = session.info.pop(PENDING_STUDIOS_KEY, None)
+    if studios:
+        public_schedule_cache.invalidate(studios)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_studios(session):
+    session.info.pop(PENDING_STUDIOS_KEY, None)
@@ -0,0 +1,134 @@
+"""
+Razorpay clients per studio.
+
+Each studio can have its own Razorpay keys (falling back to the
+RAZORPAY_KEY_ID / RAZORPAY_KEY_SECRET environment variables). Building a
+client per request throws away its HTTP session, so every call to Razorpay
+paid for a new TLS handshake. Clients are kept in a bounded LRU by studio
+instead, each with a keep-alive connection pool, and dropped after a TTL
+or when the studio's keys change.
+
+An entry remembers a fingerprint of the keys it was built with, so a
+worker process that missed an invalidation still never uses old keys.
+"""
+
+import hashlib
+import os
+import threading
+import time as timer
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import razorpay
+    import requests
+    from requests.adapters import HTTPAdapter
+    RAZORPAY_AVAILABLE = True
+except ImportError:
+    RAZORPAY_AVAILABLE = False
+
+CLIENT_TTL_SECONDS = 30 * 60
+MAX_CLIENTS = 256
+
+# Keep-alive connections per client
+POOL_MAXSIZE = 10
+
+# Cache key of the client built from the environment keys
+DEFAULT_KEY = '__default__'
+
+
+def studio_credentials(studio) -> Tuple[str, str]:
+    """(key_id, key_secret) of a studio, falling back to the environment keys."""
+    key_id = studio.razorpay_key_id if studio else None
+    key_secret = studio.razorpay_key_secret if studio else None
+
+    if not key_id:
+        key_id = os.getenv('RAZORPAY_KEY_ID', '')
+    if not key_secret:
+        key_secret = os.getenv('RAZORPAY_KEY_SECRET', '')
+    return key_id, key_secret
+
+
+def _fingerprint(key_id: str, key_secret: str) -> str:
+    return hashlib.sha256(f"{key_id}:{key_secret}".encode('utf-8')).hexdigest()
+
+
+class RazorpayClientPool:
+    """Bounded LRU of Razorpay clients by studio, with TTL."""
+
+    def __init__(self, max_clients: int = MAX_CLIENTS, ttl_seconds: float = CLIENT_TTL_SECONDS):
+        self.max_clients = max_clients
+        self.ttl_seconds = ttl_seconds
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, studio=None) -> Tuple[Optional[object], Optional[str], Optional[str]]:
+        """
+        Razorpay client for a studio's keys.
+
+        Returns:
+            (client, key_id, key_secret), or (None, None, None) if no keys
+            are configured or the razorpay package isn't installed
+        """
+        if not RAZORPAY_AVAILABLE:
+            return None, None, None
+
+        key_id, key_secret = studio_credentials(studio)
+        if not key_id or not key_secret:
+            return None, None, None
+
+        cache_key = studio.id if studio else DEFAULT_KEY
+        fingerprint = _fingerprint(key_id, key_secret)
+        now = timer.monotonic()
+
+        with self._lock:
+            entry = self._clients.get(cache_key)
+            if entry and entry[0] == fingerprint and entry[1] > now:
+                self._clients.move_to_end(cache_key)
+                return entry[2], key_id, key_secret
+
+        client = self._build(key_id, key_secret)
+        stale = []
+        with self._lock:
+            old = self._clients.pop(cache_key, None)
+            if old:
+                stale.append(old[2])
+            self._clients[cache_key] = (fingerprint, now + self.ttl_seconds, client)
+            while len(self._clients) > self.max_clients:
+                stale.append(self._clients.popitem(last=False)[1][2])
+
+        for old_client in stale:
+            self._close(old_client)
+        return client, key_id, key_secret
+
+    def invalidate(self, studio_id: str = None):
+        """Drop the client of a studio (or the environment keys' client)."""
+        with self._lock:
+            entry = self._clients.pop(studio_id or DEFAULT_KEY, None)
+        if entry:
+            self._close(entry[2])
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for entry in entries:
+            self._close(entry[2])
+
+    @staticmethod
+    def _build(key_id: str, key_secret: str):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+        session.mount('https://', adapter)
+        return razorpay.Client(session=session, auth=(key_id, key_secret))
+
+    @staticmethod
+    def _close(client):
+        # Requests still using the client reopen the connection if needed
+        try:
+            client.session.close()
+        except Exception:
+            pass
+
+
+razorpay_clients = RazorpayClientPool()
@@ -0,0 +1,117 @@
+"""
+Refund accounting.
+
+Payment.refunded_amount is the running total of a payment's refunds. It is
+raised in the same transaction that inserts the refund, with a conditional
+UPDATE that also enforces the limit:
+
+    UPDATE payments SET refunded_amount = refunded_amount + :amount, status = ...
+     WHERE id = :id AND refunded_amount + :amount <= total_amount
+
+so checking what is still refundable is one row read, and two partial
+refunds racing each other can't refund more than was paid. reconcile()
+recomputes the totals from the refunds table and corrects any drift.
+"""
+
+import logging
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import case, func, or_
+
+from app import db
+from app.models import Payment, Refund
+
+logger = logging.getLogger(__name__)
+
+REFUNDABLE_STATUSES = ('COMPLETED', 'PARTIALLY_REFUNDED')
+
+
+class RefundAccounting:
+    """Keeps payments' refunded_amount in step with their refunds."""
+
+    @staticmethod
+    def refundable(payment) -> Decimal:
+        """Amount of a payment that can still be refunded."""
+        return Decimal(str(payment.total_amount or 0)) - Decimal(str(payment.refunded_amount or 0))
+
+    @staticmethod
+    def add_refund(payment, amount: Decimal, enforce_limit: bool = True) -> bool:
+        """
+        Add a refund to a payment's total and update its status.
+
+        Does not commit; insert the Refund in the same transaction. Refunds
+        the provider already made (webhooks) pass enforce_limit=False so
+        they are always recorded.
+
+        Returns:
+            False if the refund would exceed the amount paid or the payment
+            can't be refunded
+        """
+        refunded = func.coalesce(Payment.refunded_amount, 0) + amount
+        query = Payment.query.filter(Payment.id == payment.id)
+        if enforce_limit:
+            query = query.filter(
+                Payment.status.in_(REFUNDABLE_STATUSES),
+                refunded <= Payment.total_amount
+            )
+
+        updated = query.update({
+            Payment.refunded_amount: refunded,
+            Payment.status: case(
+                (refunded >= Payment.total_amount, 'REFUNDED'),
+                else_='PARTIALLY_REFUNDED'
+            )
+        }, synchronize_session=False)
+        db.session.expire(payment, ['refunded_amount', 'status'])
+        return updated == 1
+
+    @staticmethod
+    def reconcile(fix: bool = True) -> List[Dict]:
+        """
+        Compare each payment's refunded_amount with the sum of its refunds.
+
+        The totals are computed in one grouped query; payments that drifted
+        are logged and, with fix, corrected. Commits when fixing.
+
+        Returns:
+            {'payment_id', 'studio_id', 'refunded_amount', 'refunds_total'}
+            for each payment that drifted
+        """
+        totals = db.session.query(
+            Refund.payment_id,
+            func.sum(Refund.amount).label('total')
+        ).filter(
+            Refund.status != 'FAILED'
+        ).group_by(Refund.payment_id).subquery()
+
+        refunds_total = func.coalesce(totals.c.total, 0)
+        rows = db.session.query(
+            Payment.id, Payment.studio_id, Payment.refunded_amount, refunds_total
+        ).outerjoin(
+            totals, totals.c.payment_id == Payment.id
+        ).filter(
+            or_(totals.c.total.isnot(None), Payment.refunded_amount != 0),
+            func.coalesce(Payment.refunded_amount, 0) != refunds_total
+        ).all()
+
+        drift = []
+        for payment_id, studio_id, refunded_amount, total in rows:
+            logger.warning(
+                f"Refund total drift on payment {payment_id}: "
+                f"refunded_amount={refunded_amount}, refunds={total}"
+            )
+            drift.append({
+                'payment_id': payment_id,
+                'studio_id': studio_id,
+                'refunded_amount': float(refunded_amount or 0),
+                'refunds_total': float(total or 0),
+            })
+
+        if fix and drift:
+            db.session.execute(
+                db.update(Payment),
+                [{'id': row['payment_id'], 'refunded_amount': Decimal(str(row['refunds_total']))} for row in drift]
+            )
+            db.session.commit()
+        return drift
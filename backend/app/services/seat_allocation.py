@@ -0,0 +1,129 @@
+"""
+Seat allocation for class sessions.
+
+Seats are reserved with a single conditional UPDATE on class_sessions, so
+the capacity check and the increment happen atomically in the database:
+
+    UPDATE class_sessions
+       SET booked_count = COALESCE(booked_count, 0) + 1
+     WHERE id = :id
+       AND COALESCE(booked_count, 0) + COALESCE(held_count, 0) < max_capacity
+       AND status != 'CANCELLED'
+
+Concurrent bookings for the same session queue on the row lock taken by
+the UPDATE and re-check the WHERE clause once it is released, so a session
+can never be oversold, and no SELECT ... FOR UPDATE round trip is needed.
+The reservation belongs to the caller's transaction: it is undone by a
+rollback and becomes visible to others on commit.
+
+Seats held for online checkouts (held_count, see SeatHoldService) count
+against capacity the same way; a paid hold is converted into a booked
+seat without a capacity check, since its seat was already taken.
+"""
+
+from app import db
+from app.models import ClassSession
+
+
+class SeatAllocator:
+    """Atomic seat and waitlist counters for class sessions."""
+
+    @staticmethod
+    def _apply(session, criteria, values) -> bool:
+        """Run a conditional UPDATE on one session; True if the row matched."""
+        # Make sure a session created in this transaction exists in the table
+        db.session.flush()
+        updated = ClassSession.query.filter(
+            ClassSession.id == session.id,
+            *criteria
+        ).update(values, synchronize_session=False)
+        # The in-memory counters are stale now; reload them on next access
+        db.session.expire(session, [column.key for column in values])
+        return updated == 1
+
+    @staticmethod
+    def _has_free_seat():
+        booked = db.func.coalesce(ClassSession.booked_count, 0)
+        held = db.func.coalesce(ClassSession.held_count, 0)
+        return [booked + held < ClassSession.max_capacity, ClassSession.status != 'CANCELLED']
+
+    @staticmethod
+    def reserve_seat(session) -> bool:
+        """
+        Take one seat if the session isn't full or cancelled.
+
+        Returns:
+            True if a seat was reserved
+        """
+        booked = db.func.coalesce(ClassSession.booked_count, 0)
+        return SeatAllocator._apply(
+            session,
+            SeatAllocator._has_free_seat(),
+            {ClassSession.booked_count: booked + 1}
+        )
+
+    @staticmethod
+    def hold_seat(session) -> bool:
+        """
+        Hold one seat for a checkout if the session isn't full or cancelled.
+
+        Returns:
+            True if a seat was held
+        """
+        held = db.func.coalesce(ClassSession.held_count, 0)
+        return SeatAllocator._apply(
+            session,
+            SeatAllocator._has_free_seat(),
+            {ClassSession.held_count: held + 1}
+        )
+
+    @staticmethod
+    def release_hold(session) -> bool:
+        """Give back one held seat (never drops below zero)."""
+        return SeatAllocator._apply(
+            session,
+            [ClassSession.held_count > 0],
+            {ClassSession.held_count: ClassSession.held_count - 1}
+        )
+
+    @staticmethod
+    def convert_hold(session) -> bool:
+        """Turn one held seat into a booked seat."""
+        booked = db.func.coalesce(ClassSession.booked_count, 0)
+        return SeatAllocator._apply(
+            session,
+            [ClassSession.held_count > 0],
+            {
+                ClassSession.held_count: ClassSession.held_count - 1,
+                ClassSession.booked_count: booked + 1
+            }
+        )
+
+    @staticmethod
+    def release_seat(session) -> bool:
+        """Give back one seat (never drops below zero)."""
+        return SeatAllocator._apply(
+            session,
+            [ClassSession.booked_count > 0],
+            {ClassSession.booked_count: ClassSession.booked_count - 1}
+        )
+
+    @staticmethod
+    def join_waitlist(session) -> bool:
+        """Count one more waitlist entry."""
+        waiting = db.func.coalesce(ClassSession.waitlist_count, 0)
+        return SeatAllocator._apply(
+            session,
+            [],
+            {ClassSession.waitlist_count: waiting + 1}
+        )
+
+    @staticmethod
+    def leave_waitlist(session) -> bool:
+        """Count one fewer waitlist entry (never drops below zero)."""
+        return SeatAllocator._apply(
+            session,
+            [ClassSession.waitlist_count > 0],
+            {ClassSession.waitlist_count: ClassSession.waitlist_count - 1}
+        )
+
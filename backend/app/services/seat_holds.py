@@ -0,0 +1,129 @@
+"""
+Seat holds for online checkouts.
+
+Creating a Razorpay order holds one seat of the session for
+SEAT_HOLD_MINUTES. The hold is taken with the same conditional UPDATE as a
+booking (held_count counts against capacity), so two customers can't pay
+for the last seat. On payment verification the hold is converted into the
+booking's seat; unpaid holds are released by the sweeper task once they
+expire, and a session's expired holds are also released before it is held
+again so a slow sweeper never keeps seats locked.
+
+Every status change is a conditional UPDATE on seat_holds.status, so each
+hold is converted or released exactly once even when the sweeper, the
+payment verification and the booking request race.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+
+from app import db
+from app.models import ClassSession, SeatHold, SeatHoldStatus
+from app.services.public_schedule_cache import invalidate_on_commit
+from app.services.seat_allocation import SeatAllocator
+
+DEFAULT_HOLD_MINUTES = 15
+
+
+class SeatHoldService:
+    """Hold, convert and release seats held for checkouts."""
+
+    @staticmethod
+    def hold(session, razorpay_order_id: str, customer_name: str = None,
+             customer_phone: str = None, customer_email: str = None) -> Optional[SeatHold]:
+        """
+        Hold a seat of a session for a Razorpay order.
+
+        Does not commit.
+
+        Returns:
+            The hold, or None if the session is full or cancelled
+        """
+        SeatHoldService.release_expired(session_id=session.id)
+        if not SeatAllocator.hold_seat(session):
+            return None
+
+        minutes = current_app.config.get('SEAT_HOLD_MINUTES', DEFAULT_HOLD_MINUTES)
+        hold = SeatHold(
+            id=str(uuid.uuid4()),
+            studio_id=session.studio_id,
+            session_id=session.id,
+            razorpay_order_id=razorpay_order_id,
+            customer_name=customer_name,
+            customer_phone=customer_phone,
+            customer_email=customer_email,
+            status=SeatHoldStatus.HELD.value,
+            expires_at=datetime.utcnow() + timedelta(minutes=minutes)
+        )
+        db.session.add(hold)
+        return hold
+
+    @staticmethod
+    def convert(hold) -> bool:
+        """
+        Give a paid hold's customer their seat.
+
+        A hold that expired before the payment came in gets a new seat if
+        one is still free. Does not commit; roll back when this fails.
+
+        Returns:
+            True if the seat is now booked for the hold
+        """
+        session = ClassSession.query.get(hold.session_id)
+
+        if SeatHoldService._transition(hold, SeatHoldStatus.HELD, SeatHoldStatus.CONVERTED):
+            return SeatAllocator.convert_hold(session)
+
+        if SeatHoldService._transition(hold, SeatHoldStatus.EXPIRED, SeatHoldStatus.CONVERTED):
+            return SeatAllocator.reserve_seat(session)
+
+        return False
+
+    @staticmethod
+    def release_expired(session_id: str = None, now: datetime = None) -> int:
+        """
+        Release holds past their expiry.
+
+        Does not commit.
+
+        Args:
+            session_id: only this session's holds, or None for all sessions
+
+        Returns:
+            Number of holds released
+        """
+        now = now or datetime.utcnow()
+        query = SeatHold.query.filter(
+            SeatHold.status == SeatHoldStatus.HELD.value,
+            SeatHold.expires_at <= now
+        )
+        if session_id:
+            query = query.filter(SeatHold.session_id == session_id)
+
+        released = 0
+        studio_ids = set()
+        for hold in query.all():
+            if SeatHoldService._transition(hold, SeatHoldStatus.HELD, SeatHoldStatus.EXPIRED):
+                SeatAllocator.release_hold(ClassSession.query.get(hold.session_id))
+                studio_ids.add(hold.studio_id)
+                released += 1
+
+        # Freed seats show up on the public schedule
+        invalidate_on_commit(db.session(), studio_ids)
+        return released
+
+    @staticmethod
+    def _transition(hold, from_status: SeatHoldStatus, to_status: SeatHoldStatus) -> bool:
+        """Move a hold between statuses if nobody else did first."""
+        updated = SeatHold.query.filter(
+            SeatHold.id == hold.id,
+            SeatHold.status == from_status.value
+        ).update({
+            SeatHold.status: to_status.value,
+            SeatHold.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.expire(hold, ['status', 'updated_at'])
+        return updated == 1
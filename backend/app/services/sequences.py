@@ -0,0 +1,188 @@
+"""
+Sequential document numbers (BK-2025-00042, PAY-2025-00042, INV-2025-00042).
+
+Every (prefix, scope, year) has a counter row in number_sequences, and
+numbers are reserved from it with a single UPDATE:
+
+    UPDATE number_sequences SET next_value = next_value + :size
+     WHERE prefix = :prefix AND scope = :scope AND year = :year
+
+The row lock serialises concurrent callers, so two requests can never get
+the same number, and the cost doesn't grow with the bookings table. The
+UPDATE runs in its own short transaction, so the counter isn't held locked
+until the booking commits.
+
+With Redis available, NUMBER_SEQUENCE_BLOCK_SIZE numbers are reserved at a
+time and handed out one by one by an atomic Redis script, so most numbers
+need no database write. Numbers are unique but can have gaps (a rolled back
+booking, or the rest of a block when Redis restarts).
+"""
+
+import logging
+from datetime import datetime
+
+import redis
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import NumberSequence, Booking, Payment
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = 'number_sequence:{prefix}:{scope}:{year}'
+REDIS_KEY_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Column holding the numbers already issued for a prefix, and the column
+# its scope is matched against (None for global sequences). Used once per
+# counter, to continue numbering from data that predates the table.
+ISSUED_NUMBER_COLUMNS = {
+    'BK': (Booking.booking_number, None),
+    'PAY': (Payment.payment_number, None),
+    'INV': (Payment.invoice_number, Payment.studio_id),
+}
+
+# Hand out the next number of the cached block, or nil once it is used up
+TAKE_SCRIPT = """
+local next_value = tonumber(redis.call('HGET', KEYS[1], 'next'))
+local limit = tonumber(redis.call('HGET', KEYS[1], 'limit'))
+if next_value == nil or limit == nil or next_value >= limit then
+    return nil
+end
+redis.call('HINCRBY', KEYS[1], 'next', 1)
+return next_value
+"""
+
+# Install a new block unless another worker has already refilled the key
+REFILL_SCRIPT = """
+local next_value = tonumber(redis.call('HGET', KEYS[1], 'next'))
+local limit = tonumber(redis.call('HGET', KEYS[1], 'limit'))
+if next_value ~= nil and limit ~= nil and next_value < limit then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'next', ARGV[1], 'limit', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class NumberSequenceService:
+    """Collision-free booking, payment and invoice numbers."""
+
+    @staticmethod
+    def next_number(prefix, scope=None):
+        """
+        Next number for a prefix, e.g. next_number('BK') -> 'BK-2025-00042'.
+
+        Args:
+            prefix: document prefix (BK, PAY, INV)
+            scope: studio id for per-studio sequences, None for global ones
+        """
+        year = datetime.utcnow().year
+        value = NumberSequenceService._next_value(prefix, scope or '', year)
+        return f"{prefix}-{year}-{str(value).zfill(5)}"
+
+    @staticmethod
+    def _next_value(prefix, scope, year):
+        from app import redis_client
+
+        # SQLite allocates inside the request's transaction (see
+        # allocate_block), where a rollback would hand a cached block out twice
+        if redis_client is None or NumberSequenceService._dialect() == 'sqlite':
+            return NumberSequenceService.allocate_block(prefix, scope, year, 1)
+
+        key = REDIS_KEY.format(prefix=prefix, scope=scope, year=year)
+        try:
+            value = redis_client.eval(TAKE_SCRIPT, 1, key)
+        except redis.RedisError as e:
+            logger.warning(f"Number sequence cache unavailable: {e}")
+            return NumberSequenceService.allocate_block(prefix, scope, year, 1)
+        if value is not None:
+            return int(value)
+
+        size = max(1, current_app.config.get('NUMBER_SEQUENCE_BLOCK_SIZE', 50))
+        first = NumberSequenceService.allocate_block(prefix, scope, year, size)
+        if size > 1:
+            try:
+                redis_client.eval(REFILL_SCRIPT, 1, key, first + 1, first + size, REDIS_KEY_TTL_SECONDS)
+            except redis.RedisError as e:
+                logger.warning(f"Could not cache number block for {key}: {e}")
+        return first
+
+    @staticmethod
+    def allocate_block(prefix, scope, year, size):
+        """
+        Reserve `size` consecutive numbers in the database.
+
+        Returns:
+            The first number of the block
+        """
+        if NumberSequenceService._dialect() == 'sqlite':
+            # SQLite has a single writer: a second connection would wait on
+            # the write lock held by the request's own transaction
+            return NumberSequenceService._allocate(db.session.connection(), prefix, scope, year, size)
+        with db.engine.begin() as conn:
+            return NumberSequenceService._allocate(conn, prefix, scope, year, size)
+
+    @staticmethod
+    def _dialect():
+        return db.session.get_bind().dialect.name
+
+    @staticmethod
+    def _allocate(conn, prefix, scope, year, size):
+        table = NumberSequence.__table__
+        row = (
+            (table.c.prefix == prefix)
+            & (table.c.scope == scope)
+            & (table.c.year == year)
+        )
+
+        def take():
+            result = conn.execute(
+                update(table)
+                .where(row)
+                .values(next_value=table.c.next_value + size, updated_at=datetime.utcnow())
+            )
+            if result.rowcount != 1:
+                return None
+            return conn.execute(select(table.c.next_value).where(row)).scalar() - size
+
+        first = take()
+        if first is not None:
+            return first
+
+        # First number of the year: start after any number already issued
+        first = NumberSequenceService._highest_issued(conn, prefix, scope, year) + 1
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(table).values(
+                    prefix=prefix,
+                    scope=scope,
+                    year=year,
+                    next_value=first + size,
+                    updated_at=datetime.utcnow()
+                ))
+            return first
+        except IntegrityError:
+            # Another request created the counter first
+            return take()
+
+    @staticmethod
+    def _highest_issued(conn, prefix, scope, year):
+        """Highest number already stored for a prefix/scope/year, or 0."""
+        if prefix not in ISSUED_NUMBER_COLUMNS:
+            return 0
+        column, scope_column = ISSUED_NUMBER_COLUMNS[prefix]
+
+        query = select(column).where(column.like(f"{prefix}-{year}-%"))
+        if scope_column is not None:
+            query = query.where(scope_column == scope)
+        # Numbers are zero padded, so longest-then-greatest is the numeric max
+        query = query.order_by(func.char_length(column).desc(), column.desc()).limit(1)
+
+        number = conn.execute(query).scalar()
+        try:
+            return int(number.rsplit('-', 1)[1]) if number else 0
+        except ValueError:
+            return 0
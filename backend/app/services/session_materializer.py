@@ -0,0 +1,246 @@
+"""
+Materialize bookable ClassSession rows from ClassSchedule rules.
+
+Recurring schedules (a weekday plus times) and dated one-off schedules are
+expanded into one session per (schedule_id, date) over a rolling horizon.
+A run is idempotent: it reads the window's existing sessions in one query,
+inserts the missing ones with a single bulk INSERT, moves unbooked
+sessions whose schedule changed time, and removes unbooked future
+sessions their schedule no longer produces. Sessions that have bookings,
+waitlist entries or seat holds are never moved or removed, and cancelled
+or hand-rescheduled sessions keep their slot so the schedule doesn't
+bring them back.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, case, insert, or_
+
+from app import db
+from app.models import Booking, ClassSchedule, ClassSession, DanceClass, SeatHold, Waitlist
+from app.services.public_schedule_cache import public_schedule_cache
+
+DEFAULT_HORIZON_DAYS = 28
+
+
+class SessionMaterializer:
+    """Expands class schedules into class sessions."""
+
+    @staticmethod
+    def occurrences(schedule, start_date, end_date) -> List:
+        """Dates in [start_date, end_date] on which a schedule takes place."""
+        if schedule.is_cancelled:
+            return []
+
+        if schedule.specific_date:
+            if start_date <= schedule.specific_date <= end_date:
+                return [schedule.specific_date]
+            return []
+
+        if not schedule.is_recurring or schedule.day_of_week is None:
+            return []
+        if schedule.recurrence_end_date:
+            end_date = min(end_date, schedule.recurrence_end_date)
+
+        first = start_date + timedelta(days=(schedule.day_of_week - start_date.weekday()) % 7)
+        return [
+            first + timedelta(weeks=week)
+            for week in range((end_date - first).days // 7 + 1)
+        ] if first <= end_date else []
+
+    @staticmethod
+    def session_values(schedule, dance_class, session_date) -> dict:
+        """Column values for the session of a schedule on one date."""
+        return {
+            'id': str(uuid.uuid4()),
+            'studio_id': schedule.studio_id,
+            'schedule_id': schedule.id,
+            'class_id': dance_class.id,
+            'date': session_date,
+            'start_time': datetime.combine(session_date, schedule.start_time),
+            'end_time': datetime.combine(session_date, schedule.end_time),
+            'max_capacity': dance_class.max_capacity,
+            'booked_count': 0,
+            'waitlist_count': 0,
+            'held_count': 0,
+            'instructor_id': schedule.instructor_id,
+            'instructor_name': dance_class.instructor_name,
+            'status': 'SCHEDULED',
+        }
+
+    @staticmethod
+    def insert_sessions(occurrences: Iterable[Tuple[ClassSchedule, DanceClass, object]]) -> int:
+        """
+        Bulk insert sessions for (schedule, dance_class, date) triples.
+
+        Runs in the caller's transaction and does not commit.
+
+        Returns:
+            Number of sessions inserted
+        """
+        rows = [
+            SessionMaterializer.session_values(schedule, dance_class, session_date)
+            for schedule, dance_class, session_date in occurrences
+        ]
+        if rows:
+            # The schedules may still be pending in this transaction
+            db.session.flush()
+            db.session.execute(insert(ClassSession), rows)
+        return len(rows)
+
+    @staticmethod
+    def session_for_schedule(schedule, session_date):
+        """
+        The session of a schedule on a date, created if it doesn't exist yet.
+
+        Runs in the caller's transaction and does not commit.
+        """
+        # A cancelled session blocks its slot; the caller's seat reservation fails
+        session = ClassSession.query.filter(
+            ClassSession.schedule_id == schedule.id,
+            SessionMaterializer._slot_date() == session_date
+        ).order_by(case((ClassSession.status == 'CANCELLED', 1), else_=0)).first()
+        if session:
+            return session
+
+        dance_class = DanceClass.query.get(schedule.class_id)
+        session = ClassSession(**SessionMaterializer.session_values(schedule, dance_class, session_date))
+        db.session.add(session)
+        return session
+
+    @staticmethod
+    def detach_schedules(schedule_ids: List[str]) -> int:
+        """
+        Prepare schedules for deletion.
+
+        Unbooked future sessions of the schedules are removed; all other
+        sessions keep their bookings and just lose the schedule link.
+        Does not commit.
+
+        Returns:
+            Number of sessions removed
+        """
+        if not schedule_ids:
+            return 0
+
+        session_query = ClassSession.query.filter(ClassSession.schedule_id.in_(schedule_ids))
+        sessions = session_query.all()
+        removable = SessionMaterializer._removable(sessions, session_query, datetime.utcnow().date())
+        for session in sessions:
+            if session.id in removable:
+                db.session.delete(session)
+            else:
+                session.schedule_id = None
+        db.session.flush()
+        return len(removable)
+
+    @staticmethod
+    def materialize(studio_id: Optional[str] = None, horizon_days: Optional[int] = None, today=None) -> Dict[str, int]:
+        """
+        Bring sessions in line with schedules from today over the horizon.
+
+        Args:
+            studio_id: one studio, or None for every studio
+            horizon_days: days ahead to materialize (SESSION_HORIZON_DAYS)
+            today: first date of the window (defaults to today, UTC)
+
+        Returns:
+            Counts of sessions 'created', 'updated' and 'removed'
+        """
+        today = today or datetime.utcnow().date()
+        if horizon_days is None:
+            horizon_days = current_app.config.get('SESSION_HORIZON_DAYS', DEFAULT_HORIZON_DAYS)
+        end_date = today + timedelta(days=horizon_days - 1)
+
+        schedule_query = db.session.query(ClassSchedule, DanceClass).join(
+            DanceClass, ClassSchedule.class_id == DanceClass.id
+        )
+        session_query = ClassSession.query.filter(
+            ClassSession.schedule_id.isnot(None),
+            or_(
+                and_(ClassSession.date >= today, ClassSession.date <= end_date),
+                and_(ClassSession.rescheduled_from >= today, ClassSession.rescheduled_from <= end_date)
+            )
+        )
+        if studio_id:
+            schedule_query = schedule_query.filter(ClassSchedule.studio_id == studio_id)
+            session_query = session_query.filter(ClassSession.studio_id == studio_id)
+
+        wanted = {}
+        for schedule, dance_class in schedule_query.all():
+            if not dance_class.is_active:
+                continue
+            for session_date in SessionMaterializer.occurrences(schedule, today, end_date):
+                wanted[(schedule.id, session_date)] = (schedule, dance_class, session_date)
+
+        existing = session_query.all()
+        removable = SessionMaterializer._removable(existing, session_query, today)
+        updated = removed = 0
+
+        for session in existing:
+            occurrence = wanted.pop((session.schedule_id, session.rescheduled_from or session.date), None)
+            if session.status == 'CANCELLED' or session.rescheduled_from:
+                # Changed by hand: the slot is taken, leave the session alone
+                continue
+            if occurrence is None:
+                # Schedule cancelled, moved to another day or class deactivated
+                if session.id in removable:
+                    db.session.delete(session)
+                    removed += 1
+                continue
+
+            schedule = occurrence[0]
+            start_time = datetime.combine(session.date, schedule.start_time)
+            end_time = datetime.combine(session.date, schedule.end_time)
+            if session.id in removable and (session.start_time, session.end_time) != (start_time, end_time):
+                session.start_time = start_time
+                session.end_time = end_time
+                updated += 1
+
+        created = SessionMaterializer.insert_sessions(wanted.values())
+        db.session.commit()
+
+        # The bulk insert bypasses the session hooks that invalidate the cache
+        if wanted:
+            public_schedule_cache.invalidate({schedule.studio_id for schedule, _, _ in wanted.values()})
+
+        return {'created': created, 'updated': updated, 'removed': removed}
+
+    @staticmethod
+    def _slot_date():
+        """The schedule date a session stands for."""
+        return db.func.coalesce(ClassSession.rescheduled_from, ClassSession.date)
+
+    @staticmethod
+    def _removable(sessions, session_query, today) -> set:
+        """
+        Ids of future, still-scheduled sessions with no bookings, holds or waitlist entries.
+
+        `session_query` is the query that loaded `sessions`; it is reused as
+        a subquery so the booking check doesn't need a huge IN list.
+        """
+        candidates = {
+            s.id for s in sessions
+            if s.date >= today and s.status == 'SCHEDULED' and not s.rescheduled_from
+            and not s.booked_count and not s.waitlist_count and not s.held_count
+        }
+        if not candidates:
+            return set()
+
+        session_ids = session_query.with_entities(ClassSession.id)
+        referenced = {
+            row[0] for row in db.session.query(Booking.session_id)
+            .filter(Booking.session_id.in_(session_ids)).distinct()
+        }
+        referenced.update(
+            row[0] for row in db.session.query(Waitlist.session_id)
+            .filter(Waitlist.session_id.in_(session_ids)).distinct()
+        )
+        referenced.update(
+            row[0] for row in db.session.query(SeatHold.session_id)
+            .filter(SeatHold.session_id.in_(session_ids)).distinct()
+        )
+        return candidates - referenced
@@ -0,0 +1,214 @@
+"""
+Customer wallet ledger.
+
+Every change to a wallet balance is posted as a WalletTransaction entry
+(CREDIT or DEBIT, the balance after it, and the payment, refund or manual
+action on the other side) in the same transaction as the balance update.
+The balance itself only moves through one conditional UPDATE:
+
+    UPDATE wallets SET balance = balance + :x WHERE id = :id AND balance + :x >= 0
+
+so concurrent debits can never take a wallet below zero, and the stored
+balance always equals the sum of the wallet's entries.
+
+Balances at the start of each month are kept in wallet_balance_snapshots.
+The balance at any time is the latest snapshot before it plus the entries
+since, so a statement over any range reads one snapshot and sums at most
+a month of entries plus the range itself, rather than the whole history.
+"""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Wallet, WalletBalanceSnapshot, WalletTransaction
+
+CREDIT = 'CREDIT'
+DEBIT = 'DEBIT'
+
+
+def _signed_amount():
+    """Transaction amount with debits negative."""
+    return case(
+        (WalletTransaction.type == DEBIT, -WalletTransaction.amount),
+        else_=WalletTransaction.amount
+    )
+
+
+class WalletLedger:
+    """Post, snapshot and report wallet balance changes."""
+
+    @staticmethod
+    def wallet_for(studio_id: str, contact_id: str, create: bool = False) -> Optional[Wallet]:
+        """
+        A contact's wallet in a studio, created empty if asked.
+
+        Does not commit.
+        """
+        wallet = Wallet.query.filter_by(studio_id=studio_id, contact_id=contact_id).first()
+        if wallet or not create:
+            return wallet
+
+        wallet = Wallet(
+            id=str(uuid.uuid4()),
+            studio_id=studio_id,
+            contact_id=contact_id,
+            balance=Decimal('0')
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(wallet)
+        except IntegrityError:
+            # Created by a concurrent request
+            wallet = Wallet.query.filter_by(studio_id=studio_id, contact_id=contact_id).first()
+        return wallet
+
+    @staticmethod
+    def post(wallet, amount: Decimal, description: str, reference_type: str,
+             reference_id: str = None) -> Optional[WalletTransaction]:
+        """
+        Change a wallet's balance by amount (negative to debit) and record it.
+
+        Does not commit.
+
+        Returns:
+            The ledger entry, or None if the balance would go below zero
+        """
+        amount = Decimal(str(amount))
+        balance = func.coalesce(Wallet.balance, 0) + amount
+        balance_after = db.session.execute(
+            update(Wallet)
+            .where(Wallet.id == wallet.id, balance >= 0)
+            .values(balance=balance, updated_at=datetime.utcnow())
+            .returning(Wallet.balance)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        db.session.expire(wallet, ['balance', 'updated_at'])
+        if balance_after is None:
+            return None
+
+        entry = WalletTransaction(
+            id=str(uuid.uuid4()),
+            wallet_id=wallet.id,
+            type=DEBIT if amount < 0 else CREDIT,
+            amount=abs(amount),
+            balance_after=balance_after,
+            description=description,
+            reference_type=reference_type,
+            reference_id=reference_id,
+            created_at=datetime.utcnow()
+        )
+        db.session.add(entry)
+        return entry
+
+    @staticmethod
+    def credit(wallet, amount: Decimal, description: str, reference_type: str,
+               reference_id: str = None) -> WalletTransaction:
+        """Add funds to a wallet. Does not commit."""
+        return WalletLedger.post(wallet, abs(Decimal(str(amount))), description, reference_type, reference_id)
+
+    @staticmethod
+    def debit(wallet, amount: Decimal, description: str, reference_type: str,
+              reference_id: str = None) -> Optional[WalletTransaction]:
+        """Take funds from a wallet; None if it doesn't have enough. Does not commit."""
+        return WalletLedger.post(wallet, -abs(Decimal(str(amount))), description, reference_type, reference_id)
+
+    @staticmethod
+    def balance_at(wallet_id: str, at: datetime) -> Decimal:
+        """Balance of a wallet from the transactions created before `at`."""
+        snapshot = WalletBalanceSnapshot.query.filter(
+            WalletBalanceSnapshot.wallet_id == wallet_id,
+            WalletBalanceSnapshot.as_of <= at
+        ).order_by(WalletBalanceSnapshot.as_of.desc()).first()
+
+        since = db.session.query(func.coalesce(func.sum(_signed_amount()), 0)).filter(
+            WalletTransaction.wallet_id == wallet_id,
+            WalletTransaction.created_at < at
+        )
+        if snapshot:
+            since = since.filter(WalletTransaction.created_at >= snapshot.as_of)
+
+        opening = Decimal(str(snapshot.balance)) if snapshot else Decimal('0')
+        return opening + Decimal(str(since.scalar()))
+
+    @staticmethod
+    def statement(wallet_id: str, start: datetime, end: datetime) -> Dict:
+        """Opening and closing balance and totals of a wallet over [start, end)."""
+        opening = WalletLedger.balance_at(wallet_id, start)
+
+        totals = {CREDIT: (Decimal('0'), 0), DEBIT: (Decimal('0'), 0)}
+        rows = db.session.query(
+            WalletTransaction.type,
+            func.sum(WalletTransaction.amount),
+            func.count(WalletTransaction.id)
+        ).filter(
+            WalletTransaction.wallet_id == wallet_id,
+            WalletTransaction.created_at >= start,
+            WalletTransaction.created_at < end
+        ).group_by(WalletTransaction.type)
+        for type_, total, count in rows:
+            totals[type_] = (Decimal(str(total or 0)), count)
+
+        credits, debits = totals[CREDIT][0], totals[DEBIT][0]
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'opening_balance': float(opening),
+            'credits': float(credits),
+            'debits': float(debits),
+            'closing_balance': float(opening + credits - debits),
+            'transactions': totals[CREDIT][1] + totals[DEBIT][1],
+        }
+
+    @staticmethod
+    def snapshot(as_of: datetime) -> int:
+        """
+        Record every wallet's balance as of a time (usually a month start).
+
+        Each balance is the previous snapshot plus the entries since,
+        computed in one grouped query. Wallets already snapshotted at
+        as_of are skipped, so a rerun is harmless. Commits.
+
+        Returns:
+            Number of snapshots created
+        """
+        done = {
+            row[0] for row in db.session.query(WalletBalanceSnapshot.wallet_id).filter(
+                WalletBalanceSnapshot.as_of == as_of
+            )
+        }
+
+        previous_as_of = db.session.query(func.max(WalletBalanceSnapshot.as_of)).filter(
+            WalletBalanceSnapshot.as_of < as_of
+        ).scalar()
+
+        balances = {}
+        if previous_as_of:
+            for wallet_id, balance in db.session.query(
+                WalletBalanceSnapshot.wallet_id, WalletBalanceSnapshot.balance
+            ).filter(WalletBalanceSnapshot.as_of == previous_as_of):
+                balances[wallet_id] = Decimal(str(balance))
+
+        deltas = db.session.query(
+            WalletTransaction.wallet_id, func.sum(_signed_amount())
+        ).filter(WalletTransaction.created_at < as_of)
+        if previous_as_of:
+            deltas = deltas.filter(WalletTransaction.created_at >= previous_as_of)
+        for wallet_id, delta in deltas.group_by(WalletTransaction.wallet_id):
+            balances[wallet_id] = balances.get(wallet_id, Decimal('0')) + Decimal(str(delta or 0))
+
+        rows = [
+            {'id': str(uuid.uuid4()), 'wallet_id': wallet_id, 'as_of': as_of,
+             'balance': balance, 'created_at': datetime.utcnow()}
+            for wallet_id, balance in balances.items()
+            if wallet_id not in done
+        ]
+        if rows:
+            db.session.execute(insert(WalletBalanceSnapshot), rows)
+        db.session.commit()
+        return len(rows)
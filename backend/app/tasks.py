@@ -0,0 +1,253 @@
+"""
+Celery tasks for background work
+"""
+
+import logging
+from datetime import datetime
+
+from app.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZE_LOCK_KEY = 'sessions:materialize:lock'
+MATERIALIZE_LOCK_SECONDS = 15 * 60
+
+
+@celery_app.task(name='scheduling.optimize_schedule')
+def optimize_schedule_job(job_id, studio_id, params):
+    """
+    Run a schedule optimization in the background.
+
+    Progress and the final result are written to the job's Redis state (see
+    ScheduleJobStore); the result is also cached by the hash of its inputs.
+
+    params:
+        constraints: constraints_to_dict() output
+        engine: optimizer engine name
+        engine_options: engine constructor options
+        save: replace the studio's recurring schedule with the result
+    """
+    from app import redis_client
+    from app.scheduling import ScheduleGenerator
+    from app.scheduling.jobs import ScheduleJobStore, constraints_from_dict
+
+    store = ScheduleJobStore(redis_client)
+    store.update(job_id, state='running', started_at=datetime.utcnow().isoformat())
+
+    try:
+        constraints = constraints_from_dict(params.get('constraints'))
+        engine = params.get('engine')
+        engine_options = params.get('engine_options') or {}
+
+        generator = ScheduleGenerator(studio_id)
+        input_hash = generator.input_hash(constraints, engine, **engine_options)
+        run_options = dict(engine_options)
+        if engine == 'multistart':
+            # Prefork pool workers are daemonic and can't start a process
+            # pool of their own, so the starts run one after another
+            run_options['max_workers'] = 1
+        result = generator.generate_optimized_schedule(
+            constraints,
+            engine=engine,
+            progress_callback=store.progress_reporter(job_id),
+            **run_options
+        )
+        payload = result.to_dict()
+        store.cache_result(input_hash, payload)
+
+        saved = None
+        if params.get('save') and result.schedule:
+            saved = len(generator.replace_recurring_schedule(result))
+
+        store.update(
+            job_id,
+            state='completed',
+            input_hash=input_hash,
+            placed=len(result.schedule),
+            score=result.score,
+            schedules_created=saved,
+            result=payload,
+            finished_at=datetime.utcnow().isoformat()
+        )
+        return {'job_id': job_id, 'placed': len(result.schedule)}
+    except Exception as e:
+        store.update(
+            job_id,
+            state='failed',
+            error=str(e),
+            finished_at=datetime.utcnow().isoformat()
+        )
+        raise
+
+
+@celery_app.task(name='sessions.materialize')
+def materialize_sessions_job(studio_id=None):
+    """
+    Create and tidy class sessions from class schedules.
+
+    Runs hourly from celery beat for all studios; overlapping runs are
+    skipped while the previous one holds the Redis lock.
+    """
+    from app import redis_client
+    from app.services.session_materializer import SessionMaterializer
+
+    lock = None
+    if redis_client is not None:
+        lock = redis_client.lock(MATERIALIZE_LOCK_KEY, timeout=MATERIALIZE_LOCK_SECONDS)
+        if not lock.acquire(blocking=False):
+            return {'skipped': True}
+
+    try:
+        return SessionMaterializer.materialize(studio_id)
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+@celery_app.task(name='sessions.scan_conflicts')
+def scan_session_conflicts_job(days=None):
+    """
+    Find double-booked instructors and rooms in upcoming sessions.
+
+    Runs nightly from celery beat across all studios, over the days the
+    materializer has created sessions for. Conflicts are logged per studio.
+    """
+    from datetime import timedelta
+    from app.scheduling.generator import scan_session_conflicts
+    from app.services.session_materializer import DEFAULT_HORIZON_DAYS
+
+    today = datetime.utcnow().date()
+    conflicts = scan_session_conflicts(today, today + timedelta(days=days or DEFAULT_HORIZON_DAYS))
+    for studio_id, studio_conflicts in conflicts.items():
+        logger.warning(
+            f"Studio {studio_id} has {len(studio_conflicts)} session conflicts: "
+            + '; '.join(conflict.description for conflict in studio_conflicts)
+        )
+    return {studio_id: len(studio_conflicts) for studio_id, studio_conflicts in conflicts.items()}
+
+
+CONFIRMATION_MAX_RETRIES = 5
+CONFIRMATION_RETRY_BASE_SECONDS = 30
+
+
+def _confirmation_retry(task, booking_id, error):
+    """Retry a confirmation step with exponential backoff, or record the failure."""
+    from app.services.booking_confirmation import BookingConfirmation
+
+    if task.request.retries >= task.max_retries:
+        BookingConfirmation.mark_failed(booking_id, error)
+        raise error
+    raise task.retry(exc=error, countdown=CONFIRMATION_RETRY_BASE_SECONDS * 2 ** task.request.retries)
+
+
+@celery_app.task(bind=True, name='bookings.generate_confirmation_assets', max_retries=CONFIRMATION_MAX_RETRIES)
+def generate_confirmation_assets_job(self, booking_id):
+    """Generate and upload a booking's QR code and PDF."""
+    from app.services.booking_confirmation import BookingConfirmation
+
+    try:
+        BookingConfirmation.generate_assets(booking_id)
+    except Exception as e:
+        _confirmation_retry(self, booking_id, e)
+    return {'booking_id': booking_id}
+
+
+@celery_app.task(bind=True, name='bookings.send_confirmation', max_retries=CONFIRMATION_MAX_RETRIES)
+def send_confirmation_job(self, booking_id):
+    """Email/WhatsApp a booking's confirmation to the customer."""
+    from app.services.booking_confirmation import BookingConfirmation
+
+    try:
+        result = BookingConfirmation.notify(booking_id)
+    except Exception as e:
+        _confirmation_retry(self, booking_id, e)
+    return {'booking_id': booking_id, 'sent': result}
+
+
+@celery_app.task(name='seats.release_expired_holds')
+def release_expired_seat_holds_job():
+    """Give back the seats of checkouts that weren't paid in time."""
+    from app import db
+    from app.services.seat_holds import SeatHoldService
+
+    released = SeatHoldService.release_expired()
+    db.session.commit()
+    return {'released': released}
+
+
+@celery_app.task(name='sessions.notify_changes')
+def notify_session_changes_job(booking_ids, kind, message):
+    """Send one batch of class cancellation or update notices."""
+    from app.services.bulk_sessions import BulkSessionOperations
+
+    notified = BulkSessionOperations.send_notifications(booking_ids, kind, message)
+    return {'notified': notified}
+
+
+@celery_app.task(name='checkin.warm_cache')
+def warm_checkin_cache_job():
+    """Cache check-in cards for sessions starting soon, across all studios."""
+    from datetime import timedelta
+    from app.services.checkin import CheckInService, WARM_AHEAD_MINUTES
+
+    now = datetime.utcnow()
+    cached = CheckInService.warm(now - timedelta(minutes=30), now + timedelta(minutes=WARM_AHEAD_MINUTES))
+    return {'cached': cached}
+
+
+WEBHOOK_RETRY_BASE_SECONDS = 30
+
+
+@celery_app.task(bind=True, name='payments.process_webhook_events')
+def process_webhook_events_job(self, ordering_key):
+    """
+    Process the pending webhook events of one payment or subscription.
+
+    A failed event is retried with exponential backoff until it has used
+    its attempts (see PaymentWebhookService.process_pending).
+    """
+    from app.services.payment_webhooks import MAX_ATTEMPTS, PaymentWebhookService, WebhookProcessingError
+
+    try:
+        processed = PaymentWebhookService.process_pending(ordering_key)
+    except WebhookProcessingError as e:
+        raise self.retry(
+            exc=e,
+            countdown=WEBHOOK_RETRY_BASE_SECONDS * 2 ** self.request.retries,
+            max_retries=MAX_ATTEMPTS
+        )
+    return {'ordering_key': ordering_key, 'processed': processed}
+
+
+@celery_app.task(name='payments.requeue_stale_webhook_events')
+def requeue_stale_webhook_events_job():
+    """Queue the webhook events left processing by a dead worker again."""
+    from app.services.payment_webhooks import PaymentWebhookService
+
+    return {'ordering_keys': PaymentWebhookService.requeue_stale()}
+
+
+@celery_app.task(name='payments.reconcile_refunds')
+def reconcile_refunds_job():
+    """Recompute payments' refund totals from their refunds and fix drift."""
+    from app.services.refunds import RefundAccounting
+
+    drift = RefundAccounting.reconcile()
+    return {'drifted': len(drift), 'payment_ids': [row['payment_id'] for row in drift]}
+
+
+@celery_app.task(name='wallet.snapshot_balances')
+def snapshot_wallet_balances_job(as_of=None):
+    """
+    Snapshot every wallet's balance at the start of the month.
+
+    as_of: ISO datetime to snapshot at instead (e.g. to backfill)
+    """
+    from app.services.wallet_ledger import WalletLedger
+
+    if as_of:
+        as_of = datetime.fromisoformat(as_of)
+    else:
+        as_of = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    created = WalletLedger.snapshot(as_of)
+    return {'as_of': as_of.isoformat(), 'snapshots': created}
@@ -0,0 +1,33 @@
+"""Add number_sequences table for booking/payment/invoice numbers
+
+Revision ID: 007_add_number_sequences
+Revises: 006_add_razorpay_fields_to_bookings
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_add_number_sequences'
+down_revision = '006_add_razorpay_fields_to_bookings'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Counters are seeded lazily from the highest existing number, so no
+    # data migration is needed here
+    op.create_table(
+        'number_sequences',
+        sa.Column('prefix', sa.String(length=10), nullable=False),
+        sa.Column('scope', sa.String(length=36), nullable=False, server_default=''),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('next_value', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('prefix', 'scope', 'year')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('number_sequences')
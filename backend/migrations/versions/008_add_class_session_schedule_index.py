@@ -0,0 +1,31 @@
+"""Index class_sessions by schedule and date
+
+Revision ID: 008_add_class_session_schedule_index
+Revises: 007_add_number_sequences
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_add_class_session_schedule_index'
+down_revision = '007_add_number_sequences'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Sessions are looked up by (schedule_id, date) when materialized from
+    # schedules. Not unique: older data can hold several sessions per
+    # schedule and date (one per booking made from a schedule id).
+    op.create_index(
+        'ix_class_sessions_schedule_id_date',
+        'class_sessions',
+        ['schedule_id', 'date'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_class_sessions_schedule_id_date', table_name='class_sessions')
@@ -0,0 +1,63 @@
+"""Add confirmation pipeline status fields to bookings table
+
+Revision ID: 009_add_booking_confirmation_status
+Revises: 008_add_class_session_schedule_index
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_add_booking_confirmation_status'
+down_revision = '008_add_class_session_schedule_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Add QR/PDF confirmation pipeline fields to bookings table
+    bind = op.get_bind()
+    
+    # For SQLite, use raw SQL with try/except to handle existing columns
+    if bind.dialect.name == 'sqlite':
+        try:
+            op.execute('ALTER TABLE bookings ADD COLUMN confirmation_status VARCHAR(20)')
+        except Exception:
+            pass  # Column might already exist
+        try:
+            op.execute('ALTER TABLE bookings ADD COLUMN confirmation_error VARCHAR(500)')
+        except Exception:
+            pass
+        try:
+            op.execute('ALTER TABLE bookings ADD COLUMN notified_at DATETIME')
+        except Exception:
+            pass
+    else:
+        # For PostgreSQL and other databases, use standard Alembic operations
+        op.add_column(
+            'bookings',
+            sa.Column('confirmation_status', sa.String(20), nullable=True)
+        )
+        op.add_column(
+            'bookings',
+            sa.Column('confirmation_error', sa.String(500), nullable=True)
+        )
+        op.add_column(
+            'bookings',
+            sa.Column('notified_at', sa.DateTime(), nullable=True)
+        )
+
+
+def downgrade() -> None:
+    # Remove confirmation pipeline fields from bookings table
+    bind = op.get_bind()
+    
+    if bind.dialect.name == 'sqlite':
+        # SQLite doesn't support DROP COLUMN directly, so we skip it
+        # In production, you'd need to recreate the table
+        pass
+    else:
+        op.drop_column('bookings', 'notified_at')
+        op.drop_column('bookings', 'confirmation_error')
+        op.drop_column('bookings', 'confirmation_status')
@@ -0,0 +1,65 @@
+"""Add seat_holds table and held seat counter on class sessions
+
+Revision ID: 010_add_seat_holds
+Revises: 009_add_booking_confirmation_status
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_add_seat_holds'
+down_revision = '009_add_booking_confirmation_status'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    
+    # For SQLite, use raw SQL with try/except to handle existing columns
+    if bind.dialect.name == 'sqlite':
+        try:
+            op.execute('ALTER TABLE class_sessions ADD COLUMN held_count INTEGER DEFAULT 0')
+        except Exception:
+            pass  # Column might already exist
+    else:
+        op.add_column(
+            'class_sessions',
+            sa.Column('held_count', sa.Integer(), nullable=True, server_default='0')
+        )
+    
+    op.create_table(
+        'seat_holds',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('studio_id', sa.String(length=36), nullable=False),
+        sa.Column('session_id', sa.String(length=36), nullable=False),
+        sa.Column('razorpay_order_id', sa.String(length=100), nullable=False),
+        sa.Column('customer_name', sa.String(length=255), nullable=True),
+        sa.Column('customer_phone', sa.String(length=50), nullable=True),
+        sa.Column('customer_email', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('booking_id', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['studio_id'], ['studios.id']),
+        sa.ForeignKeyConstraint(['session_id'], ['class_sessions.id']),
+        sa.ForeignKeyConstraint(['booking_id'], ['bookings.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('razorpay_order_id')
+    )
+    op.create_index('ix_seat_holds_session_id', 'seat_holds', ['session_id'], unique=False)
+    # The sweeper looks up live holds past their expiry
+    op.create_index('ix_seat_holds_status_expires_at', 'seat_holds', ['status', 'expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_seat_holds_status_expires_at', table_name='seat_holds')
+    op.drop_index('ix_seat_holds_session_id', table_name='seat_holds')
+    op.drop_table('seat_holds')
+    
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        op.drop_column('class_sessions', 'held_count')
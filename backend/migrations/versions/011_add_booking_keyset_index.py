@@ -0,0 +1,30 @@
+"""Backfill bookings.booked_at and index bookings for keyset pagination
+
+Revision ID: 011_add_booking_keyset_index
+Revises: 010_add_seat_holds
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_add_booking_keyset_index'
+down_revision = '010_add_seat_holds'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Booking lists page on (booked_at, id), which needs booked_at on every row
+    op.execute('UPDATE bookings SET booked_at = created_at WHERE booked_at IS NULL')
+    op.create_index(
+        'ix_bookings_studio_id_booked_at_id',
+        'bookings',
+        ['studio_id', 'booked_at', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_studio_id_booked_at_id', table_name='bookings')
@@ -0,0 +1,38 @@
+"""Add rescheduled_from to class_sessions
+
+Revision ID: 012_add_session_rescheduled_from
+Revises: 011_add_booking_keyset_index
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_add_session_rescheduled_from'
+down_revision = '011_add_booking_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    
+    # For SQLite, use raw SQL with try/except to handle existing columns
+    if bind.dialect.name == 'sqlite':
+        try:
+            op.execute('ALTER TABLE class_sessions ADD COLUMN rescheduled_from DATE')
+        except Exception:
+            pass  # Column might already exist
+    else:
+        op.add_column(
+            'class_sessions',
+            sa.Column('rescheduled_from', sa.Date(), nullable=True)
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    
+    if bind.dialect.name != 'sqlite':
+        op.drop_column('class_sessions', 'rescheduled_from')
@@ -0,0 +1,39 @@
+"""Index bookings by QR code token
+
+Revision ID: 013_add_booking_qr_token_index
+Revises: 012_add_session_rescheduled_from
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_add_booking_qr_token_index'
+down_revision = '012_add_session_rescheduled_from'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Door check-in looks bookings up by the scanned token. Databases created
+    # with create_all() already have this index
+    inspector = sa.inspect(op.get_bind())
+    columns = {c['name'] for c in inspector.get_columns('bookings')}
+    indexes = {i['name'] for i in inspector.get_indexes('bookings')}
+    if 'qr_code_token' not in columns or 'ix_bookings_qr_code_token' in indexes:
+        return
+    
+    # Staff and admin bookings have no token; SQL Server treats NULLs as
+    # equal in unique indexes, so it only indexes the rows that have one
+    op.create_index(
+        'ix_bookings_qr_code_token',
+        'bookings',
+        ['qr_code_token'],
+        unique=True,
+        mssql_where=sa.text('qr_code_token IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_qr_code_token', table_name='bookings')
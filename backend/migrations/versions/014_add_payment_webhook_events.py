@@ -0,0 +1,48 @@
+"""Add payment_webhook_events table
+
+Revision ID: 014_add_payment_webhook_events
+Revises: 013_add_booking_qr_token_index
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014_add_payment_webhook_events'
+down_revision = '013_add_booking_qr_token_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payment_webhook_events',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=True),
+        sa.Column('event_id', sa.String(length=100), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('ordering_key', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id')
+    )
+    op.create_index('ix_payment_webhook_events_received_at', 'payment_webhook_events', ['received_at'], unique=False)
+    # The worker walks a payment's events in arrival order
+    op.create_index(
+        'ix_payment_webhook_events_ordering_key_received_at',
+        'payment_webhook_events',
+        ['ordering_key', 'received_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_webhook_events_ordering_key_received_at', table_name='payment_webhook_events')
+    op.drop_index('ix_payment_webhook_events_received_at', table_name='payment_webhook_events')
+    op.drop_table('payment_webhook_events')
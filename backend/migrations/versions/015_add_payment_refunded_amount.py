@@ -0,0 +1,45 @@
+"""Add running refund total to payments
+
+Revision ID: 015_add_payment_refunded_amount
+Revises: 014_add_payment_webhook_events
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015_add_payment_refunded_amount'
+down_revision = '014_add_payment_webhook_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    
+    # For SQLite, use raw SQL with try/except to handle existing columns
+    if bind.dialect.name == 'sqlite':
+        try:
+            op.execute('ALTER TABLE payments ADD COLUMN refunded_amount NUMERIC(10, 2) DEFAULT 0')
+        except Exception:
+            pass  # Column might already exist
+    else:
+        op.add_column(
+            'payments',
+            sa.Column('refunded_amount', sa.Numeric(10, 2), nullable=True, server_default='0')
+        )
+    
+    # Start from the refunds recorded so far
+    op.execute(
+        "UPDATE payments SET refunded_amount = COALESCE(("
+        "SELECT SUM(refunds.amount) FROM refunds "
+        "WHERE refunds.payment_id = payments.id AND refunds.status != 'FAILED'"
+        "), 0)"
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        op.drop_column('payments', 'refunded_amount')
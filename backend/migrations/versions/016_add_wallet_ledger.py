@@ -0,0 +1,43 @@
+"""Add wallet balance snapshots and wallet transaction history index
+
+Revision ID: 016_add_wallet_ledger
+Revises: 015_add_payment_refunded_amount
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '016_add_wallet_ledger'
+down_revision = '015_add_payment_refunded_amount'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # History is paged on (created_at, id), which needs created_at on every row
+    op.execute('UPDATE wallet_transactions SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    op.create_index(
+        'ix_wallet_transactions_wallet_id_created_at_id',
+        'wallet_transactions',
+        ['wallet_id', 'created_at', 'id'],
+        unique=False
+    )
+    
+    op.create_table(
+        'wallet_balance_snapshots',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('wallet_id', sa.String(length=36), nullable=False),
+        sa.Column('as_of', sa.DateTime(), nullable=False),
+        sa.Column('balance', sa.Numeric(10, 2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['wallet_id'], ['wallets.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('wallet_id', 'as_of', name='uq_wallet_balance_snapshots_wallet_id_as_of')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('wallet_balance_snapshots')
+    op.drop_index('ix_wallet_transactions_wallet_id_created_at_id', table_name='wallet_transactions')
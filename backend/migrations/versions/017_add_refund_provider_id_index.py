@@ -0,0 +1,53 @@
+"""Make refunds unique by provider refund ID
+
+Revision ID: 017_add_refund_provider_id_index
+Revises: 016_add_wallet_ledger
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017_add_refund_provider_id_index'
+down_revision = '016_add_wallet_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    columns = {c['name'] for c in inspector.get_columns('refunds')}
+    indexes = {i['name'] for i in inspector.get_indexes('refunds')}
+    if 'provider_refund_id' not in columns or 'ix_refunds_provider_refund_id' in indexes:
+        return
+    
+    # Keep the first of any refunds the webhook already recorded twice, and
+    # take the duplicates back out of the payments' refunded totals
+    op.execute(
+        "UPDATE refunds SET provider_refund_id = NULL, status = 'FAILED' "
+        "WHERE provider_refund_id IS NOT NULL AND id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM refunds "
+        "WHERE provider_refund_id IS NOT NULL GROUP BY provider_refund_id) AS first_refunds"
+        ")"
+    )
+    op.execute(
+        "UPDATE payments SET refunded_amount = COALESCE(("
+        "SELECT SUM(refunds.amount) FROM refunds "
+        "WHERE refunds.payment_id = payments.id AND refunds.status != 'FAILED'"
+        "), 0)"
+    )
+    
+    # Manual refunds have no provider ID; SQL Server treats NULLs as equal
+    # in unique indexes, so it only indexes the rows that have one
+    op.create_index(
+        'ix_refunds_provider_refund_id',
+        'refunds',
+        ['provider_refund_id'],
+        unique=True,
+        mssql_where=sa.text('provider_refund_id IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refunds_provider_refund_id', table_name='refunds')
@@ -0,0 +1,44 @@
+"""Record when payment webhook events were claimed
+
+Revision ID: 018_add_webhook_event_claimed_at
+Revises: 017_add_refund_provider_id_index
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018_add_webhook_event_claimed_at'
+down_revision = '017_add_refund_provider_id_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    
+    # For SQLite, use raw SQL with try/except to handle existing columns
+    if bind.dialect.name == 'sqlite':
+        try:
+            op.execute('ALTER TABLE payment_webhook_events ADD COLUMN claimed_at DATETIME')
+        except Exception:
+            pass  # Column might already exist
+    else:
+        op.add_column(
+            'payment_webhook_events',
+            sa.Column('claimed_at', sa.DateTime(), nullable=True)
+        )
+    
+    # Events already stuck in processing are taken over once the claim
+    # timeout has passed from now
+    op.execute(
+        "UPDATE payment_webhook_events SET claimed_at = CURRENT_TIMESTAMP "
+        "WHERE status = 'PROCESSING' AND claimed_at IS NULL"
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        op.drop_column('payment_webhook_events', 'claimed_at')
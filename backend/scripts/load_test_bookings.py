@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Booking load test - fire concurrent public bookings at one session.
+
+Checks that the session is never oversold (confirmed bookings never exceed
+the spots that were free, and the remaining spots never go negative) and
+that p99 latency stays under a limit.
+
+Usage:
+    python scripts/load_test_bookings.py --base-url http://localhost:5000 \\
+        --studio-slug my-studio --session-id <uuid> --date 2025-06-01 \\
+        --requests 300 --concurrency 50 --p99-ms 2000
+
+Exits non-zero if a check fails. Every request books with a new phone
+number, so run it against a test studio.
+"""
+import argparse
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def spots_available(base_url, studio_slug, session_id, date):
+    """Free spots for a session, from the public session listing."""
+    response = requests.get(
+        f"{base_url}/api/bookings/public/sessions/{studio_slug}",
+        params={'start_date': date, 'end_date': date},
+        timeout=30
+    )
+    response.raise_for_status()
+    for session in response.json().get('sessions', []):
+        if session['id'] == session_id:
+            return session['spots_available']
+    raise SystemExit(f"Session {session_id} not listed for {studio_slug} on {date}")
+
+
+def book(base_url, studio_slug, session_id, run_id, n):
+    """Make one booking; returns (status code, seconds)."""
+    started = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/api/bookings/public/book",
+        json={
+            'studio_slug': studio_slug,
+            'session_id': session_id,
+            'customer_name': f"Load Test {n}",
+            'customer_phone': f"+00{run_id}{n:05d}",
+        },
+        timeout=60
+    )
+    return response.status_code, time.perf_counter() - started
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent booking load test')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--studio-slug', required=True)
+    parser.add_argument('--session-id', required=True)
+    parser.add_argument('--date', required=True, help='session date (YYYY-MM-DD)')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--p99-ms', type=float, default=2000)
+    args = parser.parse_args()
+
+    before = spots_available(args.base_url, args.studio_slug, args.session_id, args.date)
+    run_id = uuid.uuid4().int % 10 ** 6
+
+    print(f"Firing {args.requests} bookings ({args.concurrency} concurrent) at {before} free spots...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda n: book(args.base_url, args.studio_slug, args.session_id, run_id, n),
+            range(args.requests)
+        ))
+    elapsed = time.perf_counter() - started
+
+    after = spots_available(args.base_url, args.studio_slug, args.session_id, args.date)
+    statuses = [status for status, _ in results]
+    latencies_ms = [seconds * 1000 for _, seconds in results]
+    confirmed = statuses.count(201)
+    rejected = statuses.count(400)
+    errors = len(statuses) - confirmed - rejected
+    p50, p99 = percentile(latencies_ms, 50), percentile(latencies_ms, 99)
+
+    print(f"  confirmed: {confirmed}, fully booked: {rejected}, errors: {errors}")
+    print(f"  spots: {before} -> {after}")
+    print(f"  latency p50: {p50:.0f} ms, p99: {p99:.0f} ms, throughput: {len(results) / elapsed:.1f} req/s")
+
+    failures = []
+    if confirmed > before:
+        failures.append(f"oversold: {confirmed} bookings confirmed for {before} spots")
+    if after < 0:
+        failures.append(f"negative spots remaining: {after}")
+    if after != before - confirmed:
+        failures.append(f"seat counter drifted: expected {before - confirmed} spots, found {after}")
+    if errors:
+        failures.append(f"{errors} requests failed")
+    if p99 > args.p99_ms:
+        failures.append(f"p99 latency {p99:.0f} ms exceeds {args.p99_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == '__main__':
+    main()
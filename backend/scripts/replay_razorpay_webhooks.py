@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Replay stored Razorpay webhook events received in a time window.
+
+Use after an outage of the worker or the database: events that were
+acknowledged but never processed (or failed) are queued again, in their
+original order per payment.
+
+Usage:
+    python scripts/replay_razorpay_webhooks.py --since 2026-10-16T09:00 \\
+        --until 2026-10-16T11:30 [--all] [--event-type refund.created]
+
+--all also replays events that were processed; handlers skip work that is
+already done. Times are UTC.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.services.payment_webhooks import PaymentWebhookService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--since', required=True, type=datetime.fromisoformat)
+    parser.add_argument('--until', default=None, type=datetime.fromisoformat)
+    parser.add_argument('--all', action='store_true', help='include processed events')
+    parser.add_argument('--event-type', action='append', dest='event_types')
+    parser.add_argument('--config', default=os.getenv('FLASK_ENV', 'production'))
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        result = PaymentWebhookService.replay(
+            args.since,
+            args.until or datetime.utcnow(),
+            include_processed=args.all,
+            event_types=args.event_types
+        )
+    print(f"Replayed {result['events']} events for {result['ordering_keys']} payments")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import Studio, User
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def studio(app):
+    studio = Studio(id=str(uuid.uuid4()), name='Test Studio', slug='test-studio', email='studio@example.com')
+    db.session.add(studio)
+    db.session.commit()
+    return studio
+
+
+@pytest.fixture
+def owner(studio):
+    user = User(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        email='owner@example.com',
+        password_hash='x',
+        name='Owner',
+        role='owner'
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(owner):
+    return {'Authorization': f'Bearer {create_access_token(identity=owner.id)}'}
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager counting the SQL statements run inside it."""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
@@ -0,0 +1,46 @@
+"""Bulk cancel of sessions."""
+import uuid
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import ClassSession
+
+
+def add_session(studio, day):
+    session = ClassSession(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        date=day,
+        start_time=datetime.combine(day, datetime.min.time()) + timedelta(hours=18),
+        end_time=datetime.combine(day, datetime.min.time()) + timedelta(hours=19),
+        status='SCHEDULED'
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def test_bulk_cancel_without_reason(client, studio, auth_headers):
+    day = date.today() + timedelta(days=3)
+    session = add_session(studio, day)
+
+    response = client.post('/api/bookings/sessions/bulk-cancel', headers=auth_headers, json={
+        'start_date': day.isoformat(),
+        'end_date': day.isoformat(),
+        'reason': None,
+        'notify_customers': False
+    })
+
+    assert response.status_code == 200
+    db.session.refresh(session)
+    assert session.status == 'CANCELLED'
+    assert session.cancellation_reason == 'Class has been cancelled'
+
+
+def test_bulk_cancel_with_non_string_dates(client, studio, auth_headers):
+    response = client.post('/api/bookings/sessions/bulk-cancel', headers=auth_headers, json={
+        'start_date': 20300101,
+        'end_date': 20300102
+    })
+
+    assert response.status_code == 400
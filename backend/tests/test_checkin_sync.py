@@ -0,0 +1,73 @@
+"""Offline check-in sync."""
+import uuid
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Booking, ClassSession, Contact
+
+
+def add_booking(studio, session, token, status='CONFIRMED'):
+    contact = Contact(id=str(uuid.uuid4()), studio_id=studio.id, name=f'Customer {token}', phone=token)
+    booking = Booking(
+        id=str(uuid.uuid4()),
+        booking_number=f'BK-{token}',
+        studio_id=studio.id,
+        contact_id=contact.id,
+        session_id=session.id,
+        status=status,
+        qr_code_token=token
+    )
+    db.session.add_all([contact, booking])
+    return booking
+
+
+def test_sync_marks_attendance_in_utc(client, studio, auth_headers):
+    now = datetime.utcnow().replace(microsecond=0)
+    session = ClassSession(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        date=now.date(),
+        start_time=now - timedelta(hours=1),
+        end_time=now + timedelta(hours=1),
+        max_capacity=10,
+        status='SCHEDULED'
+    )
+    db.session.add(session)
+    offset = add_booking(studio, session, 'tok-offset')
+    zulu = add_booking(studio, session, 'tok-zulu')
+    naive = add_booking(studio, session, 'tok-naive')
+    future = add_booking(studio, session, 'tok-future')
+    cancelled = add_booking(studio, session, 'tok-cancelled', status='CANCELLED')
+    db.session.commit()
+
+    scanned = now - timedelta(minutes=30)
+    ist = scanned + timedelta(hours=5, minutes=30)
+    response = client.post('/api/bookings/checkin/sync', headers=auth_headers, json={'scans': [
+        {'qr_token': 'tok-offset', 'scanned_at': ist.isoformat() + '+05:30'},
+        {'qr_token': 'tok-zulu', 'scanned_at': scanned.isoformat() + 'Z'},
+        {'qr_token': 'tok-zulu', 'scanned_at': (scanned + timedelta(minutes=1)).isoformat() + 'Z'},
+        {'qr_token': 'tok-naive', 'scanned_at': 'not a time'},
+        {'qr_token': 'tok-future', 'scanned_at': (now + timedelta(days=1)).isoformat() + 'Z'},
+        {'qr_token': 'tok-cancelled'},
+        {'qr_token': 'tok-unknown'},
+        'not a scan',
+    ]})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert {r['qr_token']: r['result'] for r in data['results']} == {
+        'tok-offset': 'checked_in',
+        'tok-zulu': 'checked_in',
+        'tok-naive': 'checked_in',
+        'tok-future': 'invalid_time',
+        'tok-cancelled': 'cancelled',
+        'tok-unknown': 'invalid',
+    }
+    assert data['checked_in'] == 3
+
+    db.session.expire_all()
+    assert db.session.get(Booking, offset.id).attendance_marked_at == scanned
+    assert db.session.get(Booking, zulu.id).attendance_marked_at == scanned
+    assert db.session.get(Booking, naive.id).status == 'ATTENDED'
+    assert db.session.get(Booking, future.id).attendance_marked_at is None
+    assert db.session.get(Booking, cancelled.id).attendance_marked_at is None
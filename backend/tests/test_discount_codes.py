@@ -0,0 +1,37 @@
+"""Counting discount code uses."""
+import uuid
+
+from app import db
+from app.models import DiscountCode
+from app.services.discount_codes import DiscountCodeService
+
+
+def add_code(studio, code, max_uses):
+    discount_code = DiscountCode(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        code=code,
+        discount_type='PERCENTAGE',
+        discount_value=10,
+        max_uses=max_uses,
+        uses_count=0
+    )
+    db.session.add(discount_code)
+    db.session.commit()
+    return discount_code
+
+
+def test_record_use_stops_at_usage_limit(app, studio):
+    limited = add_code(studio, 'ONCE', max_uses=1)
+    unlimited = add_code(studio, 'ALWAYS', max_uses=None)
+
+    assert DiscountCodeService.record_use(studio.id, 'once')
+    assert not DiscountCodeService.record_use(studio.id, 'ONCE')
+    for _ in range(3):
+        assert DiscountCodeService.record_use(studio.id, 'ALWAYS')
+    db.session.commit()
+
+    db.session.refresh(limited)
+    db.session.refresh(unlimited)
+    assert limited.uses_count == 1
+    assert unlimited.uses_count == 3
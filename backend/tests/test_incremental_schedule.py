@@ -0,0 +1,56 @@
+"""Incremental re-optimization through the API."""
+import uuid
+from datetime import time
+
+from app import db
+from app.models import ClassSchedule, DanceClass, InstructorAvailability, Room, User
+
+
+def test_owner_can_save_incremental_changes(client, studio, auth_headers):
+    instructor = User(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        email='instructor@example.com',
+        password_hash='x',
+        name='Instructor',
+        role='INSTRUCTOR'
+    )
+    dance_class = DanceClass(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        name='Salsa Basics',
+        dance_style='Salsa',
+        level='Beginner',
+        duration_minutes=60,
+        max_capacity=15,
+        instructor_id=instructor.id,
+        is_active=True
+    )
+    db.session.add_all([
+        instructor,
+        dance_class,
+        Room(id=str(uuid.uuid4()), studio_id=studio.id, name='Room A', capacity=20, is_active=True),
+        InstructorAvailability(
+            id=str(uuid.uuid4()),
+            instructor_id=instructor.id,
+            day_of_week=0,
+            start_time=time(9),
+            end_time=time(21),
+            is_available=True
+        ),
+    ])
+    db.session.commit()
+
+    response = client.post('/api/scheduling/optimize/incremental', headers=auth_headers, json={
+        'changed_class_ids': [dance_class.id],
+        'save': True
+    })
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['diff']['added']) == 1
+    assert len(data['saved']['added']) == 1
+
+    schedule = ClassSchedule.query.get(data['saved']['added'][0])
+    assert schedule.class_id == dance_class.id
+    assert schedule.day_of_week == 0
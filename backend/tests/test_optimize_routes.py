@@ -0,0 +1,60 @@
+"""Saving optimized schedules through the API."""
+import uuid
+from datetime import time
+
+from app import db
+from app.models import ClassSchedule, DanceClass, InstructorAvailability, Room, User
+
+
+def add_class(studio):
+    instructor = User(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        email='instructor@example.com',
+        password_hash='x',
+        name='Instructor',
+        role='INSTRUCTOR'
+    )
+    db.session.add_all([
+        instructor,
+        DanceClass(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            name='Salsa Basics',
+            dance_style='Salsa',
+            level='Beginner',
+            duration_minutes=60,
+            max_capacity=15,
+            instructor_id=instructor.id,
+            is_active=True
+        ),
+        Room(id=str(uuid.uuid4()), studio_id=studio.id, name='Room A', capacity=20, is_active=True),
+        InstructorAvailability(
+            id=str(uuid.uuid4()),
+            instructor_id=instructor.id,
+            day_of_week=2,
+            start_time=time(9),
+            end_time=time(21),
+            is_available=True
+        ),
+    ])
+    db.session.commit()
+
+
+def test_owner_can_save_optimized_schedule(client, studio, auth_headers):
+    add_class(studio)
+
+    response = client.post('/api/scheduling/optimize/save', headers=auth_headers, json={})
+
+    assert response.status_code == 200
+    assert response.get_json()['schedules_created'] == 1
+    assert ClassSchedule.query.filter_by(studio_id=studio.id).count() == 1
+
+
+def test_owner_can_submit_saving_job(client, studio, auth_headers):
+    add_class(studio)
+
+    response = client.post('/api/scheduling/optimize/jobs', headers=auth_headers, json={'save': True})
+
+    # Past the role check; the test app has no Redis for background jobs
+    assert response.status_code == 503
@@ -0,0 +1,39 @@
+"""Processing of stored payment webhook events."""
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import PaymentWebhookEvent
+from app.services.payment_webhooks import CLAIM_TIMEOUT, PaymentWebhookService
+
+
+def record(event_id, received_at):
+    webhook_event = PaymentWebhookService.record(event_id, {
+        'event': 'payment.dispute.created',
+        'payload': {'payment': {'entity': {'id': 'pay_123'}}}
+    })
+    webhook_event.received_at = received_at
+    db.session.commit()
+    return webhook_event
+
+
+def test_stale_claim_is_taken_over(app):
+    now = datetime.utcnow()
+    stuck = record('evt_1', now - timedelta(hours=1))
+    later = record('evt_2', now - timedelta(minutes=30))
+    stuck.status = 'PROCESSING'
+    stuck.attempts = 1
+    stuck.claimed_at = now - timedelta(minutes=1)
+    db.session.commit()
+
+    # A live worker's claim holds back the events behind it
+    assert PaymentWebhookService.process_pending('pay_123') == 0
+    assert PaymentWebhookService.requeue_stale() == 0
+
+    stuck.claimed_at = now - CLAIM_TIMEOUT - timedelta(minutes=1)
+    db.session.commit()
+
+    assert PaymentWebhookService.requeue_stale() == 1
+    events = PaymentWebhookEvent.query.order_by(PaymentWebhookEvent.received_at).all()
+    assert [event.status for event in events] == ['IGNORED', 'IGNORED']
+    assert events[0].attempts == 2
+    assert events[0].id == stuck.id and events[1].id == later.id
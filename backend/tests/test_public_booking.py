@@ -0,0 +1,59 @@
+"""Booking from the public booking page."""
+import uuid
+from datetime import datetime, time, timedelta
+
+from app import db
+from app.models import Booking, ClassSchedule, DanceClass
+
+
+def add_schedule(studio):
+    dance_class = DanceClass(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        name='Evening Salsa',
+        duration_minutes=60,
+        max_capacity=15,
+        is_active=True
+    )
+    schedule = ClassSchedule(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        class_id=dance_class.id,
+        day_of_week=0,
+        start_time=time(18),
+        end_time=time(19),
+        is_recurring=True
+    )
+    db.session.add_all([dance_class, schedule])
+    db.session.commit()
+    return schedule
+
+
+def booking_request(studio, schedule, **extra):
+    return {
+        'studio_slug': studio.slug,
+        'session_id': schedule.id,
+        'customer_name': 'Asha',
+        'customer_phone': '9999999999',
+        **extra
+    }
+
+
+def test_schedule_booking_with_bad_date_is_rejected(client, studio):
+    schedule = add_schedule(studio)
+
+    for date in ('next monday', 20300107):
+        response = client.post('/api/bookings/public/book', json=booking_request(studio, schedule, date=date))
+        assert response.status_code == 400
+    assert Booking.query.count() == 0
+
+
+def test_schedule_booking_with_date(client, studio):
+    schedule = add_schedule(studio)
+    today = datetime.utcnow().date()
+    monday = today + timedelta(days=7 - today.weekday())
+
+    response = client.post('/api/bookings/public/book', json=booking_request(studio, schedule, date=monday.isoformat()))
+
+    assert response.status_code in (200, 201)
+    assert Booking.query.one().session.date == monday
@@ -0,0 +1,35 @@
+"""The public booking page lists classes as soon as they are scheduled."""
+import uuid
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import DanceClass
+
+
+def test_created_schedule_is_listed_on_public_page(client, studio, auth_headers):
+    dance_class = DanceClass(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        name='Evening Salsa',
+        dance_style='Salsa',
+        duration_minutes=60,
+        max_capacity=15,
+        is_active=True
+    )
+    db.session.add(dance_class)
+    db.session.commit()
+
+    url = f'/api/bookings/public/sessions/{studio.slug}'
+    assert client.get(url).get_json()['sessions'] == []
+
+    tomorrow = datetime.utcnow().date() + timedelta(days=1)
+    response = client.post('/api/scheduling/schedule', headers=auth_headers, json={
+        'class_id': dance_class.id,
+        'day_of_week': tomorrow.weekday(),
+        'start_time': '18:00',
+        'end_time': '19:00'
+    })
+    assert response.status_code == 201
+
+    sessions = client.get(url).get_json()['sessions']
+    assert [(s['class_name'], s['date']) for s in sessions] == [('Evening Salsa', tomorrow.isoformat())]
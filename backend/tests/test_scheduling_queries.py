@@ -0,0 +1,97 @@
+"""Scheduling reads issue a fixed number of queries, whatever the studio size."""
+import uuid
+from datetime import time
+
+from app import db
+from app.models import ClassSchedule, DanceClass, InstructorAvailability, Room, User
+from app.scheduling import ScheduleGenerator
+
+
+def add_instructors(studio, count):
+    """Instructors with availability, a room and a scheduled class each."""
+    for n in range(count):
+        instructor = User(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            email=f'{uuid.uuid4()}@example.com',
+            password_hash='x',
+            name=f'Instructor {n}',
+            role='INSTRUCTOR'
+        )
+        room = Room(id=str(uuid.uuid4()), studio_id=studio.id, name=f'Room {n}', capacity=20, is_active=True)
+        dance_class = DanceClass(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            name=f'Class {n}',
+            dance_style='Salsa',
+            level='Beginner',
+            duration_minutes=60,
+            max_capacity=15,
+            instructor_id=instructor.id,
+            is_active=True
+        )
+        db.session.add_all([instructor, room, dance_class])
+        for day in range(7):
+            db.session.add(InstructorAvailability(
+                id=str(uuid.uuid4()),
+                instructor_id=instructor.id,
+                day_of_week=day,
+                start_time=time(9),
+                end_time=time(21),
+                is_available=True
+            ))
+        db.session.add(ClassSchedule(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            class_id=dance_class.id,
+            day_of_week=n % 7,
+            start_time=time(10),
+            end_time=time(11),
+            room=room.name,
+            instructor_id=instructor.id,
+            is_recurring=True,
+            is_cancelled=False
+        ))
+    db.session.commit()
+    db.session.expire_all()
+
+
+def count_generator_queries(studio, count_queries):
+    generator = ScheduleGenerator(studio.id)
+    with count_queries() as statements:
+        assert generator.load_instructors()
+        assert generator.load_rooms()
+        assert generator.load_classes()
+        assert generator.get_current_schedule()
+        assert generator.load_current_assignments()
+        # Repeated loads come from the snapshot
+        generator.load_instructors()
+        generator.get_current_schedule()
+    return len(statements)
+
+
+def test_generator_queries_do_not_grow_with_instructors(studio, count_queries):
+    add_instructors(studio, 3)
+    small = count_generator_queries(studio, count_queries)
+
+    add_instructors(studio, 9)
+    large = count_generator_queries(studio, count_queries)
+
+    assert small == large
+
+
+def test_schedule_endpoint_queries_do_not_grow_with_instructors(client, studio, auth_headers, count_queries):
+    def count():
+        with count_queries() as statements:
+            response = client.get('/api/scheduling/schedule', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.get_json()['schedule']
+        return len(statements)
+
+    add_instructors(studio, 3)
+    small = count()
+
+    add_instructors(studio, 9)
+    large = count()
+
+    assert small == large
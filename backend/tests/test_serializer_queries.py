@@ -0,0 +1,141 @@
+"""Session and booking listings issue a fixed number of queries, whatever their length."""
+import uuid
+from datetime import date, datetime, time, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import Booking, ClassSession, Contact, DanceClass, Room, Studio, User
+
+WEEK_START = date(2030, 1, 7)  # A Monday
+
+
+def seed_studio(rows):
+    """
+    A studio with `rows` sessions, each with its own class, instructor and
+    room, one booking on each session and `rows` more on the first one.
+
+    Returns:
+        (auth headers of the owner, id of the first session)
+    """
+    studio = Studio(id=str(uuid.uuid4()), name='Studio', slug=str(uuid.uuid4()), email=f'{uuid.uuid4()}@example.com')
+    owner = User(
+        id=str(uuid.uuid4()),
+        studio_id=studio.id,
+        email=f'{uuid.uuid4()}@example.com',
+        password_hash='x',
+        name='Owner',
+        role='owner'
+    )
+    db.session.add_all([studio, owner])
+
+    sessions = []
+    for n in range(rows):
+        instructor = User(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            email=f'{uuid.uuid4()}@example.com',
+            password_hash='x',
+            name=f'Instructor {n}',
+            role='INSTRUCTOR'
+        )
+        room = Room(id=str(uuid.uuid4()), studio_id=studio.id, name=f'Room {n}', capacity=20, is_active=True)
+        dance_class = DanceClass(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            name=f'Class {n}',
+            duration_minutes=60,
+            max_capacity=rows * 2,
+            instructor_id=instructor.id,
+            is_active=True
+        )
+        day = WEEK_START + timedelta(days=n % 7)
+        session = ClassSession(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            class_id=dance_class.id,
+            date=day,
+            start_time=datetime.combine(day, time(9 + n % 12)),
+            end_time=datetime.combine(day, time(10 + n % 12)),
+            max_capacity=rows * 2,
+            instructor_id=instructor.id,
+            room_id=room.id,
+            status='SCHEDULED'
+        )
+        db.session.add_all([instructor, room, dance_class, session])
+        sessions.append(session)
+
+    for n in range(rows * 2):
+        contact = Contact(
+            id=str(uuid.uuid4()),
+            studio_id=studio.id,
+            name=f'Customer {n}',
+            email=f'{uuid.uuid4()}@example.com',
+            phone=str(n)
+        )
+        db.session.add_all([contact, Booking(
+            id=str(uuid.uuid4()),
+            booking_number=f'BK-{uuid.uuid4().hex[:12]}',
+            studio_id=studio.id,
+            contact_id=contact.id,
+            session_id=sessions[n if n < rows else 0].id,
+            status='CONFIRMED'
+        )])
+
+    db.session.commit()
+    db.session.expire_all()
+    return {'Authorization': f'Bearer {create_access_token(identity=owner.id)}'}, sessions[0].id
+
+
+def assert_fixed_query_count(client, count_queries, url, rows_of):
+    """GET `url` on a 12-row and a 60-row studio and compare statement counts."""
+    counts = []
+    for rows in (12, 60):
+        headers, session_id = seed_studio(rows)
+        with count_queries() as statements:
+            response = client.get(url.format(session_id=session_id), headers=headers)
+        assert response.status_code == 200
+        assert rows_of(response.get_json()) >= rows
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+
+
+def test_list_sessions(client, count_queries):
+    assert_fixed_query_count(
+        client, count_queries,
+        f'/api/bookings/sessions?start_date={WEEK_START.isoformat()}',
+        lambda data: len(data['sessions'])
+    )
+
+
+def test_weekly_schedule(client, count_queries):
+    assert_fixed_query_count(
+        client, count_queries,
+        f'/api/bookings/schedule/weekly?start_date={WEEK_START.isoformat()}',
+        lambda data: sum(len(day) for day in data['schedule'].values())
+    )
+
+
+def test_list_bookings(client, count_queries):
+    assert_fixed_query_count(
+        client, count_queries,
+        '/api/bookings?limit=500',
+        lambda data: len(data['bookings'])
+    )
+
+
+def test_get_session(client, count_queries):
+    assert_fixed_query_count(
+        client, count_queries,
+        '/api/bookings/sessions/{session_id}',
+        lambda data: len(data['attendees'])
+    )
+
+
+def test_get_session_bookings(client, count_queries):
+    assert_fixed_query_count(
+        client, count_queries,
+        '/api/bookings/session/{session_id}/bookings',
+        lambda data: len(data['bookings'])
+    )
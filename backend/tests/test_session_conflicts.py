@@ -0,0 +1,42 @@
+"""Cross-studio scan for double-booked sessions."""
+import uuid
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import ClassSession, Studio
+from app.scheduling.generator import scan_session_conflicts
+
+
+def add_session(studio_id, day, hour, instructor_id, status='SCHEDULED'):
+    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+    session = ClassSession(
+        id=str(uuid.uuid4()),
+        studio_id=studio_id,
+        date=day,
+        start_time=start,
+        end_time=start + timedelta(hours=1),
+        instructor_id=instructor_id,
+        instructor_name='Meera',
+        status=status
+    )
+    db.session.add(session)
+    return session
+
+
+def test_scan_groups_conflicts_by_studio(studio, count_queries):
+    other = Studio(id=str(uuid.uuid4()), name='Other Studio', slug='other-studio', email='other@example.com')
+    db.session.add(other)
+    day = date.today() + timedelta(days=2)
+    clash = [add_session(studio.id, day, 18, 'inst-1'), add_session(studio.id, day, 18.5, 'inst-1')]
+    add_session(studio.id, day, 20, 'inst-1')
+    add_session(other.id, day, 18, 'inst-2')
+    add_session(other.id, day, 18, 'inst-2', status='CANCELLED')
+    db.session.commit()
+
+    with count_queries() as statements:
+        conflicts = scan_session_conflicts(day, day)
+
+    assert len(statements) == 1
+    assert list(conflicts) == [studio.id]
+    assert sorted(conflicts[studio.id][0].affected_sessions) == sorted(s.id for s in clash)
+    assert conflicts[studio.id][0].description == f"Meera double-booked on {day.isoformat()}"